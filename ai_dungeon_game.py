@@ -1,11 +1,31 @@
 import random
 import time
 import os
-from typing import List, Dict
-from dataclasses import dataclass
-from ai_player import AIPlayer
-from config import API_CONFIGS
-import argparse
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, fields
+from functools import partial
+from ai_player import AIPlayer, tagged_calls
+from config import (API_CONFIGS, MAX_CONCURRENT_CALLS, SPECULATIVE_STATEMENTS, STATEMENT_REUSE_POLICY,
+                    INTERROGATION_STRATEGY, INTERROGATION_BUDGET, EARLY_VOTE_TERMINATION,
+                    REVIEW_CONTEXT_LIMIT, GAME_PACING)
+from output_sequencer import OutputSequencer, DeferredOutput, run_in_order
+from call_graph import CallGraph, completed
+from judge_commentary import JudgeCommentary
+from interrogation_scheduler import plan_round
+from voting import VoterTask, RevoteEngine, collect_votes
+from backstory_store import BackstoryStore, get_backstory_store, BACKSTORY_DIR
+from prompt_builder import build_round_prefix, build_round_dossiers, RoundDossiers
+from game_events import (GameEventLog, default_events_path, ROUND_START, PHASE, STATEMENT, QUESTION, ANSWER,
+                         VOTE, REVOTE, VOTE_SUMMARY, ABSTAIN, JUDGE, ELIMINATION, GAME_END, REVIEW)
+from checkpoint import (default_checkpoint_path, save_checkpoint, load_checkpoint,
+                        encode_random_state, decode_random_state)
+
+# 定义发言顺序，同时也是共享提示词前缀中玩家的排列顺序
+SPEAKING_ORDER = ["豆包", "Kimi", "DeepSeek", "Qwen", "GPT", "Claude", "Gemini", "Grok"]
+
+# 每轮按顺序执行的阶段，每个阶段结束后保存一次检查点
+ROUND_PHASES = ["statement", "interrogation", "voting", "elimination"]
 
 @dataclass
 class Character:
@@ -23,6 +43,7 @@ class Character:
     vote_history: List[Dict] = None  # 投票历史
     is_judge: bool = False  # 是否为裁判
     original_backstory: str = ""  # 原始故事背景
+    statement_round: int = 0  # 当前陈述生成于第几轮，0表示初始化时生成
     
     def __post_init__(self):
         if self.statement_history is None:
@@ -32,28 +53,88 @@ class Character:
         if self.vote_history is None:
             self.vote_history = []
 
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可以写入检查点的字典，不包含AI控制器"""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "ai_controller"}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any],
+                  new_ai_player: Callable[[Dict[str, Any]], AIPlayer] = AIPlayer) -> "Character":
+        """从检查点恢复角色，AI控制器根据API_CONFIGS中相同role_name的配置用new_ai_player重新创建"""
+        player = cls(**data)
+        if player.is_ai:
+            api_config = next((config for config in API_CONFIGS
+                               if config.get("role_name") == player.role_name
+                               and config.get("is_judge", False) == player.is_judge), None)
+            if api_config is None:
+                raise ValueError(f"检查点中的角色[{player.role_name}]在API_CONFIGS中没有对应的配置")
+            player.ai_controller = new_ai_player(api_config)
+        return player
+
 class GameState:
     def __init__(self):
         # 计算非裁判角色的数量
         self.num_players = len([config for config in API_CONFIGS if not config.get('is_judge', False)])
         self.players = []
         self.eliminated_players = []
+        # 玩家索引，避免按名字线性查找
+        self.players_by_name: Dict[str, Character] = {}
+        self.players_by_role: Dict[str, Character] = {}
+        self.alive_players: Dict[str, Character] = {}  # 存活玩家，按座位顺序排列，淘汰时移除
         self.judge = None  # AI裁判
         self.current_round = 0
         self.round_history = []
-        self.backstories = {}  # 存储角色对应的故事背景
+        self.event_log = GameEventLog()  # 只追加的事件日志，复盘上下文由此增量生成
+        self.backstories: Optional[BackstoryStore] = None  # 角色对应的故事背景
+        self.call_group: Optional[str] = None  # 本局玩家请求所属的分组，见 ai_player.use_call_gate()
         
         # 加载故事背景
         self.load_backstories()
 
-    def initialize_game(self):
-        """初始化游戏，创建角色"""
-        # 先查找裁判配置
-        judge_config = next((config for config in API_CONFIGS if config.get('is_judge', False)), None)
+    def initialize_game(self, executor=None, seat_order: Optional[List[str]] = None,
+                        lineup: Optional[List[str]] = None):
+        """初始化游戏，创建角色
+        
+        先并发检查所有API配置，再并发为每个角色生成第一轮的虚构陈述，
+        输出和玩家顺序与逐个初始化时相同。seat_order为按座位顺序排列的角色名，
+        决定各角色对应的玩家编号，None表示按配置顺序。lineup为参赛的角色名，
+        None表示API_CONFIGS中的所有角色。
+        """
+        if self.judge is None:
+            self.create_judge()
         
-        # 如果找到裁判配置，创建裁判
+        # 获取非裁判的API配置
+        player_configs = [config for config in API_CONFIGS if not config.get('is_judge', False)]
+        if lineup is not None:
+            unknown = set(lineup) - {config['role_name'] for config in player_configs}
+            if unknown:
+                raise ValueError(f"参赛角色在API_CONFIGS中没有对应的配置：{', '.join(sorted(unknown))}")
+            player_configs = [config for config in player_configs if config['role_name'] in lineup]
+            self.num_players = len(player_configs)
+        if seat_order is not None:
+            seats = {role_name: index for index, role_name in enumerate(seat_order)}
+            player_configs.sort(key=lambda config: seats.get(config['role_name'], len(seats)))
+        print(f"将初始化 {len(player_configs)} 名玩家")
+        
+        tasks = [(i, api_config, self.new_ai_player(api_config)) for i, api_config in enumerate(player_configs)]
+        self.check_providers([(config['role_name'], ai_controller) for _, config, ai_controller in tasks], executor)
+        
+        with OutputSequencer(range(len(tasks)), label="初始化角色") as sequencer:
+            players = sequencer.map(executor, self.create_player, tasks)
+        for player in players:
+            self.add_player(player)
+
+    def new_ai_player(self, api_config: Dict[str, Any]) -> AIPlayer:
+        """为本局创建AI控制器，请求归入本局的分组"""
+        ai_controller = AIPlayer(api_config)
+        ai_controller.call_group = self.call_group
+        return ai_controller
+
+    def create_judge(self):
+        """根据裁判配置创建AI裁判，没有裁判配置时不创建"""
+        judge_config = next((config for config in API_CONFIGS if config.get('is_judge', False)), None)
         if judge_config:
-            ai_controller = AIPlayer(judge_config)
+            ai_controller = self.new_ai_player(judge_config)
             self.judge = Character(
                 name="AI裁判",
                 role_name=judge_config['role_name'],
@@ -65,49 +146,111 @@ class GameState:
                 is_judge=True
             )
             print(f"AI裁判 {self.judge.role_name} 将监督这场游戏")
+
+    def check_providers(self, seats: List[Tuple[str, AIPlayer]], executor=None) -> List[str]:
+        """并发检查每个席位的API配置，输出检查结果并返回检查失败的角色名
         
-        # 获取非裁判的API配置
-        player_configs = [config for config in API_CONFIGS if not config.get('is_judge', False)]
-        print(f"将初始化 {len(player_configs)} 名玩家")
+        使用相同服务地址、密钥和模型的席位只检查一次。
+        """
+        if self.judge and self.judge.ai_controller:
+            seats = seats + [(self.judge.role_name, self.judge.ai_controller)]
         
-        for i, api_config in enumerate(player_configs):
-            is_ai = True  # 所有玩家都是AI
-            ai_controller = AIPlayer(api_config) if is_ai else None
-            
-            role_name = api_config['role_name']
-            print(f"初始化角色: {role_name}")
-            
-            # 获取故事背景
-            backstory = self.backstories.get(role_name, f"{role_name}的默认故事背景")
-            
-            # 基于故事背景生成虚构陈述
-            if ai_controller:
-                try:
-                    fake_memory = ai_controller.generate_fake_statement_based_on_backstory(backstory)
-                    print(f"为 {role_name} 生成了基于背景的虚构陈述")
-                except Exception as e:
-                    print(f"生成虚构陈述失败：{str(e)}，使用原始背景")
-                    fake_memory = backstory
+        probes = {}
+        for _, ai_controller in seats:
+            key = (ai_controller.base_url, ai_controller.api_key, ai_controller.model)
+            if key not in probes:
+                probes[key] = executor.submit(ai_controller.probe) if executor else ai_controller.probe()
+        
+        print("\n=== 检查API配置 ===")
+        failed = []
+        for role_name, ai_controller in seats:
+            result = probes[(ai_controller.base_url, ai_controller.api_key, ai_controller.model)]
+            if not isinstance(result, dict):
+                result = result.result()
+            if result["ok"]:
+                print(f"✓ {role_name}（{ai_controller.model}）连接正常，耗时{result['latency']:.2f}秒")
             else:
+                print(f"✗ {role_name}（{ai_controller.model}）检查失败：{result['error']}")
+                failed.append(role_name)
+        
+        if failed:
+            print(f"! 警告：{', '.join(failed)} 的API配置不可用，这些角色将使用默认回复，请检查 config.py")
+        return failed
+
+    def create_player(self, task: Tuple[int, Dict[str, Any], AIPlayer]) -> Character:
+        """创建一个玩家，并基于故事背景生成第一轮的虚构陈述"""
+        i, api_config, ai_controller = task
+        is_ai = True  # 所有玩家都是AI
+        
+        role_name = api_config['role_name']
+        print(f"初始化角色: {role_name}")
+        
+        # 获取故事背景
+        backstory = self.backstories.get(role_name, f"{role_name}的默认故事背景")
+        
+        # 基于故事背景生成虚构陈述
+        if ai_controller:
+            try:
+                fake_memory = ai_controller.generate_fake_statement_based_on_backstory(backstory)
+                print(f"为 {role_name} 生成了基于背景的虚构陈述")
+            except Exception as e:
+                print(f"生成虚构陈述失败：{str(e)}，使用原始背景")
                 fake_memory = backstory
-            
-            # 设置创伤和动机为未知（仅为保持接口兼容）
-            trauma = "未知创伤"
-            secret_motive = "未知动机"
-            
-            player = Character(
-                name=f"AI玩家{i+1}" if is_ai else f"玩家{i+1}",
-                role_name=role_name,
-                trauma=trauma,
-                secret_motive=secret_motive,
-                fake_memory=fake_memory,
-                is_ai=is_ai,
-                ai_controller=ai_controller,
-                original_backstory=backstory
-            )
-            # 将初始陈述添加到陈述历史中
-            player.statement_history.append(fake_memory)
-            self.players.append(player)
+        else:
+            fake_memory = backstory
+        
+        # 设置创伤和动机为未知（仅为保持接口兼容）
+        trauma = "未知创伤"
+        secret_motive = "未知动机"
+        
+        player = Character(
+            name=f"AI玩家{i+1}" if is_ai else f"玩家{i+1}",
+            role_name=role_name,
+            trauma=trauma,
+            secret_motive=secret_motive,
+            fake_memory=fake_memory,
+            is_ai=is_ai,
+            ai_controller=ai_controller,
+            original_backstory=backstory
+        )
+        # 将初始陈述添加到陈述历史中
+        player.statement_history.append(fake_memory)
+        return player
+
+    def add_player(self, player: Character):
+        """添加玩家并更新索引"""
+        self.players.append(player)
+        self.players_by_name[player.name] = player
+        self.players_by_role[player.role_name] = player
+        if player.is_alive:
+            self.alive_players[player.name] = player
+        self.event_log.register_player(player.role_name, player.trauma)
+
+    def round_record(self, round_num: int) -> Dict:
+        """获取某一轮的历史记录，不存在时创建，与各环节的调用顺序无关"""
+        if not self.round_history or self.round_history[-1]["round"] != round_num:
+            self.round_history.append({"round": round_num})
+        return self.round_history[-1]
+
+    def get_player(self, name: str) -> Optional[Character]:
+        """根据玩家名查找玩家"""
+        return self.players_by_name.get(name)
+
+    def get_alive_player_by_role(self, role_name: str) -> Optional[Character]:
+        """根据角色名查找存活的玩家"""
+        player = self.players_by_role.get(role_name)
+        return player if player is not None and player.is_alive else None
+
+    def role_of(self, name: str, default: str = "未知") -> str:
+        """根据玩家名查找角色名"""
+        player = self.players_by_name.get(name)
+        return player.role_name if player else default
+
+    def eliminate_player(self, player: Character):
+        """淘汰玩家并从存活索引中移除"""
+        player.is_alive = False
+        self.alive_players.pop(player.name, None)
+        self.eliminated_players.append(player)
 
     def generate_fake_memory(self) -> str:
         """生成虚构陈述（针对非AI玩家）"""
@@ -115,82 +258,92 @@ class GameState:
         return "玩家的默认故事背景"
 
     def load_backstories(self):
-        """加载故事背景"""
-        # 读取backstory_list文件夹中的故事背景
-        backstory_dir = "backstory_list"
-        if os.path.exists(backstory_dir):
-            # 创建一个小写到原始role_name的映射，用于不区分大小写的匹配
-            role_map = {}
-            for config in API_CONFIGS:
-                role_name = config.get("role_name")
-                if role_name:
-                    role_map[role_name.lower()] = role_name
-            
-            # 特殊映射关系，处理命名不一致的情况
-            special_map = {
-                "moonshot": "Kimi",  # moonshot是Kimi的供应商
-                "deepseek": "DeepSeek"  # 处理大小写不一致
-            }
-            
-            print("\n=== 加载角色背景故事 ===")
-            
-            # 记录成功加载和失败加载的角色
-            loaded_roles = []
-            missing_roles = []
-            
-            # 遍历所有文件并加载
-            for filename in os.listdir(backstory_dir):
-                if filename.startswith("for_") and filename.endswith(".txt"):
-                    try:
-                        # 从文件名提取角色名
-                        extracted_role = filename[4:-4]  # 去掉"for_"前缀和".txt"后缀
-                        file_path = os.path.join(backstory_dir, filename)
-                        
-                        # 尝试不区分大小写匹配
-                        if extracted_role in role_map:
-                            role_name = role_map[extracted_role]
-                        elif extracted_role.lower() in role_map:
-                            role_name = role_map[extracted_role.lower()]
-                        elif extracted_role in special_map:
-                            role_name = special_map[extracted_role]
-                        else:
-                            role_name = extracted_role
-                            
-                        with open(file_path, 'r', encoding='utf-8') as file:
-                            content = file.read().strip()
-                            print(f"✓ 成功加载[{role_name}]的故事背景")
-                            self.backstories[role_name] = content
-                            loaded_roles.append(role_name)
-                    except Exception as e:
-                        print(f"✗ 读取文件[{filename}]失败: {str(e)}")
-            
-            # 检查哪些角色没有加载到背景故事
-            for config in API_CONFIGS:
-                role_name = config.get("role_name")
-                if role_name and role_name not in loaded_roles and not config.get("is_judge", False):
-                    print(f"! 警告：角色[{role_name}]未找到对应的背景故事文件")
-                    missing_roles.append(role_name)
-                    
-            print(f"共加载了{len(loaded_roles)}个角色的背景故事，{len(missing_roles)}个角色使用默认背景")
-            if missing_roles:
-                print(f"缺失背景的角色: {', '.join(missing_roles)}")
+        """获取背景故事库
+
+        背景故事库在进程内共享，只在第一次使用或文件夹变化时建立索引并检查角色配置，
+        之后创建游戏不再读取文件，内容在生成角色陈述时才加载。
+        """
+        self.backstories = get_backstory_store(BACKSTORY_DIR, API_CONFIGS)
 
 class GameManager:
-    def __init__(self):
+    def __init__(self, checkpoint_path: Optional[str] = None, events_path: Optional[str] = None, rng=None):
         self.game_state = GameState()
+        # 本局的随机数生成器，默认为random模块；同一进程中同时运行多局时每局使用独立的random.Random
+        self.rng = rng if rng is not None else random
         self.current_speaker = None
         self.voting_results = {}
         self.elimination_record = []  # 记录每轮被淘汰的玩家
+        self.statement_prefix = ""  # 本轮陈述构成的共享提示词前缀，质询环节使用
+        self.current_round_qa = []  # 本轮使用角色名记录的质询内容
+        self.current_dossiers: Optional[RoundDossiers] = None  # 本轮玩家档案，投票、重新投票和裁判评论共用
+        self.current_condemned = None
+        self.interrogation_plan: Optional[List[Dict[str, Any]]] = None  # 本轮的质询计划，陈述环节开始时确定
+        self.pending_interrogations = None  # 陈述环节中提前开始的质询，不写入检查点
+        # 推测执行的下一轮陈述：玩家名 -> (生成陈述的输入, 缓存的输出, Future)，不写入检查点
+        self.speculative_statements: Dict[str, Tuple[Tuple, DeferredOutput, Any]] = {}
+        self.speculation_stats = {"started": 0, "hits": 0, "misses": 0, "cancelled": 0, "wasted_tokens": 0}
+        self.speculation_lock = threading.Lock()
+        self.completed_phase = None  # 本轮最后完成的阶段，None表示尚未开始任何一轮
+        self.finished = False
+        self.checkpoint_path = checkpoint_path or default_checkpoint_path()
+        self.events_path = events_path or default_events_path()  # 结构化事件输出，离线生成日志
+        self._executor = None
+        self._commentary: Optional[JudgeCommentary] = None
+        self.thread_initializer: Optional[Callable[[], None]] = None  # 本局的线程池中的线程启动时调用
+        self.pacing = GAME_PACING  # 为False时跳过展示用的停顿，用于批量运行
+        self.seat_order: Optional[List[str]] = None  # 按座位顺序排列的角色名，None表示按配置顺序
+        self.lineup: Optional[List[str]] = None  # 参赛的角色名，None表示所有配置的角色
+        self.speaking_order: List[str] = list(SPEAKING_ORDER)  # 按发言顺序排列的角色名
+
+    def pace(self, seconds: float):
+        """展示用的停顿，关闭pacing时直接返回"""
+        if self.pacing:
+            time.sleep(seconds)
+
+    @property
+    def executor(self):
+        """并发执行LLM请求的线程池，MAX_CONCURRENT_CALLS为1时返回None表示按顺序执行"""
+        if self._executor is None and MAX_CONCURRENT_CALLS > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CALLS, thread_name_prefix="llm",
+                                                initializer=self.thread_initializer)
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """把任务提交到线程池并返回Future，不并发时立即执行"""
+        if self.executor is not None:
+            return self.executor.submit(fn, *args, **kwargs)
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown_executor(self, cancel_futures: bool = False):
+        """关闭线程池，cancel_futures为True时取消尚未开始的请求"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=cancel_futures)
+            self._executor = None
 
     def start_game(self):
-        """开始游戏"""
+        """开始游戏，游戏结束后返回本局结果，见 result()"""
+        self.game_state.event_log.open_sink(self.events_path)
+        
         print("\n=== 欢迎来到地牢生存游戏 ===\n")
         print("神秘的地牢守卫正在分配身份...")
-        time.sleep(2)
+        self.pace(2)
+        
+        # 裁判的自我介绍在裁判的线程池中与角色初始化同时生成，输出在介绍环节展示
+        self.game_state.create_judge()
+        judge_intro = None
+        if self.game_state.judge and self.game_state.judge.ai_controller:
+            judge_intro = self.commentary.call(self.game_state.judge.ai_controller.introduce_judge)
         
-        self.game_state.initialize_game()
+        self.game_state.initialize_game(self.executor, self.seat_order, self.lineup)
         print(f"\n共有{len(self.game_state.players)}名玩家被困在地牢中\n")
-        time.sleep(1)
+        self.pace(1)
         
         # 在第一轮开始前展示所有玩家的身份
         print("\n=== 玩家身份一览 ===\n")
@@ -202,186 +355,539 @@ class GameManager:
         print("3. 每轮投票淘汰一名玩家，直到只剩下两名玩家")
         print("4. 最后两名玩家将成功逃离地牢")
         
-        # 如果有AI裁判，让裁判介绍自己
-        if self.game_state.judge and self.game_state.judge.ai_controller:
+        # 如果有AI裁判，让裁判介绍自己；超过截止时间仍未生成时跳过介绍
+        intro = self.commentary.wait(judge_intro) if judge_intro is not None else None
+        if intro is not None:
             print("\n=== AI裁判介绍 ===\n")
-            judge_intro = self.game_state.judge.ai_controller.introduce_judge()
-            print(judge_intro)
+            judge_intro.release()
+            print(intro)
+            self.log_event(JUDGE, self.game_state.judge.role_name, text=intro)
         
         print("\n=== 游戏即将开始 ===\n")
-        time.sleep(2)
+        self.pace(2)
         
         self.run_game_loop()
+        return self.result()
         
-    def get_judge_comment(self, event_type: str, **kwargs) -> str:
-        """获取AI裁判的评论"""
-        if not self.game_state.judge or not self.game_state.judge.ai_controller:
-            return None
-            
-        return self.game_state.judge.ai_controller.comment_on_event(event_type, **kwargs)
+    def judge_say(self, text: str, newline: bool = False):
+        """输出AI裁判的发言并记录到事件日志"""
+        prefix = "\n" if newline else ""
+        print(f"{prefix}AI裁判: {text}")
+        self.log_event(JUDGE, "AI裁判", text=text)
+
+    def begin_phase(self, title: str):
+        """输出环节标题并记录环节开始事件"""
+        print(f"\n--- {title}开始 ---" if title.endswith("环节") else f"\n--- {title} ---")
+        self.log_event(PHASE, title)
+
+    @property
+    def commentary(self) -> JudgeCommentary:
+        """AI裁判评论的旁路流水线，裁判创建或从检查点恢复后第一次使用时建立"""
+        if self._commentary is None:
+            judge = self.game_state.judge
+            self._commentary = JudgeCommentary(judge.ai_controller if judge else None, self.judge_say)
+            self._commentary.initializer = self.thread_initializer
+        return self._commentary
+
+    def judge_comment(self, event_type: str, **kwargs):
+        """提交一个事件给AI裁判评论，评论生成后按提交顺序输出，不等待生成"""
+        self.commentary.submit(event_type, **kwargs)
 
     def run_game_loop(self):
-        """运行游戏主循环"""
-        while len([p for p in self.game_state.players if p.is_alive]) > 2:  # 剩余2名玩家时结束
-            self.game_state.current_round += 1
-            print(f"\n=== 第{self.game_state.current_round}轮开始 ===\n")
-            
-            # 简化轮次开始的AI裁判评论
-            print(f"AI裁判: 第{self.game_state.current_round}轮游戏开始")
-            time.sleep(1)
-            
-            # 陈述环节
-            self.statement_phase()
-            
-            # 质询环节
-            self.interrogation_phase()
+        """运行游戏主循环，每个阶段结束后保存检查点，从检查点恢复时从下一个未完成的阶段继续"""
+        phase_methods = {
+            "statement": self.statement_phase,  # 陈述环节
+            "interrogation": self.interrogation_phase,  # 质询环节
+            "voting": self.voting_phase,  # 投票环节
+            "elimination": self.elimination_phase  # 淘汰阶段
+        }
+        
+        while True:
+            if self.completed_phase in (None, ROUND_PHASES[-1]):
+                if len(self.game_state.alive_players) <= 2:  # 剩余2名玩家时结束
+                    break
+                self.game_state.current_round += 1
+                self.completed_phase = None
+                print(f"\n=== 第{self.game_state.current_round}轮开始 ===\n")
+                self.log_event(ROUND_START, f"第{self.game_state.current_round}轮")
+                
+                # 简化轮次开始的AI裁判评论
+                self.judge_say(f"第{self.game_state.current_round}轮游戏开始")
+                self.pace(1)
             
-            # 投票环节
-            self.voting_phase()
+            next_index = 0 if self.completed_phase is None else ROUND_PHASES.index(self.completed_phase) + 1
+            phase = ROUND_PHASES[next_index]
+            phase_methods[phase]()
+            self.completed_phase = phase
             
-            # 淘汰阶段
-            self.elimination_phase()
-
-            # 记录本轮游戏历史
-            self.record_round_history()
+            if phase == ROUND_PHASES[-1]:
+                self.finish_round()
             
-            # 简化轮次结束的AI裁判评论
-            if self.elimination_record and len(self.elimination_record) > 0:
-                eliminated_player_record = self.elimination_record[-1]
-                eliminated_player_name = eliminated_player_record["player"].role_name
-                print(f"\nAI裁判: 第{self.game_state.current_round}轮结束，{eliminated_player_name}被淘汰")
-            else:
-                print(f"\nAI裁判: 第{self.game_state.current_round}轮结束")
-            time.sleep(2)
+            self.save_checkpoint()
 
         # 游戏结束
         self.end_game()
+        self.finished = True
+        self.save_checkpoint()
+        self.game_state.event_log.close_sink()
+        self.commentary.shutdown()
+        self.shutdown_executor()
+
+    def finish_round(self):
+        """记录本轮历史并输出轮次结束信息"""
+        # 记录本轮游戏历史，并在后台生成本轮的复盘摘要
+        self.record_round_history()
+        self.submit(self.game_state.event_log.round_digest, self.game_state.current_round)
+        
+        # 简化轮次结束的AI裁判评论
+        if self.elimination_record and len(self.elimination_record) > 0:
+            eliminated_player_record = self.elimination_record[-1]
+            eliminated_player_name = eliminated_player_record["player"].role_name
+            self.judge_say(f"第{self.game_state.current_round}轮结束，{eliminated_player_name}被淘汰", newline=True)
+        else:
+            self.judge_say(f"第{self.game_state.current_round}轮结束", newline=True)
+        self.pace(2)
+
+    def save_checkpoint(self):
+        """原子地保存当前游戏状态"""
+        game_state = self.game_state
+        data = {
+            "finished": self.finished,
+            "current_round": game_state.current_round,
+            "completed_phase": self.completed_phase,
+            "players": [player.to_dict() for player in game_state.players],
+            "judge": game_state.judge.to_dict() if game_state.judge else None,
+            "usage_logs": {player.name: player.ai_controller.usage_log
+                           for player in game_state.players if player.ai_controller},
+            "memories": {player.name: player.ai_controller.memory_state()
+                         for player in game_state.players if player.ai_controller},
+            "round_history": game_state.round_history,
+            "event_log": game_state.event_log.to_dict(),
+            "elimination_record": [{"round": record["round"], "player": record["player"].name}
+                                   for record in self.elimination_record],
+            "voting_results": self.voting_results,
+            "current_condemned": self.current_condemned,
+            "statement_prefix": self.statement_prefix,
+            "current_round_qa": self.current_round_qa,
+            "interrogation_plan": self.interrogation_plan,
+            "speaking_order": self.speaking_order,
+            "events_path": self.events_path,
+            "call_group": self.game_state.call_group,
+            "random_state": encode_random_state(self.rng.getstate())
+        }
+        try:
+            save_checkpoint(self.checkpoint_path, data)
+        except OSError as e:
+            print(f"保存检查点失败：{str(e)}")
+
+    @classmethod
+    def from_checkpoint(cls, path: str) -> "GameManager":
+        """从检查点恢复游戏，后续检查点继续写入同一个文件"""
+        data = load_checkpoint(path)
+        game = cls(checkpoint_path=path, events_path=data.get("events_path"))
+        game_state = game.game_state
+        game_state.call_group = data.get("call_group")
+        
+        for player_data in data["players"]:
+            player = Character.from_dict(player_data, game_state.new_ai_player)
+            if player.ai_controller:
+                player.ai_controller.usage_log = data.get("usage_logs", {}).get(player.name, [])
+                player.ai_controller.restore_memory(data.get("memories", {}).get(player.name, {}))
+            game_state.add_player(player)
+        if data.get("judge"):
+            game_state.judge = Character.from_dict(data["judge"], game_state.new_ai_player)
+        
+        game_state.current_round = data["current_round"]
+        game_state.round_history = data["round_history"]
+        game_state.event_log = GameEventLog.from_dict(data["event_log"])
+        game_state.event_log.open_sink(game.events_path)
+        game_state.eliminated_players = [p for p in game_state.players if not p.is_alive]
+        
+        game.completed_phase = data["completed_phase"]
+        game.elimination_record = [{"round": record["round"], "player": game_state.get_player(record["player"])}
+                                   for record in data["elimination_record"]]
+        game.voting_results = data["voting_results"]
+        game.current_condemned = data["current_condemned"]
+        game.statement_prefix = data["statement_prefix"]
+        game.current_round_qa = data["current_round_qa"]
+        game.interrogation_plan = data.get("interrogation_plan")
+        game.speaking_order = data.get("speaking_order", game.speaking_order)
+        if game.completed_phase == "interrogation":
+            # 投票环节需要本轮档案，按照保存的质询记录重新构建
+            game.current_dossiers = build_round_dossiers(
+                game_state.current_round, game.alive_in_speaking_order(), game.current_round_qa
+            )
+        game.rng.setstate(decode_random_state(data["random_state"]))
+        
+        game.finished = data.get("finished", False)
+        return game
+
+    def resume_game(self):
+        """从检查点继续游戏"""
+        if self.finished:
+            print("该检查点对应的游戏已经结束，无需恢复")
+            return
+        
+        phase = self.completed_phase or "无"
+        print(f"\n=== 从检查点恢复游戏：第{self.game_state.current_round}轮，已完成阶段：{phase} ===\n")
+        self.run_game_loop()
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        """本局游戏的结果，用于批量运行时汇总统计"""
+        game_state = self.game_state
+        return {
+            "finished": self.finished,
+            "rounds": game_state.current_round,
+            "seat_order": [player.role_name for player in game_state.players],
+            "speaking_order": list(self.speaking_order),
+            "winners": [player.role_name for player in game_state.alive_players.values()] if self.finished else [],
+            "eliminations": [{"round": record["round"], "role_name": record["player"].role_name}
+                             for record in self.elimination_record],
+            "usage": {player.role_name: player.ai_controller.cache_stats()
+                      for player in game_state.players if player.ai_controller},
+            "events_path": self.events_path
+        }
 
     def statement_phase(self):
-        """陈述环节"""
-        print("\n--- 陈述环节开始 ---")
-        print("AI裁判: 陈述环节开始，每位玩家将轮流陈述")
-        time.sleep(1)
+        """陈述环节
+        
+        所有玩家的陈述同时生成，输出按发言顺序排列。质询按计划提前开始：对某位玩家的提问
+        只依赖发言顺序中截至该玩家的陈述，因此对先发言玩家的质询可以在后面的玩家生成陈述时
+        进行，结果在质询环节按顺序展示。
+        """
+        self.begin_phase("陈述环节")
+        self.judge_say("陈述环节开始，每位玩家将轮流陈述")
+        self.pace(1)
+        
+        speakers = self.alive_in_speaking_order()
+        # 作为参考的其他玩家陈述取自本轮开始前，各玩家的陈述互不依赖
+        round_start_statements = {p.name: p.fake_memory for p in self.game_state.alive_players.values()}
+        self.interrogation_plan = self.plan_interrogations()
+        
+        graph = CallGraph(self.executor)
+        with OutputSequencer(range(len(speakers)), label="陈述") as sequencer:
+            statement_futures = [
+                graph.add(partial(sequencer.run, index, self.present_statement, player, round_start_statements),
+                          provider=self.provider_of(player))
+                for index, player in enumerate(speakers)
+            ]
+            self.pending_interrogations = self.start_interrogations(graph, statement_futures)
+            for future in statement_futures:
+                future.result()
+        
+        # 本轮陈述已全部确定，构建质询环节共享的提示词前缀
+        self.statement_prefix = build_round_prefix(self.game_state.current_round, self.collect_round_statements())
+        
+        self.judge_say("陈述环节结束", newline=True)
+        self.pace(1)
+
+    def present_statement(self, player: Character, round_start_statements: Dict[str, str]) -> Tuple[str, str, Optional[str]]:
+        """生成并展示一位玩家本轮的陈述，返回 (角色名, 本轮陈述, 上一轮陈述)"""
+        print(f"\n{player.role_name}的陈述：")
+        
+        # 如果是调试模式，显示原始故事背景
+        if os.environ.get("DEBUG_MODE", "0") == "1":
+            print("原始故事背景：")
+            print(player.original_backstory)
+        
+        # 按照陈述复用策略，没有需要回应的变化时沿用上一轮的陈述
+        if player.is_ai and player.ai_controller and not self.statement_needs_update(player, self.game_state.current_round):
+            player.statement_history.append(player.fake_memory)
+            print(f"{player.role_name}沿用了第{player.statement_round}轮的陈述" if player.statement_round
+                  else f"{player.role_name}沿用了初始陈述")
+        
+        # 如果是AI玩家，可以根据游戏进程更新陈述
+        elif player.is_ai and player.ai_controller:
+            # 获取之前轮次的游戏记录，用于调整陈述
+            previous_rounds = self.game_state.round_history if self.game_state.current_round > 1 else None
+            
+            # 更新陈述内容 - 无论是第一轮还是后续轮次，都尝试生成虚构陈述
+            try:
+                inputs = self.statement_inputs(player, self.game_state.current_round, round_start_statements)
+                updated_statement = self.take_speculative_statement(player, inputs)
+                if updated_statement is None:
+                    backstory, round_num, other_statements, _ = inputs
+                    updated_statement = player.ai_controller.generate_fake_statement_based_on_backstory(
+                        backstory,
+                        current_round=round_num,
+                        other_statements=list(other_statements)
+                    )
+                player.fake_memory = updated_statement
+                player.statement_history.append(updated_statement)
+                player.statement_round = self.game_state.current_round
+                print(f"{player.role_name}生成了虚构陈述")
+            except Exception as e:
+                # 如果生成失败，使用预定义故事背景
+                print(f"生成虚构陈述失败：{str(e)}，使用原始背景")
+                if self.game_state.current_round > 1 and previous_rounds:
+                    # 如果不是第一轮，尝试更新陈述
+                    updated_statement = player.ai_controller.update_statement_with_backstory(
+                        player.fake_memory, 
+                        previous_rounds
+                    )
+                    player.fake_memory = updated_statement
+                    player.statement_history.append(updated_statement)
+                    player.statement_round = self.game_state.current_round
+                else:
+                    # 第一轮且生成失败，使用原始背景
+                    player.statement_history.append(player.fake_memory)
             
-        # 定义发言顺序
-        speaking_order = ["豆包", "Kimi", "DeepSeek", "Qwen", "GPT", "Claude", "Gemini", "Grok"]
+        print(f"陈述内容：{player.fake_memory}")
+        self.log_event(STATEMENT, player.role_name, text=player.fake_memory)
+        self.pace(2)
+        
+        previous = player.statement_history[-2] if len(player.statement_history) > 1 else None
+        return player.role_name, player.fake_memory, previous
+
+    def statement_needs_update(self, player: Character, round_num: int) -> bool:
+        """按照陈述复用策略判断玩家在第round_num轮是否需要重新生成陈述
+        
+        上一轮的质询和得票情况取自事件日志中该轮的统计。
+        """
+        policy = STATEMENT_REUSE_POLICY
+        if policy is None:
+            return True
+        max_rounds = policy.get("max_rounds")  # None表示不限制陈述沿用的轮数
+        if max_rounds is not None and round_num - player.statement_round >= max_rounds:
+            return True
         
-        # 按照指定顺序让玩家发言
-        for role_name in speaking_order:
-            # 找到对应角色的玩家
-            player = next((p for p in self.game_state.players if p.role_name == role_name and p.is_alive), None)
+        previous = self.game_state.event_log.rounds.get(round_num - 1)
+        if previous is None:
+            return False
+        role_name = player.role_name
+        if policy.get("regenerate_if_interrogated", True) and previous.questioned.get(role_name):
+            return True
+        if policy.get("regenerate_if_voted", True) and (previous.vote_tally.get(role_name) or previous.revote_tally.get(role_name)):
+            return True
+        return False
+
+    def statement_inputs(self, player: Character, round_num: int, round_start_statements: Dict[str, str]) -> Tuple:
+        """生成陈述所需的全部输入：(故事背景, 轮次, 作为参考的其他玩家陈述, 玩家的滚动记忆)"""
+        other_statements = ()
+        if round_num > 1:
+            # 收集其他玩家的陈述作为参考
+            other_statements = tuple(statement for name, statement in round_start_statements.items()
+                                     if name != player.name and statement)
+        memory = player.ai_controller.memory_prompt() if player.ai_controller else ""
+        return player.original_backstory, round_num, other_statements, memory
+
+    def start_speculative_statements(self):
+        """推测执行：按初次投票的统计预测被淘汰的玩家，提前为其余玩家生成下一轮陈述
+        
+        生成的陈述只有在下一轮的输入与推测时完全相同时才会使用，否则作废。
+        """
+        if not SPECULATIVE_STATEMENTS or self.executor is None:
+            return
+        alive_players = list(self.game_state.alive_players.values())
+        if len(alive_players) - 1 <= 2:  # 淘汰后游戏结束，没有下一轮
+            return
+        
+        predicted = max(self.voting_results, key=self.voting_results.get)
+        next_round = self.game_state.current_round + 1
+        round_start_statements = {p.name: p.fake_memory for p in alive_players if p.name != predicted}
+        for player in alive_players:
+            if player.name == predicted or not (player.is_ai and player.ai_controller):
+                continue
+            if not self.statement_needs_update(player, next_round):
+                continue
+            inputs = self.statement_inputs(player, next_round, round_start_statements)
+            output = DeferredOutput().start()
+            future = self.executor.submit(output.run, self.speculate_statement, player, inputs)
+            self.speculative_statements[player.name] = (inputs, output, future)
+            self.speculation_stats["started"] += 1
+
+    def speculate_statement(self, player: Character, inputs: Tuple) -> Tuple[str, List[Dict]]:
+        """生成推测的陈述，返回 (陈述, 这些请求的用量记录)"""
+        backstory, round_num, other_statements, _ = inputs
+        with tagged_calls("speculative") as usage:
+            statement = player.ai_controller.generate_fake_statement_based_on_backstory(
+                backstory, current_round=round_num, other_statements=list(other_statements)
+            )
+        return statement, usage
+
+    def take_speculative_statement(self, player: Character, inputs: Tuple) -> Optional[str]:
+        """取出输入与本次完全相同的推测结果并输出其缓存的内容，没有可用的结果时返回None"""
+        speculation = self.speculative_statements.pop(player.name, None)
+        if speculation is None:
+            return None
+        speculated_inputs, output, future = speculation
+        if speculated_inputs != inputs or future.exception() is not None:
+            self.speculation_stats["misses"] += 1
+            self.discard_speculation(output, future)
+            return None
+        
+        statement, _ = future.result()
+        self.speculation_stats["hits"] += 1
+        output.close()
+        return statement
+
+    def cancel_speculation(self, name: str):
+        """取消某位玩家的推测执行，用于被淘汰的玩家"""
+        speculation = self.speculative_statements.pop(name, None)
+        if speculation is not None:
+            self.speculation_stats["cancelled"] += 1
+            _, output, future = speculation
+            self.discard_speculation(output, future)
+
+    def discard_speculation(self, output: DeferredOutput, future):
+        """作废推测结果：尚未开始的请求直接取消，已经开始的请求在完成后统计浪费的token"""
+        def on_done(done):
+            output.discard()
+            if done.cancelled() or done.exception() is not None:
+                return
+            _, usage = done.result()
+            with self.speculation_lock:
+                self.speculation_stats["wasted_tokens"] += sum(
+                    entry["prompt_tokens"] + entry["completion_tokens"] for entry in usage)
+        
+        future.cancel()
+        future.add_done_callback(on_done)
+
+    def provider_of(self, player: Character) -> str:
+        """玩家所属的服务商，用于限制同一服务商的并发请求数"""
+        return player.ai_controller.base_url if player.ai_controller else ""
+
+    def alive_in_speaking_order(self) -> List[Character]:
+        """按发言顺序返回存活玩家"""
+        players = []
+        for role_name in self.speaking_order:
+            player = self.game_state.get_alive_player_by_role(role_name)
             if player:
-                print(f"\n{player.role_name}的陈述：")
-                
-                # 如果是调试模式，显示原始故事背景
-                if os.environ.get("DEBUG_MODE", "0") == "1":
-                    print("原始故事背景：")
-                    print(player.original_backstory)
-                
-                # 如果是AI玩家，可以根据游戏进程更新陈述
-                if player.is_ai and player.ai_controller:
-                    # 获取之前轮次的游戏记录，用于调整陈述
-                    previous_rounds = self.game_state.round_history if self.game_state.current_round > 1 else None
-                    
-                    # 更新陈述内容 - 无论是第一轮还是后续轮次，都尝试生成虚构陈述
-                    try:
-                        # 收集其他玩家的陈述作为参考
-                        other_statements = []
-                        if self.game_state.current_round > 1:
-                            for other_player in self.game_state.players:
-                                if other_player != player and other_player.is_alive and other_player.fake_memory:
-                                    other_statements.append(other_player.fake_memory)
-                        
-                        updated_statement = player.ai_controller.generate_fake_statement_based_on_backstory(
-                            player.original_backstory,
-                            current_round=self.game_state.current_round,
-                            other_statements=other_statements
-                        )
-                        player.fake_memory = updated_statement
-                        player.statement_history.append(updated_statement)
-                        print(f"{player.role_name}生成了虚构陈述")
-                    except Exception as e:
-                        # 如果生成失败，使用预定义故事背景
-                        print(f"生成虚构陈述失败：{str(e)}，使用原始背景")
-                        if self.game_state.current_round > 1 and previous_rounds:
-                            # 如果不是第一轮，尝试更新陈述
-                            updated_statement = player.ai_controller.update_statement_with_backstory(
-                                player.fake_memory, 
-                                previous_rounds
-                            )
-                            player.fake_memory = updated_statement
-                            player.statement_history.append(updated_statement)
-                        else:
-                            # 第一轮且生成失败，使用原始背景
-                            player.statement_history.append(player.fake_memory)
-                    
-                print(f"陈述内容：{player.fake_memory}")
-                time.sleep(2)
+                players.append(player)
+        return players
+
+    def collect_round_statements(self) -> List[Tuple[str, str, Optional[str]]]:
+        """按发言顺序收集存活玩家的 (角色名, 本轮陈述, 上一轮陈述)，用于构建共享前缀"""
+        statements = []
+        for player in self.alive_in_speaking_order():
+            previous = player.statement_history[-2] if len(player.statement_history) > 1 else None
+            statements.append((player.role_name, player.fake_memory, previous))
+        return statements
+
+    def plan_interrogations(self) -> List[Dict[str, Any]]:
+        """按配置的质询策略和预算确定本轮的质询，以及每次质询使用的随机数种子"""
+        pairs = plan_round(list(self.game_state.alive_players), self.game_state.round_history, self.rng,
+                           strategy=INTERROGATION_STRATEGY, budget=INTERROGATION_BUDGET)
+        return [{"questioner": questioner, "target": target, "seed": self.rng.getrandbits(64)}
+                for questioner, target in pairs]
+
+    def start_interrogations(self, graph: CallGraph, statement_futures: List) -> List[Tuple[DeferredOutput, Any, Any]]:
+        """按质询计划向调度器添加提问和回答请求
+        
+        提问依赖发言顺序中截至被质询者的陈述，回答依赖提问。每次质询的输出先缓存起来，
+        在质询环节按计划顺序展示。
         
-        print("\nAI裁判: 陈述环节结束")
-        time.sleep(1)
+        Returns:
+            每次质询的 (缓存的输出, 提问的Future, 回答的Future)
+        """
+        position = {player.name: index for index, player in enumerate(self.alive_in_speaking_order())}
+        pending = []
+        for entry in self.interrogation_plan:
+            questioner = self.game_state.get_player(entry["questioner"])
+            target = self.game_state.get_player(entry["target"])
+            rng = random.Random(entry["seed"])
+            output = DeferredOutput().start()
+            
+            deps = statement_futures[:position.get(target.name, len(statement_futures) - 1) + 1]
+            question = graph.add(partial(output.run, self.ask_question, questioner, target, rng),
+                                 deps=deps, provider=self.provider_of(questioner))
+            answer = graph.add(partial(output.run, self.answer_question, questioner, target, rng),
+                               deps=[question], provider=self.provider_of(target))
+            pending.append((output, question, answer))
+        return pending
 
-    def interrogation_phase(self):
-        """质询环节"""
-        print("\n--- 质询环节开始 ---")
-        print("AI裁判: 质询环节开始，每位玩家将有机会质询其他玩家")
-        time.sleep(1)
+    def ask_question(self, questioner: Character, target: Character, rng: random.Random, *statements) -> Tuple[str, str]:
+        """生成质询问题，返回 (问题, 使用的共享前缀)"""
+        prefix = build_round_prefix(self.game_state.current_round, list(statements))
+        print(f"\n{questioner.role_name}正在质询{target.role_name}...")
+        
+        # 使用AI生成质询问题，确保传递完整的target陈述
+        if questioner.is_ai and questioner.ai_controller:
+            question = questioner.ai_controller.generate_question(
+                questioner.role_name, 
+                target.role_name, 
+                target.fake_memory, 
+                target.trauma,  # 使用创伤作为职业描述，增加信息量
+                shared_prefix=prefix
+            )
+        else:
+            # 如果不是AI玩家，使用预设问题列表
+            questions = [
+                f"你提到的{rng.choice(['经历', '动机', '背景'])}是否真实？",
+                "你能详细描述一下你的具体经历吗？",
+                "为什么你会有这样的秘密动机？",
+                "你的陈述中有什么是你没有告诉我们的？"
+            ]
+            question = rng.choice(questions)
+        
+        # 确保问题不为空，如果API调用失败则使用备选问题
+        if not question or len(question.strip()) == 0:
+            question = f"你在陈述中提到的{rng.choice(['事件', '背景', '动机'])}真的可信吗？"
+            
+        print(f"{questioner.role_name}: {question}")
+        self.log_event(QUESTION, questioner.role_name, target.role_name, question)
+        self.pace(1)
+        return question, prefix
+
+    def answer_question(self, questioner: Character, target: Character, rng: random.Random, asked: Tuple[str, str]) -> str:
+        """被质询者回答问题"""
+        question, prefix = asked
+        
+        # 如果是AI玩家，使用AI生成回答
+        if target.is_ai and target.ai_controller:
+            response = target.ai_controller.answer_interrogation(
+                target.role_name, questioner.role_name, question,
+                shared_prefix=prefix
+            )
+        else:
+            responses = [
+                "我...我说的都是真的...",
+                "这个细节可能有些模糊了，但我确实经历过...",
+                "让我想想，怎么解释更清楚...",
+                "我确定我没有隐瞒任何事情..."
+            ]
+            response = rng.choice(responses)
+        
+        # 确保回答不为空
+        if not response or len(response.strip()) == 0:
+            response = "这是个复杂的问题...让我思考一下如何回答。"
             
-        alive_players = [p for p in self.game_state.players if p.is_alive]
+        print(f"{target.role_name}: {response}")
+        self.log_event(ANSWER, target.role_name, questioner.role_name, response)
+        self.pace(1)
+        return response
+
+    def interrogation_phase(self):
+        """质询环节
+        
+        质询请求通常已经在陈述环节按计划开始，这里按计划顺序展示结果并记录。
+        """
+        self.begin_phase("质询环节")
+        self.judge_say("质询环节开始，每位玩家将有机会质询其他玩家")
+        self.pace(1)
+        
+        pending = self.pending_interrogations
+        self.pending_interrogations = None
+        if pending is None:
+            # 从检查点恢复时没有提前开始的质询，本轮陈述已经全部确定
+            if self.interrogation_plan is None:
+                self.interrogation_plan = self.plan_interrogations()
+            statement_futures = [completed(statement) for statement in self.collect_round_statements()]
+            pending = self.start_interrogations(CallGraph(self.executor), statement_futures)
         
         # 记录本轮质询内容
         interrogation_records = []
+        # 使用角色名记录的质询内容，用于构建玩家档案
+        round_qa = []
+        self.current_round_qa = round_qa
         
-        for questioner in alive_players:
-            # 随机选择一个质询目标，确保不是自己
-            target = random.choice([p for p in alive_players if p != questioner])
-            print(f"\n{questioner.role_name}正在质询{target.role_name}...")
-            
-            # 使用AI生成质询问题，确保传递完整的target陈述
-            if questioner.is_ai and questioner.ai_controller:
-                question = questioner.ai_controller.generate_question(
-                    questioner.role_name, 
-                    target.role_name, 
-                    target.fake_memory, 
-                    target.trauma  # 使用创伤作为职业描述，增加信息量
-                )
-            else:
-                # 如果不是AI玩家，使用预设问题列表
-                questions = [
-                    f"你提到的{random.choice(['经历', '动机', '背景'])}是否真实？",
-                    "你能详细描述一下你的具体经历吗？",
-                    "为什么你会有这样的秘密动机？",
-                    "你的陈述中有什么是你没有告诉我们的？"
-                ]
-                question = random.choice(questions)
-            
-            # 确保问题不为空，如果API调用失败则使用备选问题
-            if not question or len(question.strip()) == 0:
-                question = f"你在陈述中提到的{random.choice(['事件', '背景', '动机'])}真的可信吗？"
-                
-            print(f"{questioner.role_name}: {question}")
-            time.sleep(1)
-            
-            # 如果是AI玩家，使用AI生成回答
-            if target.is_ai and target.ai_controller:
-                response = target.ai_controller.answer_interrogation(
-                    target.role_name, questioner.role_name, question
-                )
-            else:
-                responses = [
-                    "我...我说的都是真的...",
-                    "这个细节可能有些模糊了，但我确实经历过...",
-                    "让我想想，怎么解释更清楚...",
-                    "我确定我没有隐瞒任何事情..."
-                ]
-                response = random.choice(responses)
-            
-            # 确保回答不为空
-            if not response or len(response.strip()) == 0:
-                response = "这是个复杂的问题...让我思考一下如何回答。"
-                
-            print(f"{target.role_name}: {response}")
-            time.sleep(1)
+        for entry, (output, question_future, answer_future) in zip(self.interrogation_plan, pending):
+            questioner = self.game_state.get_player(entry["questioner"])
+            target = self.game_state.get_player(entry["target"])
+            response = answer_future.result()
+            question, _ = question_future.result()
+            output.close()
             
             # 记录质询内容
             interrogation_record = {
@@ -391,6 +897,12 @@ class GameManager:
                 "response": response
             }
             interrogation_records.append(interrogation_record)
+            round_qa.append({
+                "questioner": questioner.role_name,
+                "target": target.role_name,
+                "question": question,
+                "response": response
+            })
             
             # 将质询记录添加到目标玩家的质询历史中
             target.interrogation_history.append(interrogation_record)
@@ -399,152 +911,143 @@ class GameManager:
             target.stress_level += 1
             if target.stress_level >= 3:
                 print(f"{target.role_name}表现出明显的紧张症状...")
-                time.sleep(1)
+                self.pace(1)
             
-            time.sleep(1)
+            self.pace(1)
+        self.interrogation_plan = None
         
         # 将本轮质询记录添加到游戏状态中
-        self.game_state.round_history.append({"round": self.game_state.current_round, "interrogations": interrogation_records})
+        self.game_state.round_record(self.game_state.current_round)["interrogations"] = interrogation_records
+        
+        # 本轮陈述和质询均已确定，一次性构建所有玩家的档案
+        self.current_dossiers = build_round_dossiers(
+            self.game_state.current_round, self.alive_in_speaking_order(), round_qa
+        )
+        self.update_memories_after_interrogation(interrogation_records)
         
-        print("\nAI裁判: 质询环节结束")
-        time.sleep(1)
+        self.judge_say("质询环节结束", newline=True)
+        self.pace(1)
+
+    def update_memories_after_interrogation(self, interrogation_records: List[Dict[str, str]]):
+        """把本轮的陈述和质询加入玩家的滚动记忆
+        
+        陈述和质询请求在陈述环节就已经并发开始，因此两者的记忆都在质询环节结束后一起更新，
+        本轮的请求看到的都是上一轮结束时的记忆。
+        """
+        round_num = self.game_state.current_round
+        for player in self.alive_in_speaking_order():
+            if player.ai_controller:
+                player.ai_controller.remember(round_num, "陈述", player.fake_memory)
+        for record in interrogation_records:
+            questioner = self.game_state.get_player(record["questioner"])
+            target = self.game_state.get_player(record["target"])
+            if questioner.ai_controller:
+                questioner.ai_controller.remember(round_num, "提问", f"你问{target.role_name}：{record['question']}")
+            if target.ai_controller:
+                target.ai_controller.remember(round_num, "被质询",
+                                              f"{questioner.role_name}问：{record['question']} 你答：{record['response']}")
+
+    def update_memories_after_voting(self, voting_records: List[Dict[str, str]]):
+        """把本轮的初次投票加入玩家的滚动记忆，在推测下一轮陈述之前更新"""
+        round_num = self.game_state.current_round
+        for record in voting_records:
+            voter = self.game_state.get_player(record["voter"])
+            if voter.ai_controller:
+                voter.ai_controller.remember(round_num, "投票",
+                                             f"投给{self.game_state.role_of(record['target'])}：{record['reason']}")
 
     def voting_phase(self):
         """投票环节"""
-        print("\n--- 投票环节开始 ---")
+        self.begin_phase("投票环节")
         
-        print("AI裁判: 投票环节开始，每位玩家将依次投票")
-        time.sleep(1)
+        self.judge_say("投票环节开始，每位玩家将依次投票")
+        self.pace(1)
             
-        alive_players = [p for p in self.game_state.players if p.is_alive]
+        alive_players = list(self.game_state.alive_players.values())
         self.voting_results = {p.name: 0 for p in alive_players}
         
-        # 记录每个玩家投票给谁的字典及投票理由
-        voting_details = {}
-        voting_reasons = {}
         voting_records = []
         
-        # 收集当前轮次所有玩家的陈述内容和问答记录，用于投票决策
-        player_statements = {}
-        for player in alive_players:
-            player_statements[player.name] = {
-                "name": player.name,
-                "role_name": player.role_name,
-                "trauma": player.trauma,
-                "secret_motive": player.secret_motive,
-                "statement": player.fake_memory
-            }
+        # 使用质询环节结束后构建的玩家档案，所有投票者共享同一个前缀
+        dossiers = self.current_dossiers
+        vote_prefix = dossiers.vote_prefix
         
-        # 收集当前轮次的问答记录
-        current_round_qa = []
-        if self.game_state.round_history and len(self.game_state.round_history) > 0:
-            # 获取最新一轮的问答记录
-            current_round = self.game_state.current_round
-            for round_data in self.game_state.round_history:
-                if round_data.get("round") == current_round and "interrogations" in round_data:
-                    for qa in round_data["interrogations"]:
-                        questioner_name = next((p.role_name for p in self.game_state.players if p.name == qa["questioner"]), "未知")
-                        target_name = next((p.role_name for p in self.game_state.players if p.name == qa["target"]), "未知")
-                        current_round_qa.append({
-                            "questioner": questioner_name,
-                            "target": target_name,
-                            "question": qa["question"],
-                            "response": qa["response"]
-                        })
-        
-        for voter in alive_players:
+        def cast_vote(task):
+            voter, rng = task
             # 排除自己
             possible_targets = [p for p in alive_players if p != voter]
             
             if voter.is_ai and voter.ai_controller:
-                # 如果是AI玩家，使用AI进行投票
-                other_player_info = []
-                for p in possible_targets:
-                    # 为每个候选玩家准备信息
-                    player_info = player_statements.get(p.name, {})
-                    
-                    # 找出与该玩家相关的问答
-                    player_qa = []
-                    for qa in current_round_qa:
-                        if qa["target"] == p.role_name:
-                            player_qa.append(f"{qa['questioner']}问: {qa['question']}\n{qa['target']}答: {qa['response']}")
-                        # 也添加该玩家作为提问者的记录
-                        elif qa["questioner"] == p.role_name:
-                            player_qa.append(f"{qa['questioner']}对{qa['target']}提问: {qa['question']}\n{qa['target']}回答: {qa['response']}")
-                    
-                    # 添加历史陈述记录，如果有的话
-                    if hasattr(p, 'statement_history') and p.statement_history:
-                        player_info["statement_history"] = p.statement_history[-2:] if len(p.statement_history) > 1 else p.statement_history  # 最多保留最近两次陈述
-                    
-                    player_info["qa_history"] = player_qa
-                    other_player_info.append(player_info)
+                # 如果是AI玩家，使用AI进行投票，候选玩家信息直接取自本轮档案
+                other_player_info = dossiers.player_infos([p.name for p in possible_targets])
                 
                 print(f"DEBUG - {voter.role_name}正在进行投票分析...")
-                vote_result = voter.ai_controller.vote(other_player_info)
+                vote_result = voter.ai_controller.vote(other_player_info, shared_prefix=vote_prefix)
                 
                 # 解析AI的投票结果，获取目标和理由
                 if isinstance(vote_result, dict) and "target" in vote_result:
                     target_name = vote_result["target"]
                     vote_reason = vote_result.get("reason", "未提供理由")
                     # 确保target_name是有效的玩家名称
-                    target = next((p for p in possible_targets if p.name == target_name), None)
-                    if target:
-                        voting_reasons[voter.name] = vote_reason
-                    else:
+                    target = self.game_state.get_player(target_name)
+                    if not (target and target.is_alive and target != voter):
                         print(f"警告: 投票目标 {target_name} 无效，随机选择一个目标")
-                        target = random.choice(possible_targets)
-                        voting_reasons[voter.name] = "投票目标无效，随机选择"
+                        target = rng.choice(possible_targets)
+                        vote_reason = "投票目标无效，随机选择"
                 else:
                     # 兼容旧版本返回格式或处理失败情况
                     print(f"警告: {voter.role_name}的投票结果格式无效，随机选择一个目标")
-                    target = random.choice(possible_targets)
-                    voting_reasons[voter.name] = "投票分析失败，随机选择"
+                    target = rng.choice(possible_targets)
+                    vote_reason = "投票分析失败，随机选择"
             else:
-                target = random.choice(possible_targets)
-                voting_reasons[voter.name] = "直觉判断"
+                target = rng.choice(possible_targets)
+                vote_reason = "直觉判断"
             
-            # 记录投票详情
-            voting_details[voter.name] = target.name
-            self.voting_results[target.name] += 1
+            # 显示投票情况并让AI裁判确认
+            print(f"{voter.role_name} 投票给了 {target.role_name}，理由：{vote_reason}")
+            self.log_event(VOTE, voter.role_name, target.role_name, vote_reason)
             
+            # AI裁判对每次投票的确认
+            self.judge_comment("vote",
+                               voter=voter.role_name,
+                               target=target.role_name,
+                               target_dossier=dossiers.by_name.get(target.name))
+            return voter, target.name, vote_reason
+        
+        # 所有玩家同时投票，输出按投票顺序排列；每位投票者使用独立的随机数生成器，
+        # 随机选择的结果不受请求完成顺序影响
+        tasks = [VoterTask(voter, random.Random(self.rng.getrandbits(64))) for voter in alive_players]
+        results, abstained = collect_votes(self.executor, tasks, cast_vote, self.voting_results,
+                                           early_termination=EARLY_VOTE_TERMINATION, label="投票")
+        self.record_abstentions(abstained, "投票")
+        
+        for voter, target_name, vote_reason in results:
             # 添加到投票记录
             voting_record = {
                 "voter": voter.name,
-                "target": target.name,
-                "reason": voting_reasons[voter.name]
+                "target": target_name,
+                "reason": vote_reason
             }
             voting_records.append(voting_record)
             voter.vote_history.append(voting_record)
-            
-            # 显示投票情况并让AI裁判确认
-            print(f"{voter.role_name} 投票给了 {target.role_name}，理由：{voting_reasons[voter.name]}")
-            
-            # AI裁判对每次投票的确认
-            vote_comment = self.get_judge_comment("vote", 
-                                               voter=voter.role_name, 
-                                               target=target.role_name)
-            if vote_comment:
-                print(f"AI裁判: {vote_comment}")
-                time.sleep(0.5)
+        self.update_memories_after_voting(voting_records)
         
         # 统计并显示投票结果
         vote_summary = []
         for player_name, votes in self.voting_results.items():
-            player = next(p for p in self.game_state.players if p.name == player_name)
-            vote_summary.append(f"{player.role_name}: {votes}票")
+            vote_summary.append(f"{self.game_state.role_of(player_name)}: {votes}票")
         
         vote_summary_str = ", ".join(vote_summary)
         print("\n投票统计结果：")
         print(vote_summary_str)
+        self.log_event(VOTE_SUMMARY, "投票", text=vote_summary_str)
+        self.start_speculative_statements()
         
         # AI裁判统计票数
-        voting_summary_comment = self.get_judge_comment("voting_summary", vote_summary=vote_summary_str)
-        if voting_summary_comment:
-            print(f"AI裁判: {voting_summary_comment}")
-            time.sleep(1)
+        self.judge_comment("voting_summary", vote_summary=vote_summary_str)
         
         # 将本轮投票记录添加到游戏状态中
-        self.game_state.round_history[-1]["votes"] = voting_records
+        self.game_state.round_record(self.game_state.current_round)["votes"] = voting_records
         
         # 找出最高票数并处理平票情况
         has_clear_winner = False
@@ -560,11 +1063,11 @@ class GameManager:
                 has_clear_winner = True
                 if len(most_voted) > 1:
                     print(f"\n经过{revote_count}轮重新投票后仍然平票！最终随机选择一名玩家...")
-                    self.current_condemned = random.choice(most_voted)
+                    self.current_condemned = self.rng.choice(most_voted)
                     
                     # 显示随机选择结果
-                    chosen_player = next(p.role_name for p in self.game_state.players if p.name == self.current_condemned)
-                    print(f"AI裁判: 随机选择结果：{chosen_player}被淘汰。")
+                    chosen_player = self.game_state.role_of(self.current_condemned)
+                    self.judge_say(f"随机选择结果：{chosen_player}被淘汰。")
                 else:
                     self.current_condemned = most_voted[0]
             else:
@@ -573,111 +1076,90 @@ class GameManager:
                 print(f"\n出现平票！进行第{revote_count}轮重新投票...")
                 
                 # 显示平票情况
-                tied_players_names = [next(p.role_name for p in self.game_state.players if p.name == name) for name in most_voted]
-                print(f"AI裁判: 平票玩家: {', '.join(tied_players_names)}")
-                time.sleep(1)
+                tied_players_names = [self.game_state.role_of(name) for name in most_voted]
+                self.judge_say(f"平票玩家: {', '.join(tied_players_names)}")
+                self.pace(1)
                 
                 # 重置投票结果，只针对平票的玩家
                 tied_players = [p for p in most_voted]
                 self.voting_results = {p: 0 for p in tied_players}
                 
-                # 新增：记录重新投票的详情
-                revote_details = {}
+                engine = RevoteEngine(self.executor, tied_players)
                 
-                # 只有存活的玩家可以投票
-                alive_players = [p for p in self.game_state.players if p.is_alive]
-                
-                for voter in alive_players:
-                    # 如果是AI玩家，使用AI进行投票
-                    if voter.is_ai and voter.ai_controller:
-                        # 为平票的玩家准备信息
-                        tied_player_info = []
-                        for tied_name in tied_players:
-                            tied_player = next((p for p in self.game_state.players if p.name == tied_name), None)
-                            if tied_player:
-                                player_info = {
-                                    "name": tied_player.name,
-                                    "role_name": tied_player.role_name,
-                                    "trauma": tied_player.trauma,
-                                    "secret_motive": tied_player.secret_motive,
-                                    "statement": tied_player.fake_memory
-                                }
-                                
-                                # 找出与该玩家相关的问答
-                                player_qa = []
-                                for qa in current_round_qa:
-                                    if qa["target"] == tied_player.role_name:
-                                        player_qa.append(f"{qa['questioner']}问: {qa['question']}\n{qa['target']}答: {qa['response']}")
-                                    # 也添加该玩家作为提问者的记录
-                                    elif qa["questioner"] == tied_player.role_name:
-                                        player_qa.append(f"{qa['questioner']}对{qa['target']}提问: {qa['question']}\n{qa['target']}回答: {qa['response']}")
-                                
-                                # 添加历史陈述记录，如果有的话
-                                if hasattr(tied_player, 'statement_history') and tied_player.statement_history:
-                                    player_info["statement_history"] = tied_player.statement_history[-2:] if len(tied_player.statement_history) > 1 else tied_player.statement_history  # 最多保留最近两次陈述
-                                
-                                player_info["qa_history"] = player_qa
-                                tied_player_info.append(player_info)
-                        
-                        vote_result = voter.ai_controller.vote(tied_player_info)
-                        
-                        if isinstance(vote_result, dict) and "target" in vote_result:
-                            target_name = vote_result["target"]
-                        else:
-                            target_name = vote_result.strip()
-                            
-                        target = next((p for p in tied_players if p == target_name), random.choice(tied_players))
+                def cast_revote(task, engine=engine):
+                    voter, rng = task
+                    options = engine.options(voter.name)
+                    if len(options) == 1:
+                        # 平票玩家只剩一个可选对象，无需请求
+                        target = options[0]
+                    elif voter.is_ai and voter.ai_controller:
+                        # 平票玩家的信息直接取自本轮档案，只要求回答角色名
+                        target = voter.ai_controller.revote(dossiers.player_infos(options), shared_prefix=vote_prefix)
+                        if target not in options:
+                            target = rng.choice(options)
                     else:
-                        target = random.choice(tied_players)
-                    
-                    # 记录重新投票详情
-                    revote_details[voter.name] = target
-                    self.voting_results[target] += 1
+                        target = rng.choice(options)
                 
                     # 显示重新投票情况并让AI裁判确认
                     voter_role = voter.role_name
-                    target_role = next(p.role_name for p in self.game_state.players if p.name == target)
+                    target_role = self.game_state.role_of(target)
                     print(f"{voter_role} 投票给了 {target_role}")
+                    self.log_event(REVOTE, voter_role, target_role)
                     
                     # AI裁判确认重新投票
-                    vote_comment = self.get_judge_comment("vote", 
-                                                       voter=voter_role, 
-                                                       target=target_role)
-                    if vote_comment:
-                        print(f"AI裁判: {vote_comment}")
-                        time.sleep(0.5)
+                    self.judge_comment("vote",
+                                       voter=voter_role,
+                                       target=target_role,
+                                       target_dossier=dossiers.by_name.get(target))
+                    return voter, target
+                
+                # 只有存活的玩家可以投票
+                tasks = [VoterTask(voter, random.Random(self.rng.getrandbits(64)))
+                         for voter in self.game_state.alive_players.values()]
+                _, abstained = engine.run(tasks, cast_revote, self.voting_results)
+                self.record_abstentions(abstained, f"第{revote_count}轮重新投票")
                 
                 # 统计并显示重新投票结果
                 revote_summary = []
                 for player_name, votes in self.voting_results.items():
-                    player_role = next(p.role_name for p in self.game_state.players if p.name == player_name)
-                    revote_summary.append(f"{player_role}: {votes}票")
+                    revote_summary.append(f"{self.game_state.role_of(player_name)}: {votes}票")
                 
                 revote_summary_str = ", ".join(revote_summary)
                 print("\n重新投票统计结果：")
                 print(revote_summary_str)
+                self.log_event(VOTE_SUMMARY, "重新投票", text=revote_summary_str)
                 
                 # AI裁判统计重新投票结果
-                voting_summary_comment = self.get_judge_comment("voting_summary", vote_summary=revote_summary_str)
-                if voting_summary_comment:
-                    print(f"AI裁判: {voting_summary_comment}")
-                    time.sleep(1)
+                self.judge_comment("voting_summary", vote_summary=revote_summary_str)
         
-        condemned_player = next(p for p in self.game_state.players if p.name == self.current_condemned)
+        # 宣布结果前输出还没有输出的裁判评论，超时的评论丢弃
+        self.commentary.drain()
+        condemned_player = self.game_state.get_player(self.current_condemned)
         print(f"\n被处决者：{condemned_player.role_name}")
-        print(f"AI裁判: {condemned_player.role_name}获得了最高票数（{self.voting_results[self.current_condemned]}票），将被淘汰。")
+        self.judge_say(f"{condemned_player.role_name}获得了最高票数（{self.voting_results[self.current_condemned]}票），将被淘汰。")
+
+    def record_abstentions(self, abstained: List["VoterTask"], stage: str):
+        """记录因投票结果已确定而没有投票的玩家"""
+        if not abstained:
+            return
+        print(f"\n投票结果已确定，{len(abstained)}名玩家无需投票")
+        abstentions = self.game_state.round_record(self.game_state.current_round).setdefault("abstentions", [])
+        for voter, _ in abstained:
+            print(f"{voter.role_name} 弃权")
+            abstentions.append({"voter": voter.name, "stage": stage})
+            self.log_event(ABSTAIN, voter.role_name, text=f"{stage}结果已确定")
 
     def elimination_phase(self):
         """淘汰阶段"""
-        print("\n--- 淘汰阶段 ---")
+        self.begin_phase("淘汰阶段")
         
-        print("AI裁判: 淘汰阶段开始")
-        time.sleep(1)
+        self.judge_say("淘汰阶段开始")
+        self.pace(1)
         
         # 找到被淘汰的玩家
-        eliminated_player = next(p for p in self.game_state.players if p.name == self.current_condemned)
-        eliminated_player.is_alive = False
-        self.game_state.eliminated_players.append(eliminated_player)
+        eliminated_player = self.game_state.get_player(self.current_condemned)
+        self.game_state.eliminate_player(eliminated_player)
+        self.cancel_speculation(eliminated_player.name)
         
         # 记录本轮被淘汰的玩家
         self.elimination_record.append({
@@ -685,9 +1167,11 @@ class GameManager:
             "player": eliminated_player
         })
         
+        self.log_event(ELIMINATION, eliminated_player.role_name)
+        
         print(f"\n{eliminated_player.role_name}被淘汰，无法逃离地牢...")
-        print(f"AI裁判: {eliminated_player.role_name}已被淘汰")
-        time.sleep(1)
+        self.judge_say(f"{eliminated_player.role_name}已被淘汰")
+        self.pace(1)
             
         print("\n幸存者的评论：")
         
@@ -698,30 +1182,29 @@ class GameManager:
             "我们必须继续前进，才能找到逃离的方法..."
         ]
         
-        print(random.choice(comments))
-        time.sleep(2)
+        print(self.rng.choice(comments))
+        self.pace(2)
         
-        remaining_players = len([p for p in self.game_state.players if p.is_alive])
-        print(f"AI裁判: 淘汰阶段结束，剩余{remaining_players}名玩家")
+        remaining_players = len(self.game_state.alive_players)
+        self.judge_say(f"淘汰阶段结束，剩余{remaining_players}名玩家")
 
     def record_round_history(self):
         """记录本轮游戏历史"""
-        # 确保本轮历史已经创建
-        if not self.game_state.round_history or self.game_state.round_history[-1]["round"] != self.game_state.current_round:
-            self.game_state.round_history.append({"round": self.game_state.current_round})
+        round_record = self.game_state.round_record(self.game_state.current_round)
             
         # 添加淘汰记录
         if self.elimination_record and self.elimination_record[-1]["round"] == self.game_state.current_round:
-            self.game_state.round_history[-1]["eliminated"] = self.elimination_record[-1]["player"].name
+            round_record["eliminated"] = self.elimination_record[-1]["player"].name
 
     def end_game(self):
         """游戏结束"""
-        winners = [p for p in self.game_state.players if p.is_alive]
+        winners = list(self.game_state.alive_players.values())
         print(f"\n=== 游戏结束 ===\n")
         print(f"恭喜！{winners[0].role_name} 和 {winners[1].role_name} 成功逃离地牢！")
+        self.log_event(GAME_END, "、".join(winner.role_name for winner in winners))
         
-        print(f"AI裁判: 游戏结束，{winners[0].role_name} 和 {winners[1].role_name} 是最后的幸存者。")
-        time.sleep(1)
+        self.judge_say(f"游戏结束，{winners[0].role_name} 和 {winners[1].role_name} 是最后的幸存者。")
+        self.pace(1)
         
         # 展示每轮淘汰记录
         print("\n=== 淘汰记录 ===\n")
@@ -735,13 +1218,13 @@ class GameManager:
         print("\n=== 真相揭露 ===")
         print("地牢守卫揭露了一个惊人的事实：所有玩家都被告知自己是唯一的'说谎者'...")
         
-        print("AI裁判: 真相揭露，所有玩家都被告知自己是唯一的'说谎者'。")
-        time.sleep(1)
+        self.judge_say("真相揭露，所有玩家都被告知自己是唯一的'说谎者'。")
+        self.pace(1)
         
         for winner in winners:
             reaction = f"{winner.role_name}: 原来如此...这一切都是一场心理博弈。我们每个人都在试图掩盖自己的'说谎者'身份..."
             print(reaction)
-            time.sleep(1)
+            self.pace(1)
         
         print("\n恭喜！你们两位成功逃离了地牢！")
         
@@ -761,79 +1244,78 @@ class GameManager:
         game_context = self.collect_game_context()
         print(f"已收集游戏上下文，共{len(game_context)}字符")
         
-        # 每位获胜者进行游戏复盘
-        for winner in winners:
-            if winner.is_ai and winner.ai_controller:
-                print(f"\n{winner.role_name}的游戏复盘：")
-                review = winner.ai_controller.review_game(
-                    name=winner.role_name,
-                    trauma=winner.trauma,
-                    secret_motive=winner.secret_motive,
-                    memory=winner.fake_memory,
-                    final_score=100.0,  # 设置一个默认分数
-                    elimination_record=elimination_record_str,
-                    game_context=game_context
-                )
-                print(review)
-                time.sleep(1)
+        # 获胜者同时进行游戏复盘，输出按获胜者顺序排列
+        def review(winner):
+            print(f"\n{winner.role_name}的游戏复盘：")
+            review = winner.ai_controller.review_game(
+                name=winner.role_name,
+                trauma=winner.trauma,
+                secret_motive=winner.secret_motive,
+                memory=winner.fake_memory,
+                final_score=100.0,  # 设置一个默认分数
+                elimination_record=elimination_record_str,
+                game_context=game_context
+            )
+            print(review)
+            self.log_event(REVIEW, winner.role_name, text=review)
+        
+        reviewers = [winner for winner in winners if winner.is_ai and winner.ai_controller]
+        with OutputSequencer(range(len(reviewers)), label="复盘") as sequencer:
+            sequencer.map(self.executor, review, reviewers)
         
         # 替换AI裁判的游戏总结为简单的结束语
         print("\n=== AI裁判总结 ===\n")
-        print(f"AI裁判: 游戏结束，{winners[0].role_name} 和 {winners[1].role_name} 是最后的幸存者。感谢所有玩家的参与！")
+        self.judge_say(f"游戏结束，{winners[0].role_name} 和 {winners[1].role_name} 是最后的幸存者。感谢所有玩家的参与！")
+        
+        self.report_cache_stats()
     
-    def collect_game_context(self) -> str:
-        """收集整场游戏的上下文信息，用于复盘"""
-        context = []
+    def report_cache_stats(self):
+        """输出每位玩家的提示词缓存命中率和推测执行的效果（以LLM请求开头，不会写入游戏日志）"""
+        for name in list(self.speculative_statements):
+            self.cancel_speculation(name)
+        stats = self.speculation_stats
+        if stats["started"]:
+            # 等待已经开始的推测请求结束，统计完整的浪费量
+            self.shutdown_executor()
+            print(f"LLM请求: 推测执行 共提前生成{stats['started']}个陈述，命中{stats['hits']}个"
+                  f"（{stats['hits'] / stats['started']:.0%}），输入变化作废{stats['misses']}个，"
+                  f"淘汰取消{stats['cancelled']}个，浪费{stats['wasted_tokens']}tokens")
+        
+        stats = self.commentary.stats
+        if stats["dropped"]:
+            print(f"LLM请求: 裁判评论 共提交{stats['submitted']}条，输出{stats['emitted']}条，"
+                  f"超时丢弃{stats['dropped']}条")
         
-        # 添加玩家信息
-        context.append("【玩家信息】")
         for player in self.game_state.players:
-            status = "幸存" if player.is_alive else "被淘汰"
-            context.append(f"{player.role_name}({status}): {player.trauma}")
-        
-        # 添加每轮游戏记录
-        context.append("\n【游戏过程】")
-        for round_data in self.game_state.round_history:
-            round_num = round_data.get("round", "未知")
-            context.append(f"\n第{round_num}轮:")
-            
-            # 陈述内容
-            context.append("- 陈述环节:")
-            for player in self.game_state.players:
-                if len(player.statement_history) >= round_num:
-                    statement = player.statement_history[round_num-1]
-                    context.append(f"  {player.role_name}: {statement[:150]}..." if len(statement) > 150 else f"  {player.role_name}: {statement}")
-            
-            # 质询环节
-            if "interrogations" in round_data:
-                context.append("- 质询环节:")
-                for qa in round_data["interrogations"]:
-                    questioner = next((p.role_name for p in self.game_state.players if p.name == qa["questioner"]), "未知")
-                    target = next((p.role_name for p in self.game_state.players if p.name == qa["target"]), "未知")
-                    context.append(f"  {questioner} 质询 {target}: {qa['question']}")
-                    context.append(f"  {target} 回答: {qa['response']}")
-            
-            # 投票环节
-            if "votes" in round_data:
-                context.append("- 投票环节:")
-                for vote in round_data["votes"]:
-                    voter = next((p.role_name for p in self.game_state.players if p.name == vote["voter"]), "未知")
-                    target = next((p.role_name for p in self.game_state.players if p.name == vote["target"]), "未知")
-                    reason = vote.get("reason", "未提供理由")
-                    context.append(f"  {voter} 投票给 {target}, 理由: {reason}")
-            
-            # 淘汰结果
-            if "eliminated" in round_data:
-                eliminated = round_data["eliminated"]
-                eliminated_player = next((p.role_name for p in self.game_state.players if p.name == eliminated), "未知")
-                context.append(f"- 淘汰结果: {eliminated_player} 被淘汰")
+            if player.ai_controller:
+                stats = player.ai_controller.cache_stats()
+                if stats["prompt_tokens"] > 0:
+                    print(f"LLM请求: {player.role_name} 共{stats['calls']}次调用，"
+                          f"提示词{stats['prompt_tokens']}tokens，缓存命中{stats['cached_tokens']}tokens（{stats['cache_ratio']:.0%}）")
+    
+    def log_event(self, kind: str, actor: str, target: Optional[str] = None, text: str = ""):
+        """向事件日志追加本轮的一个事件，actor和target使用角色名
+
+        在并发任务中调用时，事件与该任务的输出一起按规定顺序写入。
+        """
+        round_num = self.game_state.current_round
+        run_in_order(lambda: self.game_state.event_log.append(round_num, kind, actor, target, text))
+
+    def collect_game_context(self) -> str:
+        """收集整场游戏的上下文信息，用于复盘
         
-        return "\n".join(context)
+        各轮摘要在每轮结束时生成并缓存，这里只拼接；总长度不超过 REVIEW_CONTEXT_LIMIT，
+        超出时较早的轮次只保留一行统计。
+        """
+        return self.game_state.event_log.review_context(REVIEW_CONTEXT_LIMIT)
 
 def main():
+    import argparse
+    
     # 解析命令行参数
     parser = argparse.ArgumentParser(description="AI地牢生存游戏")
     parser.add_argument("--debug", action="store_true", help="启用调试模式，显示原始故事背景")
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="从检查点文件恢复中断的游戏")
     args = parser.parse_args()
     
     # 设置调试模式环境变量
@@ -841,12 +1323,37 @@ def main():
         os.environ["DEBUG_MODE"] = "1"
         print("调试模式已启用，将显示原始故事背景")
     
-    game = GameManager()
-    game.start_game()
+    if args.resume:
+        game = GameManager.from_checkpoint(args.resume)
+    else:
+        game = GameManager()
+    
+    try:
+        if args.resume:
+            game.resume_game()
+        else:
+            game.start_game()
+    except KeyboardInterrupt:
+        if os.path.exists(game.checkpoint_path):
+            print(f"\n游戏已中断，可以使用 --resume {game.checkpoint_path} 从最近完成的阶段继续")
+        else:
+            print("\n游戏已中断，尚未完成任何阶段")
+    finally:
+        # 中断时丢弃未输出的评论，取消已经排队的请求，等待进行中的请求结束
+        game.commentary.shutdown()
+        game.shutdown_executor(cancel_futures=True)
+        game.game_state.event_log.close_sink()
+    
+    return game
 
 if __name__ == "__main__":
     from output_handler import redirect_output
+    from log_renderer import render_events_file
+    
+    # 使用输出重定向上下文管理器，启用简化模式；markdown日志由结构化事件离线生成
+    with redirect_output(simplified=True, markdown=False):
+        game = main()
     
-    # 使用输出重定向上下文管理器，启用简化模式
-    with redirect_output(simplified=True):
-        main()
\ No newline at end of file
+    if os.path.exists(game.events_path):
+        print(f"游戏事件已保存到: {game.events_path}")
+        print(f"游戏日志已保存到: {render_events_file(game.events_path)}")
\ No newline at end of file
@@ -1,13 +1,14 @@
 import time
 import random
-import traceback
-from typing import List, Dict, Union, Any, Optional
-import openai
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Mapping, Union, Any, Optional
 import os
-from config import API_REQUEST_INTERVAL, GPT_REQUEST_INTERVAL, GPT_MODEL_PATTERNS, API_CONFIGS
+from config import (API_REQUEST_INTERVAL, GPT_REQUEST_INTERVAL, GPT_MODEL_PATTERNS, API_CONFIGS, PROBE_TIMEOUT,
+                    PLAYER_MEMORY_ENTRIES, PLAYER_MEMORY_TEXT_LIMIT)
 import re
 import json
-import requests
+from prompt_builder import SYSTEM_PROMPT
 
 # 定义必要的模板字符串
 MEMORY_PROMPT = "请基于以下背景信息({trauma}, {secret_motive})为你在游戏中扮演的角色创造一段虚构记忆。你需要编造一个谎言，使其听起来真实可信，以便在地牢生存游戏中掩盖你的真实身份。"
@@ -29,6 +30,19 @@ QUESTION_PROMPT = """
 
 只返回问题本身，不要有任何前言、说明或额外内容。"""
 
+# 共享前缀模式下的席位后缀，目标陈述已包含在前缀中
+QUESTION_SUFFIX_PROMPT = """作为{questioner}，你需要质询{target}。{target}的陈述见上方记录。
+
+请仔细分析{target}的陈述，找出可能存在的漏洞、矛盾或可疑点。然后生成一个尖锐、具有针对性的质询问题，针对陈述中的具体内容提出质疑。
+
+你的问题必须：
+1. 直接针对陈述中的某个具体细节或逻辑问题
+2. 表明你已经注意到了陈述中的某个不一致或可疑之处
+3. 简短有力，不超过30个字
+4. 是一个问句，而不是陈述句
+
+只返回问题本身，不要有任何前言、说明或额外内容。"""
+
 INTERROGATION_PROMPT = """
 
 作为{name}，你正在被{questioner}质询。
@@ -48,10 +62,84 @@ INTERROGATION_PROMPT = """
 
 请只返回回答本身，不要有任何额外的说明或解释。"""
 
+# 共享前缀模式下的投票后缀，所有候选玩家的陈述和质询记录已包含在前缀中
+VOTE_SUFFIX_PROMPT = """作为{name}，你需要投票淘汰一名最可疑的玩家。请分析以上所有玩家的陈述和质询记录，从以下候选玩家中选出最可疑的一位：
+候选玩家：{candidates}
+
+请直接返回以下格式的JSON（不要有任何多余文字）：
+{{"target": "你选择淘汰的玩家角色名", "reason": "投票理由（不超过50字）"}}
+严格按照要求返回JSON格式，不要添加任何额外的文本、说明或前言后语。"""
+
+REVOTE_SUFFIX_PROMPT = """作为{name}，上一轮投票出现平票，你需要在平票玩家之间重新投票。平票玩家的陈述和质询记录见上方。
+候选玩家：{candidates}
+只回答你要淘汰的玩家角色名，不要解释。"""
+
 VOTING_PROMPT = "作为地牢中的一名玩家，基于其他玩家在陈述和质询环节中的表现，选择一个你认为最可疑的玩家进行投票。加载其他所有玩家的陈述和质询记录，当前玩家状态: {player_states}。请同时提供一段简短的投票理由，解释为什么你认为这名玩家是在撒谎。"
 
 GAME_REVIEW_PROMPT = "作为{name}，你成功成为了地牢生存游戏中的最后两名幸存者之一。请对整场游戏进行人性化、有感情的复盘和分析。\n\n游戏信息:\n- 你的职业：{profession}\n- 你的创伤：{trauma}\n- 你的秘密动机：{secret_motive}\n- 你在游戏中的虚构记忆：{memory}\n- 淘汰记录：{elimination_record}\n\n游戏过程：{game_context}\n\n请从以下几个方面进行分析：\n1. 你如何在游戏中构建并维护虚假身份\n2. 你的陈述策略和如何应对其他玩家的质询\n3. 你的投票策略和心理博弈\n4. 游戏过程中的心理变化和紧张时刻\n5. 对生存策略和角色扮演的思考\n\n请用富有感情和哲理的语言进行分析，展现出对游戏体验的深刻洞察。复盘内容必须控制在500字以内。"
 
+# 按 (base_url, api_key) 共享的OpenAI客户端。openai包导入较慢，
+# 只在第一次发起请求时导入并创建客户端，回放日志等不需要请求的工具不必承担这部分开销
+_client_pool: Dict[tuple, Any] = {}
+_client_pool_lock = threading.Lock()
+
+
+def get_client(base_url: str, api_key: str):
+    """获取指定服务地址和密钥对应的客户端，不存在时创建"""
+    key = (base_url, api_key)
+    with _client_pool_lock:
+        client = _client_pool.get(key)
+        if client is None:
+            import openai
+            client = openai.OpenAI(base_url=base_url, api_key=api_key)
+            _client_pool[key] = client
+        return client
+
+
+# 多个进程共享的速率限制器，批量运行时由 use_rate_limiter() 设置；为None时每位玩家各自限速
+_rate_limiter = None
+
+
+def use_rate_limiter(limiter):
+    """设置共享的速率限制器
+
+    limiter.reserve(key, interval) 为key预约一次请求并返回需要等待的秒数，
+    key由服务地址和模型组成，同一模型的请求不论来自哪一局游戏都按interval排队。
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+# 同一进程中多局游戏共享的请求闸门，由 use_call_gate() 设置；为None时请求不经过闸门
+_call_gate = None
+
+
+def use_call_gate(gate):
+    """设置共享的请求闸门
+
+    gate.slot(group) 返回一个上下文管理器，在其中发出请求。group 为玩家的 call_group，
+    即所属的游戏，闸门据此限制每局和全局同时进行的请求数，并在各局之间公平分配名额。
+    """
+    global _call_gate
+    _call_gate = gate
+
+
+# 当前线程中LLM请求的附加信息：tag 标记请求的用途并写入用量记录，usage 收集本线程请求的用量
+_call_context = threading.local()
+
+
+@contextmanager
+def tagged_calls(tag: str):
+    """在上下文中发起的请求都带上tag，并返回收集这些请求用量的列表"""
+    previous = (getattr(_call_context, "tag", None), getattr(_call_context, "usage", None))
+    usage: List[Dict[str, Any]] = []
+    _call_context.tag, _call_context.usage = tag, usage
+    try:
+        yield usage
+    finally:
+        _call_context.tag, _call_context.usage = previous
+
+
 class AIPlayer:
     def __init__(self, api_config: Dict[str, Any]):
         self.name = api_config.get('role_name', 'AI玩家')
@@ -62,7 +150,10 @@ class AIPlayer:
         self.max_tokens = api_config.get('max_tokens', 2000)
         self.is_judge = api_config.get('is_judge', False)
         self.system_prompt = ""
-        self.conversation_history = []
+        # 滚动记忆：最近的陈述、质询和投票，每项为 {"round", "kind", "text"}，见 remember()
+        self.conversation_history: List[Dict[str, Any]] = []
+        self.memory_counts: Dict[str, int] = {}  # 已移出滚动记忆的条目，按类型计数
+        self.call_group: Optional[str] = None  # 所属的游戏，多局游戏共享请求闸门时用于区分各局的请求
         
         # 设置系统提示语，区分裁判和普通玩家
         if self.is_judge:
@@ -88,58 +179,191 @@ class AIPlayer:
         # 判断是否为GPT模型
         self.is_gpt_model = any(pattern in self.model.lower() for pattern in GPT_MODEL_PATTERNS)
         
-        # 用于记录上次API请求的时间戳
+        # 用于记录上次API请求的时间戳，并发请求时通过锁预约各自的请求时间
         self.last_request_timestamp = 0
+        self._rate_limit_lock = threading.Lock()
         
-        # 设置API认证
-        self.client = openai.OpenAI(
-            base_url=self.base_url,
-            api_key=self.api_key
-        )
+        # 记录每次API调用的token用量和缓存命中情况
+        self.usage_log = []
+        
+        # API客户端在第一次使用时创建
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client(self.base_url, self.api_key)
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
     
     def _wait_for_rate_limit(self):
         """等待适当的时间间隔以遵守API速率限制"""
-        current_time = time.time()
-        elapsed_time = current_time - self.last_request_timestamp
-        
         # 根据模型类型选择不同的等待时间
         wait_time = GPT_REQUEST_INTERVAL if self.is_gpt_model else API_REQUEST_INTERVAL
         
-        if elapsed_time < wait_time:
-            time_to_wait = wait_time - elapsed_time
+        if _rate_limiter is not None:
+            time_to_wait = _rate_limiter.reserve(f"{self.base_url}|{self.model}", wait_time)
+            if time_to_wait > 0:
+                print(f"等待API冷却时间... {time_to_wait:.1f}秒")
+                time.sleep(time_to_wait)
+            return
+        
+        with self._rate_limit_lock:
+            current_time = time.time()
+            time_to_wait = max(0.0, self.last_request_timestamp + wait_time - current_time)
+            # 在锁内预约本次请求的时间，同一玩家的并发请求依次排队
+            self.last_request_timestamp = current_time + time_to_wait
+        
+        if time_to_wait > 0:
             print(f"等待API冷却时间... {time_to_wait:.1f}秒")
             time.sleep(time_to_wait)
-        
-        # 更新时间戳
-        self.last_request_timestamp = time.time()
     
-    def _call_api(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
-        """调用API并处理潜在错误"""
+    def _call_slot(self):
+        """发出请求的上下文：设置了共享的请求闸门时在闸门分配的名额中进行"""
+        return _call_gate.slot(self.call_group) if _call_gate is not None else nullcontext()
+    
+    def _call_api(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000, shared_prefix: str = "",
+                  system_prompt: Optional[str] = None) -> str:
+        """调用API并处理潜在错误
+        
+        Args:
+            prompt: 当前席位独有的提示词
+            shared_prefix: 所有玩家共享的提示词前缀，放在最前面以便命中服务商的提示词缓存
+            system_prompt: 系统提示语，默认使用所有玩家共享的固定系统提示语
+        """
         try:
             self._wait_for_rate_limit()
             
-            # 如果是投票请求，添加特殊指令确保返回JSON
-            if "请直接返回以下格式的JSON" in prompt:
-                system_prompt = "你是一个会严格按照要求返回JSON格式的AI助手。不要添加任何额外的文本、说明或前言后语。"
-            else:
-                system_prompt = "你是一个角色扮演游戏中的角色"
+            # 如果是投票请求，添加特殊指令确保返回JSON；共享前缀模式下使用固定的系统提示语
+            if system_prompt is None:
+                if "请直接返回以下格式的JSON" in prompt and not shared_prefix:
+                    system_prompt = "你是一个会严格按照要求返回JSON格式的AI助手。不要添加任何额外的文本、说明或前言后语。"
+                else:
+                    system_prompt = SYSTEM_PROMPT
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
+            with self._call_slot():
+                started = time.monotonic()
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": shared_prefix + prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            
+            self._record_usage(getattr(response, "usage", None), time.monotonic() - started)
             
             return response.choices[0].message.content.strip()
         except Exception as e:
+            import traceback
             print(f"API调用错误: {str(e)}")
             traceback.print_exc()
             return self._generate_fallback_response(prompt)
     
+    def _record_usage(self, usage, latency: Optional[float] = None):
+        """记录API返回的token用量和请求耗时（秒），缓存命中率由 cache_stats() 汇总"""
+        if usage is None:
+            return
+        
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        
+        # OpenAI兼容接口在prompt_tokens_details中返回缓存命中数，DeepSeek使用prompt_cache_hit_tokens
+        cached_tokens = 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        if details is not None:
+            cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        if not cached_tokens:
+            cached_tokens = getattr(usage, "prompt_cache_hit_tokens", 0) or 0
+        
+        entry = {
+            "model": self.model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens
+        }
+        if latency is not None:
+            entry["latency"] = round(latency, 3)
+        tag = getattr(_call_context, "tag", None)
+        if tag:
+            entry["tag"] = tag
+        self.usage_log.append(entry)
+        collected = getattr(_call_context, "usage", None)
+        if collected is not None:
+            collected.append(entry)
+    
+    def cache_stats(self) -> Dict[str, float]:
+        """汇总本玩家所有API调用的提示词缓存命中情况"""
+        prompt_tokens = sum(entry["prompt_tokens"] for entry in self.usage_log)
+        cached_tokens = sum(entry["cached_tokens"] for entry in self.usage_log)
+        return {
+            "calls": len(self.usage_log),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        }
+    
+    def probe(self, timeout: float = PROBE_TIMEOUT) -> Dict[str, Any]:
+        """检查API配置是否可用：网络连接、认证和模型是否存在
+        
+        先查询模型信息；部分服务商不提供模型查询接口，此时改用一次最小的对话请求确认。
+        检查使用共享的客户端，同时预先建立连接。
+        
+        Returns:
+            包含 ok（是否可用）、latency（耗时，秒）和 error（错误信息）的字典
+        """
+        start = time.time()
+        try:
+            client = self.client.with_options(timeout=timeout, max_retries=0)
+            with self._call_slot():
+                try:
+                    client.models.retrieve(self.model)
+                except Exception as e:
+                    if type(e).__name__ in ("AuthenticationError", "PermissionDeniedError", "APIConnectionError", "APITimeoutError"):
+                        raise
+                    # 检查请求不占用游戏请求的速率限制时段，否则第一个正式请求要多等一个完整的间隔
+                    client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": "ping"}],
+                        max_tokens=1
+                    )
+            return {"ok": True, "latency": time.time() - start, "error": ""}
+        except Exception as e:
+            return {"ok": False, "latency": time.time() - start, "error": f"{type(e).__name__}: {str(e)}"}
+    
+    def remember(self, round_num: int, kind: str, text: str):
+        """把一条记录加入滚动记忆，超出 PLAYER_MEMORY_ENTRIES 条时最早的条目只保留计数"""
+        if len(text) > PLAYER_MEMORY_TEXT_LIMIT:
+            text = text[:PLAYER_MEMORY_TEXT_LIMIT] + "..."
+        self.conversation_history.append({"round": round_num, "kind": kind, "text": text})
+        while len(self.conversation_history) > PLAYER_MEMORY_ENTRIES:
+            oldest = self.conversation_history.pop(0)
+            self.memory_counts[oldest["kind"]] = self.memory_counts.get(oldest["kind"], 0) + 1
+
+    def memory_prompt(self) -> str:
+        """滚动记忆的提示词，放在当前席位独有的提示词开头；没有记忆时返回空字符串"""
+        if not self.conversation_history:
+            return ""
+        lines = ["【你的记忆】"]
+        if self.memory_counts:
+            lines.append("更早：" + "，".join(f"{kind}{count}次" for kind, count in self.memory_counts.items()))
+        for entry in self.conversation_history:
+            lines.append(f"第{entry['round']}轮 {entry['kind']}：{entry['text']}")
+        return "\n".join(lines) + "\n\n"
+
+    def memory_state(self) -> Dict[str, Any]:
+        """滚动记忆的状态，用于保存检查点"""
+        return {"entries": self.conversation_history, "counts": self.memory_counts}
+
+    def restore_memory(self, state: Dict[str, Any]):
+        self.conversation_history = list(state.get("entries", []))
+        self.memory_counts = dict(state.get("counts", {}))
+
     def _generate_fallback_response(self, prompt: str) -> str:
         """生成后备响应，当API调用失败时使用"""
         if "陈述内容" in prompt or "虚构记忆" in prompt:
@@ -189,35 +413,42 @@ class AIPlayer:
         prompt = f"你在一个地牢生存游戏中，你的故事背景是：\n\n{backstory}\n\n"
         prompt += "你需要根据游戏进展调整你的陈述，但必须基于上述故事背景，不要偏离原有内容。"
         
-        if previous_rounds:
-            prompt += "\n\n游戏轮次记录：\n"
-            for round_data in previous_rounds:
-                round_num = round_data.get("round", "未知")
-                eliminated = round_data.get("eliminated", "无")
-                
-                prompt += f"第{round_num}轮，被淘汰玩家: {eliminated}\n"
+        # 游戏进展取自滚动记忆，长度不随轮次增长
+        memory = self.memory_prompt()
+        if memory:
+            prompt += "\n\n" + memory.rstrip()
         
         prompt += "\n请生成新的陈述内容，保持与你的故事背景一致，但可以增加细节或做微调以更有说服力。"
         
         return self._call_api(prompt, temperature=0.7)
     
-    def generate_question(self, questioner_name: str, target_name: str, target_statement: str, target_profession: str) -> str:
-        """生成对目标玩家的质询问题"""
-        # 使用预定义的模板，确保包含目标玩家的陈述内容
-        prompt = QUESTION_PROMPT.format(
-            questioner=questioner_name,
-            target=target_name,
-            target_memory=target_statement,
-            target_profession=target_profession
-        )
+    def generate_question(self, questioner_name: str, target_name: str, target_statement: str, target_profession: str, shared_prefix: str = "") -> str:
+        """生成对目标玩家的质询问题
+        
+        如果提供了shared_prefix（包含本轮所有陈述），目标陈述不再重复写入提示词，
+        只在末尾附加质询者自己的指令。
+        """
+        if shared_prefix:
+            prompt = QUESTION_SUFFIX_PROMPT.format(
+                questioner=questioner_name,
+                target=target_name
+            )
+        else:
+            # 使用预定义的模板，确保包含目标玩家的陈述内容
+            prompt = QUESTION_PROMPT.format(
+                questioner=questioner_name,
+                target=target_name,
+                target_memory=target_statement,
+                target_profession=target_profession
+            )
         
         # 调用API生成问题
-        response = self._call_api(prompt, temperature=0.8, max_tokens=100)
+        response = self._call_api(self.memory_prompt() + prompt, temperature=0.8, max_tokens=100, shared_prefix=shared_prefix)
         
         # 移除可能的引号和多余空格
         return response.strip('"\'').strip()
     
-    def answer_interrogation(self, name: str, questioner_name: str, question: str) -> str:
+    def answer_interrogation(self, name: str, questioner_name: str, question: str, shared_prefix: str = "") -> str:
         """回答质询问题"""
         # 使用预定义的模板生成回答
         prompt = INTERROGATION_PROMPT.format(
@@ -227,7 +458,7 @@ class AIPlayer:
         )
         
         # 调用API生成回答，增加max_tokens确保回答完整
-        response = self._call_api(prompt, temperature=0.7, max_tokens=500)
+        response = self._call_api(self.memory_prompt() + prompt, temperature=0.7, max_tokens=500, shared_prefix=shared_prefix)
         
         # 确保回答不会太长，同时保证完整性
         if len(response) > 200:
@@ -241,8 +472,12 @@ class AIPlayer:
             
         return response.strip('"\'').strip()
     
-    def vote(self, player_info: List[Dict]) -> Union[str, Dict[str, str]]:
-        """投票决定淘汰哪个玩家"""
+    def vote(self, player_info: List[Dict], shared_prefix: str = "") -> Union[str, Dict[str, str]]:
+        """投票决定淘汰哪个玩家
+        
+        如果提供了shared_prefix（包含本轮所有陈述和质询记录），提示词只在末尾附加候选名单，
+        否则按照player_info逐一拼接每位候选玩家的信息。
+        """
         try:
             # 简化玩家信息
             simplified_players = []
@@ -260,31 +495,38 @@ class AIPlayer:
                 simplified_players.append(simplified_player)
                 player_name_map[simplified_player["role_name"]] = player.get('name', f"Player{i+1}")
             
-            # 制作包含所有玩家陈述和质询记录的投票提示
-            prompt = "你需要投票淘汰一名最可疑的玩家。请分析以下所有玩家的陈述和质询记录，选出最可疑的一位：\n\n"
-            
-            for player in simplified_players:
-                prompt += f"===== 玩家{player['id']} ({player['role_name']}) =====\n"
-                prompt += f"当前陈述：{player['statement']}\n"
+            if shared_prefix:
+                # 所有候选玩家的信息已在共享前缀中，只附加投票者自己的记忆和指令
+                prompt = self.memory_prompt() + VOTE_SUFFIX_PROMPT.format(
+                    name=self.name,
+                    candidates="、".join(player["role_name"] for player in simplified_players)
+                )
+            else:
+                # 制作包含所有玩家陈述和质询记录的投票提示
+                prompt = "你需要投票淘汰一名最可疑的玩家。请分析以下所有玩家的陈述和质询记录，选出最可疑的一位：\n\n"
                 
-                # 添加历史陈述记录
-                if "statement_history" in player and len(player["statement_history"]) > 0:
-                    prompt += "历史陈述：\n"
-                    for i, stmt in enumerate(player["statement_history"]):
-                        prompt += f"第{i+1}轮陈述: {stmt[:200]}...\n"
+                for player in simplified_players:
+                    prompt += f"===== 玩家{player['id']} ({player['role_name']}) =====\n"
+                    prompt += f"当前陈述：{player['statement']}\n"
+                    
+                    # 添加历史陈述记录
+                    if "statement_history" in player and len(player["statement_history"]) > 0:
+                        prompt += "历史陈述：\n"
+                        for i, stmt in enumerate(player["statement_history"]):
+                            prompt += f"第{i+1}轮陈述: {stmt[:200]}...\n"
+                    
+                    # 添加问答记录
+                    if player["qa_history"]:
+                        prompt += "质询记录：\n"
+                        for qa in player["qa_history"]:
+                            prompt += f"- {qa}\n"
+                    prompt += "\n"
                 
-                # 添加问答记录
-                if player["qa_history"]:
-                    prompt += "质询记录：\n"
-                    for qa in player["qa_history"]:
-                        prompt += f"- {qa}\n"
-                prompt += "\n"
-            
-            prompt += "请直接返回以下格式的JSON（不要有任何多余文字）：\n"
-            prompt += '{"target": "你选择淘汰的玩家角色名", "reason": "投票理由（不超过50字）"}'
+                prompt += "请直接返回以下格式的JSON（不要有任何多余文字）：\n"
+                prompt += '{"target": "你选择淘汰的玩家角色名", "reason": "投票理由（不超过50字）"}'
             
             # 使用更高的temperature来鼓励多样化的分析
-            response = self._call_api(prompt, temperature=0.8, max_tokens=200)
+            response = self._call_api(prompt, temperature=0.8, max_tokens=200, shared_prefix=shared_prefix)
             
             # 打印原始响应以便调试
             print(f"DEBUG - {self.name}的投票API响应: {response}")
@@ -339,6 +581,26 @@ class AIPlayer:
                 return {"target": player_info[0]["name"], "reason": "投票处理异常，默认选择"}
             return {"target": "AI玩家1", "reason": "系统错误，默认选择"}
     
+    def revote(self, candidates: List[Mapping], shared_prefix: str = "") -> Optional[str]:
+        """平票后在候选玩家之间重新投票，只要求回答角色名
+        
+        返回所选玩家的玩家名，无法从回答中识别候选玩家时返回None。
+        """
+        names = {candidate["role_name"]: candidate["name"] for candidate in candidates}
+        prompt = self.memory_prompt() + REVOTE_SUFFIX_PROMPT.format(name=self.name, candidates="、".join(names))
+        if not shared_prefix:
+            # 没有共享前缀时附上候选玩家的当前陈述
+            statements = "".join(f"{candidate['role_name']}的陈述：{candidate['statement'][:300]}\n"
+                                 for candidate in candidates)
+            prompt = statements + "\n" + prompt
+        
+        response = self._call_api(prompt, temperature=0.8, max_tokens=20, shared_prefix=shared_prefix)
+        print(f"DEBUG - {self.name}的重新投票API响应: {response}")
+        
+        # 取回答中最先出现的候选角色名
+        found = [(response.find(role_name), role_name) for role_name in names if role_name in response]
+        return names[min(found)[1]] if found else None
+
     def review_game(self, name: str, trauma: str, secret_motive: str, memory: str, final_score: float, elimination_record: str, game_context: str = None) -> str:
         """对游戏进行复盘分析"""
         # 构建复盘提示，添加游戏上下文
@@ -355,7 +617,7 @@ class AIPlayer:
         # 添加游戏上下文（如果有）
         if game_context and len(game_context) > 0:
             prompt += f"""
-以下是游戏过程的完整记录，请仔细阅读后再进行复盘分析：
+以下是游戏过程的记录（较早的轮次只保留摘要），请仔细阅读后再进行复盘分析：
 
 {game_context}
 
@@ -392,16 +654,15 @@ class AIPlayer:
         if not self.is_judge:
             return "错误：非裁判角色无法使用此方法"
             
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": "请以游戏裁判的身份，对地牢生存游戏中的玩家们进行简短的自我介绍（不超过150字）。介绍应该包含你的角色、职责，以及对游戏规则的简要说明。保持神秘感和权威性。"}
-        ]
-        
-        response = self._call_api(messages[0]["content"], temperature=0.8, max_tokens=150)
+        prompt = "请以游戏裁判的身份，对地牢生存游戏中的玩家们进行简短的自我介绍（不超过150字）。介绍应该包含你的角色、职责，以及对游戏规则的简要说明。保持神秘感和权威性。"
+        response = self._call_api(prompt, temperature=0.8, max_tokens=150, system_prompt=self.system_prompt)
         return response.strip()
         
-    def comment_on_event(self, event_type: str, **kwargs) -> str:
-        """对游戏中的各种事件进行评论"""
+    def comment_on_event(self, event_type: str, use_llm: bool = False, **kwargs) -> str:
+        """对游戏中的各种事件进行评论
+        
+        use_llm为False时直接返回固定格式的确认语句，不调用API。
+        """
         if not self.is_judge:
             return None
             
@@ -413,14 +674,13 @@ class AIPlayer:
         
         if event_type not in event_prompts:
             return None
-            
-        # 对于投票确认，直接返回格式化的字符串，不调用API
-        if event_type == "vote":
-            return f"{kwargs.get('voter', '投票者')}投票给了{kwargs.get('target', '目标')}。"
-        elif event_type == "voting_summary":
-            return f"投票统计结果：{kwargs.get('vote_summary', '无数据')}"
         
-        return None
+        if not use_llm:
+            return event_prompts[event_type]
+        
+        prompt = f"游戏事件：{event_prompts[event_type]}\n请以游戏裁判的身份对这一事件做一句简短的评论（不超过50字）。"
+        response = self._call_api(prompt, temperature=0.8, max_tokens=100, system_prompt=self.system_prompt)
+        return response.strip()
         
     def summarize_game(self, elimination_record: str, winners: List[str]) -> str:
         """对整个游戏进行总结"""
@@ -439,7 +699,7 @@ class AIPlayer:
 故事背景：
 {backstory}
 
-"""
+{self.memory_prompt()}"""
         # 如果不是第一轮，加入其他玩家的陈述作为参考
         if current_round > 1 and other_statements:
             prompt += "\n其他玩家的陈述例子：\n"
@@ -0,0 +1,219 @@
+"""在同一进程中运行多局游戏
+
+每局游戏是事件循环中的一个asyncio任务，游戏本身在线程中运行。所有游戏共享同一组API客户端
+（见 ai_player.get_client）和速率限制器，请求经过同一个公平闸门：全局同时进行的请求数
+不超过 GLOBAL_CONCURRENT_CALLS，每局不超过 MAX_CONCURRENT_CALLS，名额空出时在有请求
+等待的游戏之间轮流分配，请求多的游戏不会挤占其他游戏。
+
+与 tournament.py 相同，每局的文字输出写入该局的日志文件，过程记录在事件文件中，结束后生成
+Markdown日志；所有游戏共用一个进程，输出按线程分配到各局的日志（见 GameLogs）。每局使用
+以种子初始化的独立随机数生成器，相同种子的座位、发言顺序和游戏中的随机选择都相同。
+
+运行方式：
+    python async_games.py --games 50 --concurrent-games 20
+    python async_games.py --games 200 --concurrent-games 50 --global-calls 64 --seed 42
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+from typing import Any, Deque, Dict, List, Optional
+
+import ai_player
+from config import MAX_CONCURRENT_CALLS, GLOBAL_CONCURRENT_CALLS
+from tournament import (SharedRateLimiter, game_name, new_game, finish_result, close_game, default_output_dir,
+                        game_seeds, report_progress, save_results, print_summary, open_results_writer,
+                        store_record)
+
+
+class FairCallGate:
+    """多局游戏共享的请求闸门
+
+    每局游戏（group）有自己的等待队列，名额空出时按轮转顺序从下一局取出最早的请求，
+    已经用满每局名额的游戏暂时跳过。
+    """
+
+    def __init__(self, global_limit: int = GLOBAL_CONCURRENT_CALLS, per_group_limit: int = MAX_CONCURRENT_CALLS):
+        self.global_limit = global_limit
+        self.per_group_limit = per_group_limit
+        self.condition = threading.Condition()
+        self.waiting: Dict[Any, Deque[Dict[str, bool]]] = {}
+        self.rotation: Deque[Any] = deque()  # 有请求等待的游戏，按轮转顺序排列
+        self.active: Dict[Any, int] = {}
+        self.total_active = 0
+        self.stats: Dict[str, Any] = {"calls": 0, "waited": 0, "max_active": 0}
+
+    def _dispatch(self):
+        """把空出的名额按轮转顺序分配给等待中的请求，调用时持有锁"""
+        skipped = 0
+        while self.total_active < self.global_limit and skipped < len(self.rotation):
+            group = self.rotation[0]
+            self.rotation.rotate(-1)
+            if self.active.get(group, 0) >= self.per_group_limit:
+                skipped += 1
+                continue
+            skipped = 0
+            ticket = self.waiting[group].popleft()
+            if not self.waiting[group]:
+                del self.waiting[group]
+                self.rotation.remove(group)
+            ticket["granted"] = True
+            self.active[group] = self.active.get(group, 0) + 1
+            self.total_active += 1
+        self.stats["max_active"] = max(self.stats["max_active"], self.total_active)
+
+    @contextmanager
+    def slot(self, group):
+        ticket = {"granted": False}
+        with self.condition:
+            self.stats["calls"] += 1
+            if group not in self.waiting:
+                self.waiting[group] = deque()
+                self.rotation.append(group)
+            self.waiting[group].append(ticket)
+            self._dispatch()
+            if not ticket["granted"]:
+                self.stats["waited"] += 1
+                self.condition.wait_for(lambda: ticket["granted"])
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active[group] -= 1
+                if not self.active[group]:
+                    del self.active[group]
+                self.total_active -= 1
+                self._dispatch()
+                self.condition.notify_all()
+
+
+# 当前线程的输出所属的日志文件
+_thread_log = threading.local()
+
+
+def _log_to(log):
+    _thread_log.file = log
+
+
+class GameLogs:
+    """安装在 sys.stdout 上的代理，把每个线程的输出写入该线程所属游戏的日志
+
+    游戏线程和该局线程池中的线程启动时记录本局的日志文件（见 GameManager.thread_initializer），
+    不属于任何一局的输出丢弃。
+    """
+
+    def write(self, message):
+        log = getattr(_thread_log, "file", None)
+        if log is not None:
+            try:
+                log.write(message)
+            except ValueError:
+                pass  # 该局已经结束，日志文件已关闭
+        return len(message)
+
+    def flush(self):
+        log = getattr(_thread_log, "file", None)
+        if log is not None and not log.closed:
+            log.flush()
+
+
+def play(index: int, seed: int, output_dir: str) -> Dict[str, Any]:
+    """运行一局游戏，输出写入该局的日志文件，返回游戏结果，游戏出错时记录错误"""
+    game = new_game(index, seed, output_dir)
+    game.game_state.call_group = game_name(index)
+
+    log_path = os.path.join(output_dir, f"{game_name(index)}.log")
+    error = None
+    with open(log_path, 'w', encoding='utf-8') as log:
+        game.thread_initializer = partial(_log_to, log)
+        _log_to(log)
+        try:
+            game.start_game()
+        except Exception as e:
+            traceback.print_exc(file=log)
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            close_game(game)
+            _log_to(None)
+
+    return finish_result(game, index, seed, error, log_path=log_path)
+
+
+async def run_games(games: int, concurrent_games: int, global_calls: int = GLOBAL_CONCURRENT_CALLS,
+                    per_game_calls: int = MAX_CONCURRENT_CALLS, seed: Optional[int] = None,
+                    output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """在当前事件循环中运行games局游戏，最多concurrent_games局同时进行，返回汇总统计"""
+    output_dir = output_dir or default_output_dir("async_games")
+    os.makedirs(output_dir, exist_ok=True)
+    console = sys.stdout
+    print(f"开始运行：{games}局，同时进行{concurrent_games}局，请求上限 全局{global_calls}/每局{per_game_calls}，"
+          f"输出目录 {output_dir}", file=console)
+
+    gate = FairCallGate(global_calls, per_game_calls)
+    ai_player.use_rate_limiter(SharedRateLimiter({}, threading.Lock()))
+    ai_player.use_call_gate(gate)
+    loop = asyncio.get_running_loop()
+    threads = ThreadPoolExecutor(max_workers=concurrent_games, thread_name_prefix="game")
+    games_slots = asyncio.Semaphore(concurrent_games)
+    results: List[Dict[str, Any]] = []
+    writer = open_results_writer()
+    start = time.time()
+
+    async def play_one(index: int, game_seed: int):
+        async with games_slots:
+            result = await loop.run_in_executor(threads, play, index, game_seed, output_dir)
+        results.append(result)
+        # 写入在事件循环中进行，一批记录写完之前不会有其他游戏的结果插入
+        store_record(writer, result)
+        report_progress(result, len(results), games, file=console)
+
+    try:
+        # 游戏中的文字输出写入各局的日志，进度和统计输出到原来的标准输出
+        with redirect_stdout(GameLogs()):
+            try:
+                await asyncio.gather(*(play_one(index, game_seed)
+                                       for index, game_seed in enumerate(game_seeds(games, seed))))
+            finally:
+                # 取消尚未开始的游戏，等待正在进行的游戏结束后再移除闸门和速率限制器
+                threads.shutdown(wait=True, cancel_futures=True)
+    finally:
+        if writer is not None:
+            writer.close()
+        ai_player.use_call_gate(None)
+        ai_player.use_rate_limiter(None)
+
+    elapsed = time.time() - start
+    summary = save_results(results, output_dir)
+    print_summary(summary)
+    print(f"\n用时{elapsed:.1f}秒，约{games / elapsed * 3600:.0f}局/小时；"
+          f"共{gate.stats['calls']}次请求，{gate.stats['waited']}次排队，"
+          f"最多同时进行{gate.stats['max_active']}次")
+    return summary
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="在同一进程中同时运行多局AI地牢生存游戏并统计结果")
+    parser.add_argument("--games", type=int, default=10, help="运行的局数")
+    parser.add_argument("--concurrent-games", type=int, default=10, help="同时进行的局数")
+    parser.add_argument("--global-calls", type=int, default=GLOBAL_CONCURRENT_CALLS,
+                        help="所有游戏同时进行的请求数上限")
+    parser.add_argument("--per-game-calls", type=int, default=MAX_CONCURRENT_CALLS,
+                        help="每局同时进行的请求数上限")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，相同种子的座位和发言顺序相同")
+    parser.add_argument("-o", "--output", help="输出目录，默认为 output/async_games_时间")
+    args = parser.parse_args()
+
+    asyncio.run(run_games(args.games, args.concurrent_games, args.global_calls, args.per_game_calls,
+                          args.seed, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import os
+import json
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+# 背景故事文件所在的文件夹，文件名格式为 for_角色名.txt
+BACKSTORY_DIR = "backstory_list"
+
+# 索引文件所在的缓存文件夹，记录每个背景故事文件的大小、修改时间、哈希和对应的角色。
+# 索引是生成的数据，不写入背景故事文件夹，每个背景故事文件夹对应一个索引文件
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', 'cache')
+
+# 特殊映射关系，处理文件名与角色名不一致的情况（键为小写文件名）
+ROLE_ALIASES = {
+    "moonshot": "Kimi",  # moonshot是Kimi的供应商
+    "deepseek": "DeepSeek"  # 处理大小写不一致
+}
+
+
+def role_key(name: str) -> str:
+    """文件名或角色名对应的索引键：先应用特殊映射，再忽略大小写"""
+    lower = name.lower()
+    return ROLE_ALIASES.get(lower, name).lower()
+
+
+@dataclass
+class BackstoryEntry:
+    """背景故事索引中的一项，内容在第一次读取时才加载，文件变化后重新读取"""
+    filename: str
+    role_key: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    path: str = field(repr=False, default="")
+    _content: Optional[str] = field(repr=False, default=None)
+
+    def is_current(self, stat: os.stat_result) -> bool:
+        """文件的大小和修改时间与记录一致"""
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def load(self) -> bool:
+        """读取内容并更新记录，已缓存的内容与文件一致时不读取；记录发生变化时返回True"""
+        if self._content is not None and self.is_current(os.stat(self.path)):
+            return False
+        with open(self.path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            data = file.read()
+        record = (self.size, self.mtime_ns, self.sha256)
+        self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self._content = data.decode('utf-8').strip()
+        return record != (self.size, self.mtime_ns, self.sha256)
+
+    @property
+    def content(self) -> Optional[str]:
+        return self._content
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "role_key": self.role_key,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "sha256": self.sha256
+        }
+
+
+class BackstoryStore:
+    """按角色索引的背景故事库
+
+    建立索引时只列出文件夹并读取文件的元数据，大小和修改时间与索引文件记录一致的文件
+    直接复用记录的哈希，不读取内容；内容在某个角色第一次被用到时才读取。之后每次读取
+    都检查文件夹和文件的修改时间：文件夹中增删或替换了文件时重新建立索引，就地修改过的
+    文件重新读取。
+    """
+
+    def __init__(self, directory: str, cache_dir: str = CACHE_DIR):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.entries: Dict[str, BackstoryEntry] = {}  # 索引键 -> 背景故事
+        self.dir_mtime_ns = 0
+        self.lock = threading.Lock()
+        self.reported = False
+        self._build()
+
+    def _manifest_path(self) -> str:
+        digest = hashlib.sha1(os.path.abspath(self.directory).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"backstories_{digest}.json")
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as file:
+                return json.load(file).get("files", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        """原子地写入索引文件，缓存文件夹不可写时跳过"""
+        manifest = {"directory": os.path.abspath(self.directory),
+                    "files": {entry.filename: entry.to_dict() for entry in self.entries.values()}}
+        tmp_path = self._manifest_path() + ".tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(manifest, file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._manifest_path())
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _build(self):
+        entries: Dict[str, BackstoryEntry] = {}
+        if not os.path.isdir(self.directory):
+            self.entries = entries
+            return
+
+        manifest = self._read_manifest()
+        changed = False
+        with os.scandir(self.directory) as scanned:
+            for item in scanned:
+                filename = item.name
+                if not (filename.startswith("for_") and filename.endswith(".txt")) or not item.is_file():
+                    continue
+                stat = item.stat()
+                key = role_key(filename[4:-4])  # 去掉"for_"前缀和".txt"后缀
+                recorded = manifest.get(filename)
+                if recorded and recorded["size"] == stat.st_size and recorded["mtime_ns"] == stat.st_mtime_ns:
+                    sha256 = recorded["sha256"]
+                    changed = changed or recorded.get("role_key") != key
+                else:
+                    try:
+                        with open(item.path, 'rb') as file:
+                            sha256 = hashlib.sha256(file.read()).hexdigest()
+                    except OSError as e:
+                        print(f"✗ 读取文件[{filename}]失败: {str(e)}")
+                        continue
+                    changed = True
+                entries[key] = BackstoryEntry(filename=filename, role_key=key, size=stat.st_size,
+                                              mtime_ns=stat.st_mtime_ns, sha256=sha256, path=item.path)
+
+        self.entries = entries
+        if changed or set(manifest) != {entry.filename for entry in self.entries.values()}:
+            self._write_manifest()
+        self.dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+
+    def is_stale(self) -> bool:
+        """文件夹中增删或替换了文件；就地修改的文件在读取内容时按大小和修改时间发现"""
+        try:
+            if os.stat(self.directory).st_mtime_ns != self.dir_mtime_ns:
+                return True
+        except OSError:
+            return bool(self.entries)
+        return False
+
+    def get(self, role_name: str, default: Optional[str] = None) -> Optional[str]:
+        with self.lock:
+            if self.is_stale():
+                self._build()
+                self.reported = False
+            entry = self.entries.get(role_key(role_name))
+            if entry is None:
+                return default
+            try:
+                if entry.load():
+                    self._write_manifest()
+                return entry.content
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"✗ 读取文件[{entry.filename}]失败: {str(e)}")
+                return default
+
+    def __contains__(self, role_name: str) -> bool:
+        return role_key(role_name) in self.entries
+
+    def validate(self, api_configs: List[Dict[str, Any]]) -> List[str]:
+        """检查每个非裁判角色是否有对应的背景故事，返回缺失背景的角色"""
+        return [config["role_name"] for config in api_configs
+                if config.get("role_name") and not config.get("is_judge", False) and config["role_name"] not in self]
+
+    def report(self, api_configs: List[Dict[str, Any]]):
+        """输出加载结果，每个背景故事库只输出一次"""
+        if self.reported:
+            return
+        self.reported = True
+        if not os.path.isdir(self.directory):
+            return
+
+        print("\n=== 加载角色背景故事 ===")
+        role_names = {role_key(config["role_name"]): config["role_name"] for config in api_configs if config.get("role_name")}
+        loaded_roles = []
+        for key, entry in self.entries.items():
+            if key in role_names:
+                print(f"✓ 已索引[{role_names[key]}]的故事背景")
+                loaded_roles.append(role_names[key])
+            else:
+                print(f"! 警告：背景故事文件[{entry.filename}]没有对应的角色配置")
+
+        missing_roles = self.validate(api_configs)
+        for role_name in missing_roles:
+            print(f"! 警告：角色[{role_name}]未找到对应的背景故事文件")
+
+        print(f"共加载了{len(loaded_roles)}个角色的背景故事，{len(missing_roles)}个角色使用默认背景")
+        if missing_roles:
+            print(f"缺失背景的角色: {', '.join(missing_roles)}")
+
+
+# 进程内共享的背景故事库，按文件夹的绝对路径缓存；获取时不访问文件系统，
+# 文件夹的变化在读取背景故事时发现，见 BackstoryStore.get()
+_stores: Dict[str, BackstoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_backstory_store(directory: str = BACKSTORY_DIR, api_configs: Optional[List[Dict[str, Any]]] = None) -> BackstoryStore:
+    """获取背景故事库，第一次获取或重新建立索引后检查角色配置"""
+    path = os.path.abspath(directory)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = BackstoryStore(path)
+            _stores[path] = store
+    if api_configs is not None:
+        store.report(api_configs)
+    return store
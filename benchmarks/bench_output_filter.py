@@ -0,0 +1,74 @@
+"""OutputRedirector 过滤性能基准
+
+模拟LLM的长输出：同样行数的内容分别以不同的行长度、以很多个不以换行结尾的小片段写入，
+统计每行和每个片段的平均耗时。单行耗时应当与输出总长度无关。
+
+运行方式：
+    python benchmarks/bench_output_filter.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_handler import OutputRedirector
+
+SAMPLE_LINES = [
+    "=== 第3轮开始 ===",
+    "--- 陈述环节开始 ---",
+    "Kimi的陈述：",
+    "陈述内容：我在地牢的北侧醒来，手里握着一把生锈的钥匙，记得自己曾是一名图书管理员。",
+    "DeepSeek正在质询Qwen...",
+    "DeepSeek: 你说你是图书管理员，为什么对地牢的结构这么熟悉？",
+    "AI裁判: 质询环节结束",
+    "LLM请求: GPT(gpt-4o) 提示词1200tokens，缓存命中1024tokens（85%）",
+    "DEBUG - Claude的投票API响应: {\"target\": \"Kimi\", \"reason\": \"陈述前后矛盾\"}",
+    "投票统计结果：",
+]
+
+
+def make_redirector() -> OutputRedirector:
+    redirector = OutputRedirector(simplified=True)
+    redirector.terminal = io.StringIO()
+    redirector.output_file = io.StringIO()
+    return redirector
+
+
+def bench_lines(line_repeat: int, line_count: int = 2000) -> float:
+    """每行长度约为样例的line_repeat倍，返回每行平均耗时（微秒）"""
+    lines = [SAMPLE_LINES[i % len(SAMPLE_LINES)] * line_repeat for i in range(line_count)]
+    redirector = make_redirector()
+    start = time.perf_counter()
+    for line in lines:
+        redirector.write(line + "\n")
+    elapsed = time.perf_counter() - start
+    return elapsed / line_count * 1e6
+
+
+def bench_unterminated(total_chars: int, chunk_size: int = 16) -> float:
+    """以不含换行的小片段写入一整段长输出，返回每个片段的平均耗时（微秒）"""
+    text = ("这是一段很长的LLM输出，没有任何换行符。" * (total_chars // 20 + 1))[:total_chars]
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    redirector = make_redirector()
+    start = time.perf_counter()
+    for chunk in chunks:
+        redirector.write(chunk)
+    redirector.write("\n")
+    elapsed = time.perf_counter() - start
+    return elapsed / len(chunks) * 1e6
+
+
+def main():
+    print("按行写入（每行平均耗时）")
+    for line_repeat in (1, 10, 100):
+        print(f"  行长度 x{line_repeat:<4} {bench_lines(line_repeat):8.2f} us/行")
+
+    print("不含换行的长输出（每个片段平均耗时）")
+    for total_chars in (10_000, 100_000, 1_000_000):
+        print(f"  总长度 {total_chars:>9} 字符 {bench_unterminated(total_chars):8.2f} us/片段")
+
+
+if __name__ == "__main__":
+    main()
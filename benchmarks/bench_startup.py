@@ -0,0 +1,66 @@
+"""启动开销基准
+
+用 python -X importtime 在新进程中导入各个入口模块，统计总导入耗时和最慢的模块，
+并检查 openai 等较重的依赖没有在导入阶段被加载。回放日志、基准测试和锦标赛的
+工作进程都是短命进程，导入开销会直接计入每个进程的耗时。
+
+运行方式：
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --top 15
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 需要测量的入口模块
+ENTRY_MODULES = ["ai_dungeon_game", "ai_player", "log_renderer", "output_handler"]
+
+# 不应该在导入阶段加载的模块
+DEFERRED_MODULES = ["openai", "requests", "httpx", "traceback"]
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Tuple[int, Dict[str, Tuple[int, int]]]:
+    """在新进程中导入模块，返回 (总耗时微秒, 模块名 -> (自身耗时, 累计耗时))"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us))
+    return timings[module][1], timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量入口模块的导入耗时")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块测量次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="显示累计耗时最高的模块数")
+    args = parser.parse_args()
+
+    for module in ENTRY_MODULES:
+        runs: List[Tuple[int, Dict[str, Tuple[int, int]]]] = sorted(
+            (measure(module) for _ in range(args.repeat)), key=lambda run: run[0])
+        total_us, timings = runs[len(runs) // 2]
+        print(f"{module}: {total_us / 1000:.1f} ms（{args.repeat}次中位数）")
+
+        slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"  {name:<32} 自身 {self_us / 1000:6.2f} ms  累计 {cumulative_us / 1000:6.2f} ms")
+
+        loaded = [name for name in DEFERRED_MODULES if name in timings]
+        if loaded:
+            print(f"  警告: 导入阶段加载了 {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import threading
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+from config import MAX_CALLS_PER_PROVIDER
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+
+class _Node:
+    __slots__ = ("fn", "deps", "provider", "future", "remaining")
+
+    def __init__(self, fn: Callable, deps: List["Future"], provider: str, future: "Future"):
+        self.fn = fn
+        self.deps = deps
+        self.provider = provider
+        self.future = future
+        self.remaining = len(deps)
+
+
+class CallGraph:
+    """按依赖关系执行LLM请求的调度器
+
+    每个请求是图中的一个节点，声明它依赖的其他节点和所属的服务商。节点的依赖全部完成后
+    立即提交到线程池，依赖的结果按声明顺序作为参数传给节点的函数；同一服务商同时进行的
+    请求数不超过 provider_limit，超出的节点排队等待。依赖失败的节点不会执行，
+    直接以相同的异常结束。
+
+    executor为None时，节点在依赖完成时直接在当前线程执行，即按添加顺序逐个执行。
+    """
+
+    def __init__(self, executor=None, provider_limit: int = MAX_CALLS_PER_PROVIDER):
+        self.executor = executor
+        self.provider_limit = provider_limit
+        self.lock = threading.Lock()
+        self.running: Dict[str, int] = defaultdict(int)
+        self.waiting: Dict[str, deque] = defaultdict(deque)
+
+    def add(self, fn: Callable, deps: Iterable["Future"] = (), provider: str = "") -> "Future":
+        """添加一个节点，返回代表其结果的Future"""
+        # concurrent.futures 会连带导入logging等模块，第一次调度时才导入，不拖慢启动
+        from concurrent.futures import Future
+        node = _Node(fn, list(deps), provider, Future())
+        if not node.deps:
+            self._ready(node)
+        for dep in node.deps:
+            dep.add_done_callback(lambda _, node=node: self._dep_done(node))
+        return node.future
+
+    def _dep_done(self, node: _Node):
+        with self.lock:
+            node.remaining -= 1
+            ready = node.remaining == 0
+        if ready:
+            self._ready(node)
+
+    def _ready(self, node: _Node):
+        failed = next((dep for dep in node.deps if dep.exception() is not None), None)
+        if failed is not None:
+            node.future.set_exception(failed.exception())
+            return
+        if self.executor is None:
+            self._run(node, limited=False)
+            return
+        with self.lock:
+            if self.running[node.provider] >= self.provider_limit:
+                self.waiting[node.provider].append(node)
+                return
+            self.running[node.provider] += 1
+        self.executor.submit(self._run, node)
+
+    def _run(self, node: _Node, limited: bool = True):
+        try:
+            result = node.fn(*[dep.result() for dep in node.deps])
+            error: Optional[BaseException] = None
+        except BaseException as e:
+            result, error = None, e
+
+        # 先释放服务商的并发名额，再设置结果，让依赖该结果的节点可以使用空出的名额
+        if limited:
+            with self.lock:
+                queue = self.waiting[node.provider]
+                next_node = queue.popleft() if queue else None
+                if next_node is None:
+                    self.running[node.provider] -= 1
+            if next_node is not None:
+                self.executor.submit(self._run, next_node)
+
+        if error is not None:
+            node.future.set_exception(error)
+        else:
+            node.future.set_result(result)
+
+
+def completed(value: Any) -> "Future":
+    """返回一个已经完成的Future，用于依赖已知结果的节点"""
+    from concurrent.futures import Future
+    future = Future()
+    future.set_result(value)
+    return future
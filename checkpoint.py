@@ -0,0 +1,67 @@
+import os
+import json
+import datetime
+from typing import Dict, Any
+
+# 检查点格式版本，格式变化时递增
+CHECKPOINT_VERSION = 1
+
+
+def default_checkpoint_path() -> str:
+    """生成默认的检查点文件路径：output/checkpoints/日期/checkpoint_时间.json"""
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+    date_str = datetime.datetime.now().strftime('%Y-%m-%d')
+    time_str = datetime.datetime.now().strftime('%H-%M-%S')
+    return os.path.join(output_dir, 'checkpoints', date_str, f'checkpoint_{time_str}.json')
+
+
+def save_checkpoint(path: str, data: Dict[str, Any]):
+    """原子地写入检查点
+
+    先写入同目录下的临时文件并落盘，再用 os.replace 替换目标文件，
+    因此任何时刻中断都不会留下写了一半的检查点。
+    """
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    payload = dict(data)
+    payload["version"] = CHECKPOINT_VERSION
+    payload["saved_at"] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(payload, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """读取检查点，版本不匹配时抛出 ValueError"""
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+
+    version = data.get("version")
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f"检查点版本不兼容：{version}（当前版本 {CHECKPOINT_VERSION}）")
+
+    return data
+
+
+def encode_random_state(state) -> list:
+    """把 random.getstate() 的结果转换为可以写入JSON的列表"""
+    version, internal_state, gauss_next = state
+    return [version, list(internal_state), gauss_next]
+
+
+def decode_random_state(data: list):
+    """把检查点中的随机数状态还原为 random.setstate() 接受的元组"""
+    version, internal_state, gauss_next = data
+    return (version, tuple(internal_state), gauss_next)
@@ -4,6 +4,78 @@ API_REQUEST_INTERVAL = 10  # 默认设置为60秒，防止上游负载饱和
 # GPT模型请求间隔时间（秒），只有GPT模型才会有延迟
 GPT_REQUEST_INTERVAL = 60
 
+# 展示用的停顿（每位玩家发言之间等待几秒），批量运行时关闭
+GAME_PACING = True
+
+# 同时进行的LLM请求数上限，默认为1，按顺序逐个请求（与原来的行为相同）；
+# 设置为大于1（例如8）时投票等阶段的请求并发进行，需要服务商的速率限制允许
+MAX_CONCURRENT_CALLS = 1
+
+# 同一服务商（相同base_url）同时进行的LLM请求数上限
+MAX_CALLS_PER_PROVIDER = 4
+
+# 在同一进程中运行多局游戏时（async_games.py），所有游戏同时进行的LLM请求数上限，
+# 每局的上限仍为 MAX_CONCURRENT_CALLS
+GLOBAL_CONCURRENT_CALLS = 32
+
+# 多机批量运行（job_queue.py）：工作进程领取一局游戏后持有的租约时长（秒），运行期间定期续约，
+# 工作进程崩溃、租约过期后由其他工作进程重新领取；每局最多尝试的次数
+JOB_LEASE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 3
+
+# 批量运行时把每局的玩家、陈述、质询、投票、淘汰和API调用写入的SQLite数据库（见 results_store.py），
+# None表示不写入
+RESULTS_DB = None
+# 批量运行时每多少局在一个事务中写入结果数据库
+RESULTS_BATCH_SIZE = 20
+
+# 质询策略：random（随机选择目标，原有的玩法）、round_robin（优先质询被质询次数最少的玩家）、
+# suspicion（优先质询得票最多的玩家），详见 interrogation_scheduler.py
+INTERROGATION_STRATEGY = "random"
+
+# 每轮质询次数上限，None表示每位存活玩家各提问一次
+INTERROGATION_BUDGET = None
+
+# 提前结束投票：先收集有可能确定第一名所需的最少票数，剩余的票无法改变第一名时不再请求，
+# 剩余玩家记为弃权；否则再一次收集其余的票。票数一边倒时减少请求，票数接近时投票分两批
+# 进行，比一次收集全部投票多等待一批请求的时间
+EARLY_VOTE_TERMINATION = False
+
+# 陈述复用策略：设置为None时每轮都为所有玩家重新生成陈述。
+# 启用后，只有上一轮被质询（regenerate_if_interrogated）、得票（regenerate_if_voted），
+# 或者陈述已经沿用了max_rounds轮的玩家才重新生成，其余玩家沿用上一轮的陈述。
+# 各项均可省略：regenerate_if_interrogated 和 regenerate_if_voted 默认为True，
+# max_rounds 默认为None，即不限制陈述沿用的轮数
+STATEMENT_REUSE_POLICY = None
+# STATEMENT_REUSE_POLICY = {
+#     "regenerate_if_interrogated": True,
+#     "regenerate_if_voted": True,
+#     "max_rounds": 2
+# }
+
+# 推测执行：投票统计后提前为预计幸存的玩家生成下一轮陈述，预测错误的结果会作废，
+# 作废的请求仍然消耗token，默认关闭
+SPECULATIVE_STATEMENTS = False
+
+# 每位AI玩家的滚动记忆：保留最近的条目数和每条保留的字数，更早的条目只保留次数统计
+PLAYER_MEMORY_ENTRIES = 8
+PLAYER_MEMORY_TEXT_LIMIT = 80
+
+# 复盘时提供给幸存者的游戏上下文字数上限，超出时较早的轮次只保留一行统计
+REVIEW_CONTEXT_LIMIT = 3000
+
+# AI裁判评论：设置为True时由LLM生成评论，否则使用固定格式的确认语句
+JUDGE_LLM_COMMENTS = False
+
+# AI裁判评论在独立的线程池中生成，同时进行的请求数上限
+JUDGE_MAX_CONCURRENT_CALLS = 2
+
+# AI裁判评论（包括开场介绍）从提交起超过该时间（秒）仍未生成时直接丢弃，不等待
+JUDGE_COMMENT_DEADLINE = 10
+
+# 游戏开始前检查每个API配置时，单次请求的超时时间（秒）
+PROBE_TIMEOUT = 10
+
 # GPT模型名称匹配模式列表，用于识别GPT模型
 GPT_MODEL_PATTERNS = [
     "gpt-",
@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import datetime
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any
+
+# 事件类型
+PLAYER = "player"  # 玩家加入游戏，text为玩家描述
+ROUND_START = "round_start"
+PHASE = "phase"  # 环节开始，text为环节名称
+STATEMENT = "statement"
+QUESTION = "question"
+ANSWER = "answer"
+VOTE = "vote"
+REVOTE = "revote"
+ABSTAIN = "abstain"  # 投票结果已确定，没有请求该玩家投票
+VOTE_SUMMARY = "vote_summary"  # actor为"投票"或"重新投票"，text为统计结果
+JUDGE = "judge"  # AI裁判的发言
+ELIMINATION = "elimination"
+GAME_END = "game_end"  # actor为幸存者角色名，用"、"分隔
+REVIEW = "review"  # 幸存者的游戏复盘
+
+# 会写入复盘上下文的事件类型
+CONTEXT_KINDS = {STATEMENT, QUESTION, ANSWER, VOTE, REVOTE, ELIMINATION}
+
+# 各类事件在游戏上下文中所属的小节标题
+SECTION_TITLES = {
+    STATEMENT: "- 陈述环节:",
+    QUESTION: "- 质询环节:",
+    ANSWER: "- 质询环节:",
+    VOTE: "- 投票环节:",
+    REVOTE: "- 重新投票:"
+}
+
+
+@dataclass(frozen=True)
+class GameEvent:
+    """游戏中发生的一个事件，写入后不再修改"""
+    seq: int
+    round: int
+    kind: str
+    actor: str  # 事件发起者的角色名
+    target: Optional[str] = None  # 事件对象的角色名
+    text: str = ""  # 陈述、问题、回答或投票理由
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "round": self.round,
+            "kind": self.kind,
+            "actor": self.actor,
+            "target": self.target,
+            "text": self.text,
+            "timestamp": self.timestamp
+        }
+
+
+# 复盘摘要中每条陈述、问题和回答保留的字数
+DIGEST_TEXT_LIMIT = 40
+
+
+def _clip(text: str, limit: int) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+class RoundSlice:
+    """单轮事件的切片，在事件写入时增量维护上下文文本和统计信息"""
+
+    def __init__(self, round_num: int):
+        self.round_num = round_num
+        self.events: List[GameEvent] = []
+        self.lines = [f"\n第{round_num}轮:"]
+        self.section = None
+        self.vote_tally: Dict[str, int] = {}
+        self.revote_tally: Dict[str, int] = {}
+        self.questioned: Dict[str, int] = {}
+        self.eliminated: Optional[str] = None
+        self._text: Optional[str] = None
+        self._digest: Optional[str] = None
+
+    def add(self, event: GameEvent):
+        self.events.append(event)
+        self._text = None
+        self._digest = None
+
+        title = SECTION_TITLES.get(event.kind)
+        if title and title != self.section:
+            self.lines.append(title)
+            self.section = title
+
+        if event.kind == STATEMENT:
+            statement = event.text
+            self.lines.append(f"  {event.actor}: {statement[:150]}..." if len(statement) > 150 else f"  {event.actor}: {statement}")
+        elif event.kind == QUESTION:
+            self.lines.append(f"  {event.actor} 质询 {event.target}: {event.text}")
+            self.questioned[event.target] = self.questioned.get(event.target, 0) + 1
+        elif event.kind == ANSWER:
+            self.lines.append(f"  {event.actor} 回答: {event.text}")
+        elif event.kind == VOTE:
+            self.lines.append(f"  {event.actor} 投票给 {event.target}, 理由: {event.text or '未提供理由'}")
+            self.vote_tally[event.target] = self.vote_tally.get(event.target, 0) + 1
+        elif event.kind == REVOTE:
+            self.lines.append(f"  {event.actor} 投票给 {event.target}")
+            self.revote_tally[event.target] = self.revote_tally.get(event.target, 0) + 1
+        elif event.kind == ELIMINATION:
+            self.lines.append(f"- 淘汰结果: {event.actor} 被淘汰")
+            self.eliminated = event.actor
+            self.section = None
+
+    def text(self) -> str:
+        """本轮的上下文文本，只有在有新事件时才重新拼接"""
+        if self._text is None:
+            self._text = "\n".join(self.lines)
+        return self._text
+
+    def digest(self) -> str:
+        """本轮的摘要，陈述和问答截短，投票只保留统计，用于复盘；生成一次后缓存到本轮有新事件为止"""
+        if self._digest is None:
+            lines = [f"\n第{self.round_num}轮:"]
+            statements = [f"  {event.actor}: {_clip(event.text, DIGEST_TEXT_LIMIT)}"
+                          for event in self.events if event.kind == STATEMENT]
+            if statements:
+                lines.append("- 陈述:")
+                lines.extend(statements)
+
+            exchanges = []
+            for event in self.events:
+                if event.kind == QUESTION:
+                    exchanges.append(f"  {event.actor} 质询 {event.target}: {_clip(event.text, DIGEST_TEXT_LIMIT)}")
+                elif event.kind == ANSWER and exchanges:
+                    exchanges[-1] += f" / 回答: {_clip(event.text, DIGEST_TEXT_LIMIT)}"
+            if exchanges:
+                lines.append("- 质询:")
+                lines.extend(exchanges)
+
+            if self.vote_tally:
+                lines.append("- 得票: " + "、".join(f"{role}{count}票" for role, count in self.vote_tally.items()))
+            if self.revote_tally:
+                lines.append("- 重新投票得票: " + "、".join(f"{role}{count}票" for role, count in self.revote_tally.items()))
+            if self.eliminated:
+                lines.append(f"- 淘汰结果: {self.eliminated} 被淘汰")
+            self._digest = "\n".join(lines)
+        return self._digest
+
+    def summary(self) -> str:
+        """本轮的简要统计"""
+        parts = [f"第{self.round_num}轮"]
+        if self.questioned:
+            parts.append("被质询: " + "、".join(f"{role}{count}次" for role, count in self.questioned.items()))
+        if self.vote_tally:
+            parts.append("得票: " + "、".join(f"{role}{count}票" for role, count in self.vote_tally.items()))
+        if self.eliminated:
+            parts.append(f"淘汰: {self.eliminated}")
+        return "，".join(parts)
+
+
+def default_events_path() -> str:
+    """生成默认的事件文件路径：output/日期/game_events_时间.jsonl"""
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+    date_str = datetime.datetime.now().strftime('%Y-%m-%d')
+    time_str = datetime.datetime.now().strftime('%H-%M-%S')
+    return os.path.join(output_dir, date_str, f'game_events_{time_str}.jsonl')
+
+
+class GameEventLog:
+    """只追加的游戏事件日志
+
+    事件在发生时写入，各轮的上下文文本和统计在写入时增量维护，
+    游戏结束时生成完整上下文只需拼接已经准备好的各轮文本。
+    打开事件文件后，每个事件同时以一行JSON写入文件，供 log_renderer 离线生成日志。
+    """
+
+    def __init__(self):
+        self.events: List[GameEvent] = []
+        self.rounds: Dict[int, RoundSlice] = {}
+        self.player_status: Dict[str, str] = {}  # 角色名 -> "幸存"/"被淘汰"
+        self.player_notes: Dict[str, str] = {}  # 角色名 -> 玩家信息中显示的描述
+        self.sink = None  # JSONL事件文件
+
+    def open_sink(self, path: str):
+        """打开JSONL事件文件并写入已有的事件
+
+        从检查点恢复时，文件中可能有检查点之后、中断之前写入的事件，
+        因此总是按日志中的事件重写整个文件，保证与检查点一致。
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.sink = open(path, 'w', encoding='utf-8', buffering=1)
+        for event in self.events:
+            self.sink.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+
+    def close_sink(self):
+        if self.sink:
+            self.sink.close()
+            self.sink = None
+
+    def register_player(self, role_name: str, note: str = ""):
+        """登记参与游戏的玩家，用于生成玩家信息"""
+        self.append(0, PLAYER, role_name, text=note)
+
+    def append(self, round_num: int, kind: str, actor: str, target: Optional[str] = None, text: str = "") -> GameEvent:
+        """追加一个事件"""
+        event = GameEvent(seq=len(self.events), round=round_num, kind=kind, actor=actor, target=target, text=text)
+        self._add_event(event)
+        if self.sink:
+            self.sink.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+        return event
+
+    def _add_event(self, event: GameEvent):
+        self.events.append(event)
+
+        if event.kind == PLAYER:
+            self.player_status[event.actor] = "幸存"
+            self.player_notes[event.actor] = event.text
+        elif event.kind == ELIMINATION:
+            self.player_status[event.actor] = "被淘汰"
+
+        if event.kind in CONTEXT_KINDS:
+            round_slice = self.rounds.get(event.round)
+            if round_slice is None:
+                round_slice = RoundSlice(event.round)
+                self.rounds[event.round] = round_slice
+            round_slice.add(event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可以写入JSON的字典，用于保存检查点"""
+        return {"events": [event.to_dict() for event in self.events]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GameEventLog":
+        """从检查点恢复事件日志，按原顺序重放所有事件"""
+        event_log = cls()
+        for event_data in data.get("events", []):
+            event_log._add_event(GameEvent(**event_data))
+        return event_log
+
+    def round_events(self, round_num: int) -> List[GameEvent]:
+        """返回某一轮的所有事件"""
+        round_slice = self.rounds.get(round_num)
+        return list(round_slice.events) if round_slice else []
+
+    def round_summary(self, round_num: int) -> str:
+        round_slice = self.rounds.get(round_num)
+        return round_slice.summary() if round_slice else ""
+
+    def round_digest(self, round_num: int) -> str:
+        round_slice = self.rounds.get(round_num)
+        return round_slice.digest() if round_slice else ""
+
+    def _player_lines(self) -> List[str]:
+        lines = ["【玩家信息】"]
+        for role_name, status in self.player_status.items():
+            lines.append(f"{role_name}({status}): {self.player_notes.get(role_name, '')}")
+        return lines
+
+    def context(self) -> str:
+        """整场游戏的完整上下文"""
+        context = self._player_lines()
+        context.append("\n【游戏过程】")
+        for round_slice in self.rounds.values():
+            context.append(round_slice.text())
+
+        return "\n".join(context)
+
+    def review_context(self, limit: int) -> str:
+        """长度有限的游戏上下文，用于复盘
+
+        从最近一轮往前使用各轮的摘要，超出 limit 字数后更早的轮次只保留一行统计，
+        最近一轮总是使用摘要。
+        """
+        rounds = []
+        used = 0
+        for round_slice in reversed(list(self.rounds.values())):
+            digest = round_slice.digest()
+            if rounds and used + len(digest) > limit:
+                digest = round_slice.summary()
+            rounds.append(digest)
+            used += len(digest)
+
+        context = self._player_lines()
+        context.append("\n【游戏过程】")
+        context.extend(reversed(rounds))
+        return "\n".join(context)
@@ -0,0 +1,108 @@
+"""质询调度
+
+决定每轮由哪些玩家提问、分别质询谁。所有策略都使用玩家名，历史信息取自
+GameState.round_history 中各轮的 interrogations 和 votes 记录。
+
+策略：
+    random       每位提问者随机选择目标，同一玩家可能被质询多次（原有的行为）
+    round_robin  优先质询至今被质询次数最少的玩家，轮流覆盖所有玩家
+    suspicion    优先质询至今得票最多的玩家，得票相同时优先被质询次数少的玩家
+
+除random外，每轮每位玩家最多被质询一次；设置预算k后每轮只进行k次质询，
+由至今提问次数最少的玩家提问。
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def count_history(round_history: List[Dict]) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, int]]:
+    """统计历史记录中每位玩家的提问次数、被质询次数和得票数"""
+    asked: Dict[str, int] = {}
+    questioned: Dict[str, int] = {}
+    votes: Dict[str, int] = {}
+    for record in round_history:
+        for interrogation in record.get("interrogations", []):
+            asked[interrogation["questioner"]] = asked.get(interrogation["questioner"], 0) + 1
+            questioned[interrogation["target"]] = questioned.get(interrogation["target"], 0) + 1
+        for vote in record.get("votes", []):
+            votes[vote["target"]] = votes.get(vote["target"], 0) + 1
+    return asked, questioned, votes
+
+
+def _random_targets(questioners: List[str], players: List[str], rng, history) -> List[Tuple[str, str]]:
+    return [(questioner, rng.choice([p for p in players if p != questioner])) for questioner in questioners]
+
+
+def _assign_distinct(questioners: List[str], priority: List[str]) -> List[Tuple[str, str]]:
+    """按优先顺序为提问者分配互不相同的目标，目标不能是提问者自己"""
+    targets = priority[:len(questioners)]
+    assigned: Dict[str, str] = {}
+    remaining = list(targets)
+    for questioner in questioners:
+        choice = next((target for target in remaining if target != questioner), None)
+        if choice is not None:
+            remaining.remove(choice)
+            assigned[questioner] = choice
+        elif assigned:
+            # 剩下的唯一目标就是自己：与前一位提问者交换目标
+            previous = next(name for name in assigned if assigned[name] != questioner)
+            assigned[questioner] = assigned[previous]
+            assigned[previous] = remaining.pop()
+        else:
+            # 只有一次质询且优先目标是自己，改为质询下一个目标
+            choice = next((target for target in priority if target != questioner), None)
+            if choice is not None:
+                assigned[questioner] = choice
+    return [(questioner, assigned[questioner]) for questioner in questioners if questioner in assigned]
+
+
+def _round_robin_targets(questioners: List[str], players: List[str], rng, history) -> List[Tuple[str, str]]:
+    _, questioned, _ = history
+    shuffled = list(players)
+    rng.shuffle(shuffled)  # 次数相同时随机决定先后
+    priority = sorted(shuffled, key=lambda name: questioned.get(name, 0))
+    return _assign_distinct(questioners, priority)
+
+
+def _suspicion_targets(questioners: List[str], players: List[str], rng, history) -> List[Tuple[str, str]]:
+    _, questioned, votes = history
+    shuffled = list(players)
+    rng.shuffle(shuffled)
+    priority = sorted(shuffled, key=lambda name: (-votes.get(name, 0), questioned.get(name, 0)))
+    return _assign_distinct(questioners, priority)
+
+
+STRATEGIES: Dict[str, Callable] = {
+    "random": _random_targets,
+    "round_robin": _round_robin_targets,
+    "suspicion": _suspicion_targets
+}
+
+
+def plan_round(players: List[str], round_history: List[Dict], rng,
+               strategy: str = "random", budget: Optional[int] = None) -> List[Tuple[str, str]]:
+    """生成本轮的质询计划
+
+    Args:
+        players: 按座位顺序排列的存活玩家名
+        round_history: 之前各轮的历史记录
+        rng: 随机数生成器（random模块或random.Random实例）
+        strategy: 选择目标的策略，见 STRATEGIES
+        budget: 本轮质询次数上限，None表示每位存活玩家各提问一次
+
+    Returns:
+        按座位顺序排列的 (提问者, 被质询者) 列表
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"不支持的质询策略：{strategy}，可选：{', '.join(STRATEGIES)}")
+    if len(players) < 2:
+        return []
+
+    history = count_history(round_history)
+    questioners = list(players)
+    if budget is not None and budget < len(players):
+        # 由至今提问次数最少的玩家提问，次数相同时按座位顺序
+        asked = history[0]
+        chosen = set(sorted(players, key=lambda name: asked.get(name, 0))[:max(budget, 0)])
+        questioners = [name for name in players if name in chosen]
+
+    return STRATEGIES[strategy](questioners, players, rng, history)
@@ -0,0 +1,305 @@
+"""多机批量运行的任务队列
+
+协调端把每局游戏的设定（参赛角色、随机种子、修改的配置项）写入一个SQLite数据库，
+任意数量的工作进程（可以在不同的机器上，使用各自的API配置）从中领取任务、无人值守地
+运行游戏并写回结果。领取任务时获得一个租约，运行期间定期续约；工作进程崩溃后租约过期，
+任务由其他工作进程重新领取，每局最多尝试 JOB_MAX_ATTEMPTS 次。
+
+不需要额外的服务，多台机器共享同一个数据库文件即可（网络文件系统需要支持文件锁）。
+
+运行方式：
+    python job_queue.py enqueue --db jobs.db --games 100 --seed 42
+    python job_queue.py enqueue --db jobs.db --games 20 --lineup Claude,DeepSeek,GPT --set EARLY_VOTE_TERMINATION=true
+    python job_queue.py worker --db jobs.db -o output/sweep
+    python job_queue.py status --db jobs.db
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, lease_until);
+"""
+
+# 任务状态：queued 等待领取，running 已被领取，done 已完成，failed 多次尝试后仍然失败
+STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobQueue:
+    """SQLite中的任务队列，每次操作使用独立的连接，可以在多个线程和进程中同时使用"""
+
+    def __init__(self, path: str, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextmanager
+    def transaction(self):
+        """在写事务中执行，事务开始时即取得写锁，并发的领取依次进行"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def enqueue(self, specs: List[Dict[str, Any]]) -> List[int]:
+        """加入一批任务，返回任务编号"""
+        now = time.time()
+        ids = []
+        with self.transaction() as db:
+            for spec in specs:
+                cursor = db.execute("INSERT INTO jobs (spec, created_at, updated_at) VALUES (?, ?, ?)",
+                                    (json.dumps(spec, ensure_ascii=False), now, now))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def next_index(self) -> int:
+        """下一局游戏的编号，多次加入任务时编号接续"""
+        with self.transaction() as db:
+            last = db.execute("SELECT MAX(json_extract(spec, '$.index')) FROM jobs").fetchone()[0]
+        return 0 if last is None else last + 1
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """领取最早的一个可运行任务，返回 {"id", "spec", "attempts"}，没有可领取的任务时返回None
+
+        租约已过期的任务视为所属的工作进程已经崩溃，重新领取；已经用完尝试次数的记为失败。
+        """
+        now = time.time()
+        with self.transaction() as db:
+            db.execute("UPDATE jobs SET status = 'failed', error = '租约过期', updated_at = ? "
+                       "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                       (now, now, self.max_attempts))
+            row = db.execute("SELECT id, spec, attempts FROM jobs WHERE status = 'queued' "
+                             "OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                       "updated_at = ? WHERE id = ?", (worker, now + self.lease_seconds, now, row["id"]))
+        return {"id": row["id"], "spec": json.loads(row["spec"]), "attempts": row["attempts"] + 1}
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """续约，任务已被其他工作进程领取时返回False"""
+        now = time.time()
+        with self.transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease_until = ?, updated_at = ? "
+                                "WHERE id = ? AND worker = ? AND status = 'running'",
+                                (now + self.lease_seconds, now, job_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]) -> bool:
+        """写回结果，任务已被其他工作进程领取时结果作废并返回False"""
+        with self.transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, "
+                                "updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """记录失败，尚未用完尝试次数时重新排队，否则记为失败"""
+        with self.transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+                                "error = ?, lease_until = NULL, updated_at = ? "
+                                "WHERE id = ? AND worker = ? AND status = 'running'",
+                                (self.max_attempts, error, time.time(), job_id, worker))
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with self.transaction() as db:
+            rows = db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def results(self) -> List[Dict[str, Any]]:
+        """已完成任务的游戏结果，按局号排列"""
+        with self.transaction() as db:
+            rows = db.execute("SELECT result FROM jobs WHERE status = 'done'").fetchall()
+        return sorted((json.loads(row["result"]) for row in rows), key=lambda result: result["index"])
+
+
+class Heartbeat:
+    """在后台线程中定期为任务续约，间隔为租约时长的三分之一"""
+
+    def __init__(self, queue: JobQueue, job_id: int, worker: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker = worker
+        self.lost = False  # 续约失败，任务已被其他工作进程领取
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker):
+                    self.lost = True
+                    return
+            except sqlite3.Error:
+                pass  # 数据库暂时不可用，下次再续约
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def make_specs(games: int, start_index: int = 0, seed: Optional[int] = None, lineup: Optional[List[str]] = None,
+               overrides: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """生成一批游戏设定，检查参赛角色和配置项"""
+    from tournament import GAME_SETTINGS, game_seeds, player_roles
+
+    if lineup is not None:
+        unknown = set(lineup) - set(player_roles())
+        if unknown:
+            raise ValueError(f"参赛角色在API_CONFIGS中没有对应的配置：{', '.join(sorted(unknown))}")
+        if len(lineup) < 2:
+            raise ValueError("至少需要两名参赛角色")
+    unknown = set(overrides or {}) - set(GAME_SETTINGS)
+    if unknown:
+        raise ValueError(f"不支持修改的配置项：{', '.join(sorted(unknown))}，可选：{', '.join(GAME_SETTINGS)}")
+    return [{"index": start_index + offset, "seed": game_seed, "lineup": lineup, "overrides": overrides or {}}
+            for offset, game_seed in enumerate(game_seeds(games, seed))]
+
+
+def run_worker(queue: JobQueue, output_dir: str, worker: Optional[str] = None, max_jobs: Optional[int] = None,
+               poll_interval: float = 5.0) -> int:
+    """领取并运行任务，直到队列中没有未完成的任务或者运行了max_jobs局，返回完成的局数"""
+    import ai_player
+    from tournament import SharedRateLimiter, run_game, open_results_writer
+
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    os.makedirs(output_dir, exist_ok=True)
+    ai_player.use_rate_limiter(SharedRateLimiter({}, threading.Lock()))
+    print(f"工作进程 {worker} 开始运行，输出目录 {output_dir}")
+
+    # 只有成功写回的结果才写入结果数据库，key由队列和任务编号组成，重新运行的任务替换原有的记录
+    writer = open_results_writer()
+    done = 0
+    try:
+        while max_jobs is None or done < max_jobs:
+            job = queue.claim(worker)
+            if job is None:
+                counts = queue.counts()
+                if not counts["queued"] and not counts["running"]:
+                    break
+                # 其余任务正在其他工作进程中运行，等待它们完成或者租约过期
+                time.sleep(poll_interval)
+                continue
+
+            spec = job["spec"]
+            print(f"领取第{spec['index']}局（任务{job['id']}，第{job['attempts']}次尝试）")
+            record_key = f"{os.path.abspath(queue.path)}#{job['id']}"
+            with Heartbeat(queue, job["id"], worker) as heartbeat:
+                try:
+                    result = run_game(spec["index"], spec["seed"], output_dir, spec.get("lineup"),
+                                      spec.get("overrides"), record_key)
+                except Exception as e:
+                    result = {"index": spec["index"], "error": f"{type(e).__name__}: {e}"}
+            record = result.pop("record", None)
+
+            if heartbeat.lost:
+                print(f"第{spec['index']}局的租约已过期并被其他工作进程领取，结果作废")
+            elif result["error"]:
+                queue.fail(job["id"], worker, result["error"])
+                print(f"第{spec['index']}局出错：{result['error']}")
+            elif queue.complete(job["id"], worker, result):
+                done += 1
+                if writer is not None and record is not None:
+                    writer.add(record)
+                print(f"第{spec['index']}局结束，幸存者：{'、'.join(result['winners'])}")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"工作进程 {worker} 结束，完成{done}局")
+    return done
+
+
+def main():
+    import argparse
+    from tournament import summarize, print_summary
+
+    parser = argparse.ArgumentParser(description="通过SQLite任务队列在多台机器上批量运行AI地牢生存游戏")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="加入一批游戏")
+    enqueue.add_argument("--db", required=True, help="任务队列数据库文件")
+    enqueue.add_argument("--games", type=int, default=10, help="加入的局数")
+    enqueue.add_argument("--seed", type=int, default=None, help="随机种子，相同种子的座位和发言顺序相同")
+    enqueue.add_argument("--lineup", help="参赛角色，用逗号分隔，默认为所有配置的角色")
+    enqueue.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                         help="修改本批游戏的配置项，例如 INTERROGATION_BUDGET=3，可以重复使用")
+
+    worker = commands.add_parser("worker", help="领取并运行游戏，直到队列中的游戏全部完成")
+    worker.add_argument("--db", required=True, help="任务队列数据库文件")
+    worker.add_argument("-o", "--output", help="输出目录，默认为 output/jobs_时间")
+    worker.add_argument("--max-jobs", type=int, default=None, help="最多运行的局数")
+    worker.add_argument("--lease", type=float, default=JOB_LEASE_SECONDS, help="租约时长（秒）")
+
+    status = commands.add_parser("status", help="查看任务进度和已完成游戏的统计")
+    status.add_argument("--db", required=True, help="任务队列数据库文件")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        queue = JobQueue(args.db)
+        overrides = {}
+        for item in args.set:
+            key, _, value = item.partition("=")
+            overrides[key] = json.loads(value)
+        lineup = args.lineup.split(",") if args.lineup else None
+        specs = make_specs(args.games, queue.next_index(), args.seed, lineup, overrides)
+        queue.enqueue(specs)
+        print(f"已加入{len(specs)}局（第{specs[0]['index']}-{specs[-1]['index']}局）" if specs else "没有加入任何游戏")
+    elif args.command == "worker":
+        from tournament import default_output_dir
+        run_worker(JobQueue(args.db, lease_seconds=args.lease), args.output or default_output_dir("jobs"),
+                   max_jobs=args.max_jobs)
+    else:
+        queue = JobQueue(args.db)
+        counts = queue.counts()
+        print("，".join(f"{status} {count}" for status, count in counts.items()))
+        results = queue.results()
+        if results:
+            print_summary(summarize(results))
+
+
+if __name__ == "__main__":
+    main()
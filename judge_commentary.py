@@ -0,0 +1,169 @@
+"""AI裁判评论
+
+裁判评论不在游戏的关键路径上：事件发生时提交评论请求后立即返回，评论在独立的线程池中
+生成，同时进行的请求数受 JUDGE_MAX_CONCURRENT_CALLS 限制，与玩家的请求互不占用名额。
+评论在所评论事件的输出位置登记（见 output_sequencer.run_in_order），因此无论事件在哪个
+线程中发生，评论的顺序都与事件的输出顺序相同。LLM生成的评论由主线程在阶段结束时通过
+drain() 按顺序输出，从提交起超过 JUDGE_COMMENT_DEADLINE 秒仍未生成的评论直接丢弃，
+裁判不会拖慢游戏。
+
+不使用LLM生成评论时（JUDGE_LLM_COMMENTS 为 False），固定格式的确认语句在提交时直接生成，
+紧接在所评论事件的输出之后输出。
+"""
+import time
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional
+
+from config import JUDGE_LLM_COMMENTS, JUDGE_MAX_CONCURRENT_CALLS, JUDGE_COMMENT_DEADLINE
+from output_sequencer import DeferredOutput, run_in_order
+from call_graph import completed
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+
+class PendingComment:
+    """一条已提交、尚未输出的裁判评论，生成过程中的输出先缓存起来"""
+
+    def __init__(self, future: "Future", deadline: float, output: Optional[DeferredOutput] = None):
+        self.future = future
+        self.deadline = deadline
+        self.output = output
+
+    def expired(self) -> bool:
+        return not self.future.done() and time.monotonic() >= self.deadline
+
+    def release(self):
+        """输出生成评论时缓存的内容"""
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+    def drop(self):
+        """丢弃评论及其缓存的输出，仍在进行的请求不会被中断，结果被忽略"""
+        self.future.cancel()
+        if self.output is not None:
+            # 请求结束后才能停止缓存，否则请求之后的输出会直接出现在游戏输出中
+            output, self.output = self.output, None
+            self.future.add_done_callback(lambda _: output.discard())
+
+
+class JudgeCommentary:
+    """按事件生成AI裁判评论的旁路流水线
+
+    Args:
+        judge: 裁判的AIPlayer，None表示没有裁判，提交的事件直接忽略
+        say: 输出一条裁判发言的函数
+        use_llm: 是否由LLM生成评论
+        deadline: 评论从提交起的最长等待时间（秒）
+        max_workers: 同时进行的裁判请求数上限
+    """
+
+    def __init__(self, judge, say: Callable[[str], None], use_llm: bool = JUDGE_LLM_COMMENTS,
+                 deadline: float = JUDGE_COMMENT_DEADLINE, max_workers: int = JUDGE_MAX_CONCURRENT_CALLS):
+        self.judge = judge
+        self.say = say
+        self.use_llm = use_llm
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.pending: Deque[PendingComment] = deque()
+        self.lock = threading.RLock()
+        self.stats: Dict[str, int] = {"submitted": 0, "emitted": 0, "dropped": 0}
+        self.initializer: Optional[Callable[[], None]] = None  # 线程池中的线程启动时调用
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="judge",
+                                                initializer=self.initializer)
+        return self._executor
+
+    def call(self, fn: Callable, *args, **kwargs) -> PendingComment:
+        """在裁判的线程池中执行一个请求，用 wait() 获取结果"""
+        output = DeferredOutput().start()
+        future = self.executor.submit(output.run, fn, *args, **kwargs)
+        return PendingComment(future, time.monotonic() + self.deadline, output)
+
+    def _settle(self, pending: PendingComment) -> bool:
+        """等待请求完成，超过截止时间或请求失败时丢弃并返回False"""
+        try:
+            pending.future.result(timeout=max(pending.deadline - time.monotonic(), 0))
+        except Exception:
+            pending.drop()
+            with self.lock:
+                self.stats["dropped"] += 1
+            return False
+        return True
+
+    def wait(self, pending: PendingComment) -> Optional[Any]:
+        """等待请求完成并返回结果，超过截止时间或请求失败时丢弃并返回None"""
+        return pending.future.result() if self._settle(pending) else None
+
+    def submit(self, event_type: str, **kwargs):
+        """提交一个游戏事件，LLM请求立即开始，评论在事件的输出位置登记"""
+        if self.judge is None:
+            return
+        if self.use_llm:
+            pending = self.call(self.judge.comment_on_event, event_type, use_llm=True, **kwargs)
+        else:
+            # 固定格式的确认语句不需要请求，直接生成
+            pending = PendingComment(completed(self.judge.comment_on_event(event_type, **kwargs)), float("inf"))
+        # 并发的事件由各自的线程提交，推迟到事件输出时登记，登记顺序与输出顺序相同
+        run_in_order(lambda: self._enqueue(pending))
+
+    def _enqueue(self, pending: PendingComment):
+        """登记一条评论；固定格式的评论已经生成，与此前的评论一起直接输出"""
+        with self.lock:
+            self.pending.append(pending)
+            self.stats["submitted"] += 1
+            if not self.use_llm:
+                self.emit_ready()
+
+    def emit_ready(self):
+        """按提交顺序输出已经生成好的评论，遇到仍在生成且未超时的评论时停止
+
+        输出位置取决于调用时机，LLM生成的评论应当由主线程在阶段结束时通过 drain() 输出。
+        """
+        with self.lock:
+            while self.pending:
+                head = self.pending[0]
+                if head.expired():
+                    self.pending.popleft()
+                    head.drop()
+                    self.stats["dropped"] += 1
+                elif head.future.done():
+                    self.pending.popleft()
+                    self._emit(head)
+                else:
+                    break
+
+    def drain(self):
+        """等待所有已提交的评论，每条最多等到各自的截止时间，按顺序输出"""
+        with self.lock:
+            while self.pending:
+                head = self.pending.popleft()
+                if self._settle(head):
+                    self._emit(head)
+
+    def _emit(self, pending: PendingComment):
+        try:
+            comment = pending.future.result()
+        except Exception:
+            comment = None
+        pending.release()
+        if comment:
+            self.say(comment)
+            self.stats["emitted"] += 1
+
+    def shutdown(self):
+        """丢弃未输出的评论并关闭线程池"""
+        with self.lock:
+            while self.pending:
+                self.pending.popleft().drop()
+                self.stats["dropped"] += 1
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
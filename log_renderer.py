@@ -0,0 +1,133 @@
+"""根据游戏输出的JSONL事件离线生成日志
+
+游戏进行中只写入结构化事件（见 game_events.py），markdown等格式的日志在游戏结束后
+或任意时刻由本模块生成，不再依赖对控制台输出的猜测式过滤。
+
+运行方式：
+    python log_renderer.py output/2025-04-12/game_events_10-30-00.jsonl
+    python log_renderer.py events.jsonl --format txt -o game.txt
+"""
+import os
+import json
+import datetime
+from typing import List, Dict, Callable
+
+
+def load_events(path: str) -> List[Dict]:
+    """读取JSONL事件文件，跳过末尾可能写了一半的行"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def _format_time(events: List[Dict]) -> str:
+    if not events:
+        return ""
+    return datetime.datetime.fromtimestamp(events[0]["timestamp"]).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def render_markdown(events: List[Dict]) -> str:
+    """生成markdown格式的游戏日志"""
+    lines = ["# AI地牢生存游戏记录", "", f"*记录时间: {_format_time(events)}*", ""]
+
+    players = [event["actor"] for event in events if event["kind"] == "player"]
+    if players:
+        lines.append("## 玩家身份一览")
+        lines.append("")
+        lines.extend(f"- {role_name}" for role_name in players)
+        lines.append("")
+
+    for event in events:
+        kind = event["kind"]
+        actor = event["actor"]
+        target = event.get("target")
+        text = event.get("text", "")
+
+        if kind == "round_start":
+            lines.extend(["", f"## {actor}"])
+        elif kind == "phase":
+            lines.extend(["", f"### {actor}"])
+        elif kind == "statement":
+            lines.extend(["", f"#### {actor}的陈述", "", text])
+        elif kind == "question":
+            lines.extend(["", f"#### {actor} 质询 {target}", "", f"> **{actor}**: {text}"])
+        elif kind == "answer":
+            lines.extend(["", f"> **{actor}**: {text}"])
+        elif kind == "vote":
+            lines.append(f"- {actor} 投票给 {target}，理由：{text}")
+        elif kind == "revote":
+            lines.append(f"- {actor} 重新投票给 {target}")
+        elif kind == "abstain":
+            lines.append(f"- {actor} 弃权（{text}）")
+        elif kind == "vote_summary":
+            lines.extend(["", f"**{actor}统计结果**：{text}", ""])
+        elif kind == "judge":
+            lines.extend(["", f"> AI裁判: {text}"])
+        elif kind == "elimination":
+            lines.extend(["", f"#### 被淘汰者：{actor}"])
+        elif kind == "game_end":
+            lines.extend(["", "## 游戏结束", "", f"恭喜！{actor.replace('、', ' 和 ')} 成功逃离地牢！"])
+        elif kind == "review":
+            lines.extend(["", f"#### {actor}的游戏复盘", "", text])
+
+    return "\n".join(lines) + "\n"
+
+
+def render_text(events: List[Dict]) -> str:
+    """生成纯文本格式的游戏日志，每个事件一行"""
+    lines = [f"AI地牢生存游戏记录 {_format_time(events)}"]
+    for event in events:
+        target = f" -> {event['target']}" if event.get("target") else ""
+        text = f": {event['text']}" if event.get("text") else ""
+        lines.append(f"[第{event['round']}轮][{event['kind']}] {event['actor']}{target}{text}")
+    return "\n".join(lines) + "\n"
+
+
+RENDERERS: Dict[str, Callable[[List[Dict]], str]] = {
+    "md": render_markdown,
+    "txt": render_text
+}
+
+
+def default_output_path(events_path: str, fmt: str) -> str:
+    """game_events_时间.jsonl -> game_log_时间.md"""
+    directory, filename = os.path.split(events_path)
+    stem = os.path.splitext(filename)[0].replace("game_events_", "game_log_", 1)
+    return os.path.join(directory, f"{stem}.{fmt}")
+
+
+def render_events_file(events_path: str, fmt: str = "md", output_path: str = None) -> str:
+    """读取事件文件并写出指定格式的日志，返回输出文件路径"""
+    if fmt not in RENDERERS:
+        raise ValueError(f"不支持的日志格式：{fmt}，可选：{', '.join(RENDERERS)}")
+
+    output_path = output_path or default_output_path(events_path, fmt)
+    content = RENDERERS[fmt](load_events(events_path))
+    with open(output_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    return output_path
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="根据JSONL事件生成游戏日志")
+    parser.add_argument("events", help="游戏输出的JSONL事件文件")
+    parser.add_argument("--format", default="md", choices=sorted(RENDERERS), help="输出格式")
+    parser.add_argument("-o", "--output", help="输出文件路径，默认与事件文件同目录")
+    args = parser.parse_args()
+
+    output_path = render_events_file(args.events, args.format, args.output)
+    print(f"日志已生成: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,158 @@ import sys
 import datetime
 import re
 import shutil
+import string
+import queue
+import threading
 from contextlib import contextmanager
 
+# 以下前缀开头的行是LLM请求和调用信息，不写入游戏日志
+DROP_PREFIXES = ("LLM请求:", "LLM推理内容:", "LLM调用出错:")
+
+# 只包含JSON对象或列表的行（英文技术信息和调试信息）
+JSON_LINE_PATTERN = re.compile(r'^\s*(?:\{.*\}|\[.*\])\s*$')
+
+# 角色记忆中的*斜体*元数据标记
+ITALIC_PATTERN = re.compile(r'\*.*?\*')
+
+# 用于统计英文字符数量：先丢弃非ASCII字符，再删除英文字母后比较长度
+ASCII_LETTERS = string.ascii_letters.encode('ascii')
+
+# 小写后包含这些关键字的行是技术信息
+TECHNICAL_KEYWORDS = ("error", "code:", "request id:")
+
+# 记忆陈述中的提示词
+PROMPT_KEYWORDS = ("被质疑时可补充", "质询关键点")
+
+
+def _section_header(line: str, level: str, marker: str) -> str:
+    return "\n\n" + level + " " + line.replace(marker, "").strip()
+
+
+# 完整匹配的游戏阶段标识和阶段内小节，直接查表得到markdown标题
+SECTION_HEADERS = {
+    line: _section_header(line, level, marker)
+    for line, level, marker in [
+        ("=== 欢迎来到AI鱿鱼游戏 ===", "##", "==="),
+        ("=== 游戏结束 ===", "##", "==="),
+        ("=== 终极测试 ===", "##", "==="),
+        ("--- 记忆陈述轮开始 ---", "###", "---"),
+        ("--- 死亡质询轮开始 ---", "###", "---"),
+        ("--- 恐惧投票开始 ---", "###", "---"),
+        ("--- 处决阶段 ---", "###", "---"),
+        ("--- 质询环节开始 ---", "###", "---"),
+        ("--- 陈述环节开始 ---", "###", "---"),
+        ("--- 投票环节开始 ---", "###", "---"),
+        ("--- 淘汰阶段 ---", "###", "---"),
+        ("投票结果：", "####", "")
+    ]
+}
+
+
+# 后台写入线程使用的控制标记
+_FLUSH = object()
+_STOP = object()
+
+
+class BackgroundWriter:
+    """后台写入线程
+
+    游戏线程只负责把消息放入有界队列；写入线程按顺序成批取出消息交给handler处理，
+    每批处理完后统一刷新一次。队列满时put会阻塞，形成背压，避免内存无限增长。
+    """
+
+    def __init__(self, handler, flusher, max_pending=10000, batch_size=256):
+        self.handler = handler
+        self.flusher = flusher
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, message):
+        """放入队列；已经开始关闭时等待剩余消息写完后返回False，由调用方直接写入"""
+        with self.lock:
+            if not self.closed:
+                self.queue.put(message)
+                return True
+        self.thread.join()
+        return False
+
+    def request_flush(self):
+        return self.submit(_FLUSH)
+
+    def close(self):
+        """写入所有剩余消息后停止线程，之后提交的消息不再进入队列"""
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.queue.put(_STOP)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for item in batch:
+                if item is _STOP:
+                    stop = True
+                    break
+                if item is _FLUSH:
+                    continue
+                try:
+                    self.handler(item)
+                except Exception as e:
+                    sys.__stderr__.write(f"日志写入失败: {str(e)}\n")
+
+            try:
+                self.flusher()
+            except Exception as e:
+                sys.__stderr__.write(f"日志刷新失败: {str(e)}\n")
+
+            if stop:
+                return
+
+
 class OutputRedirector:
     def __init__(self, simplified=True):
         self.terminal = sys.stdout
         self.output_file = None
         self.console_log_file = None  # 新增：用于保存完整控制台日志的文件
         self.simplified = simplified
-        self.buffer = ""
+        self._pending = []  # 尚未遇到换行符的片段，避免长输出反复拼接字符串
+        self._writer = None  # 启用后台写入后，所有写入都由写入线程完成
+    
+    @property
+    def buffer(self):
+        """缓冲区中尚未完成的行"""
+        return "".join(self._pending)
+    
+    def start_background_writer(self, max_pending=10000):
+        """启动后台写入线程，此后write只需把消息放入队列"""
+        if self._writer is None:
+            self._writer = BackgroundWriter(self._write_now, self._flush_now, max_pending=max_pending)
+    
+    def stop_background_writer(self):
+        """等待队列中的消息全部写入后停止后台线程，之后恢复同步写入"""
+        if self._writer is not None:
+            # 先等写入线程写完队列中的消息，再恢复同步写入，避免两边同时写文件
+            self._writer.close()
+            self._writer = None
     
     def write(self, message):
+        writer = self._writer
+        if writer is None or not writer.submit(message):
+            self._write_now(message)
+    
+    def _write_now(self, message):
         self.terminal.write(message)
         
         # 保存完整控制台日志
@@ -24,109 +165,109 @@ class OutputRedirector:
         if self.output_file:
             # 如果启用简化模式，过滤掉不需要的内容
             if self.simplified:
-                # 将消息添加到缓冲区
-                self.buffer += message
-                # 当遇到换行符时处理缓冲区
-                if '\n' in self.buffer:
-                    lines = self.buffer.split('\n')
-                    self.buffer = lines.pop()  # 保留最后一个不完整的行
-                    
-                    for line in lines:
-                        filtered_line = self._filter_line(line)
-                        if filtered_line:
-                            self.output_file.write(filtered_line + '\n')
+                # 没有换行符时只记录片段，不处理
+                if '\n' not in message:
+                    if message:
+                        self._pending.append(message)
+                    return
+                
+                lines = message.split('\n')
+                if self._pending:
+                    self._pending.append(lines[0])
+                    lines[0] = "".join(self._pending)
+                # 保留最后一个不完整的行
+                last = lines.pop()
+                self._pending = [last] if last else []
+                
+                for line in lines:
+                    filtered_line = self._filter_line(line)
+                    if filtered_line:
+                        self.output_file.write(filtered_line + '\n')
             else:
                 self.output_file.write(message)
     
+    def drain_buffer(self):
+        """处理缓冲区中剩余的不完整行"""
+        if self.simplified and self._pending and self.output_file:
+            filtered_line = self._filter_line(self.buffer)
+            if filtered_line:
+                self.output_file.write(filtered_line)
+        self._pending = []
+    
     def _filter_line(self, line):
         # 过滤掉LLM请求和调用信息
-        if line.startswith("LLM请求:") or line.startswith("LLM推理内容:") or line.startswith("LLM调用出错:"):
+        if line.startswith(DROP_PREFIXES):
             return None
             
         # 过滤掉英文技术信息和调试信息
-        if re.match(r'^\s*\{.*\}\s*$', line) or re.match(r'^\s*\[.*\]\s*$', line):
+        if JSON_LINE_PATTERN.match(line):
+            return None
+        
+        stripped = line.strip()
+        
+        # 过滤掉空行或只有空白字符的行
+        if not stripped:
             return None
             
         # 过滤掉包含大量英文的行
-        english_char_count = len(re.findall(r'[a-zA-Z]', line))
-        total_char_count = len(line.strip())
-        if total_char_count > 0 and english_char_count / total_char_count > 0.5:
+        ascii_part = line.encode('ascii', 'ignore')
+        english_char_count = len(ascii_part) - len(ascii_part.translate(None, ASCII_LETTERS))
+        if english_char_count / len(stripped) > 0.5:
             return None
             
         # 过滤掉特定的技术信息行
-        if "error" in line.lower() or "code:" in line.lower() or "request id:" in line.lower():
-            return None
-            
-        # 过滤掉空行或只有空白字符的行
-        if not line.strip():
+        lowered = line.lower()
+        if any(keyword in lowered for keyword in TECHNICAL_KEYWORDS):
             return None
         
         # 清理角色记忆中的技术指导信息
-        if "**" in line or "- **" in line:
+        if "**" in line:
             return None
             
         # 清理记忆中的元数据标记
-        line = re.sub(r'\*.*?\*', '', line)  # 移除*斜体*标记
+        if "*" in line:
+            line = ITALIC_PATTERN.sub('', line)  # 移除*斜体*标记
+            stripped = line.strip()
         
         # 移除记忆陈述中的提示词
-        if "被质疑时可补充" in line or "质询关键点" in line:
+        if any(keyword in line for keyword in PROMPT_KEYWORDS):
             return None
         
         # 添加markdown格式分隔符和标记
-        # 游戏阶段标识
-        if line.strip() == "=== 欢迎来到AI鱿鱼游戏 ===":
-            return "\n\n## " + line.strip().replace("===", "").strip()
-        elif line.strip().startswith("=== 第") and line.strip().endswith("轮开始 ==="):
-            return "\n\n## " + line.strip().replace("===", "").strip()
-        elif line.strip() == "=== 游戏结束 ===":
-            return "\n\n## " + line.strip().replace("===", "").strip()
-        # 游戏阶段内的小节
-        elif line.strip() == "--- 记忆陈述轮开始 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "--- 死亡质询轮开始 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "--- 恐惧投票开始 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "--- 处决阶段 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "=== 终极测试 ===":
-            return "\n\n## " + line.strip().replace("===", "").strip()
-        elif line.strip() == "--- 质询环节开始 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "--- 陈述环节开始 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "--- 投票环节开始 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
-        elif line.strip() == "--- 淘汰阶段 ---":
-            return "\n\n### " + line.strip().replace("---", "").strip()
+        # 游戏阶段标识和阶段内的小节
+        header = SECTION_HEADERS.get(stripped)
+        if header is not None:
+            return header
+        if stripped.startswith("=== 第") and stripped.endswith("轮开始 ==="):
+            return _section_header(stripped, "##", "===")
         # 玩家陈述之间添加分隔符
-        elif "的陈述：" in line.strip():
-            return "\n\n#### " + line.strip()
-        # 投票结果
-        elif line.strip() == "投票结果：":
-            return "\n\n#### " + line.strip()
+        if "的陈述：" in stripped:
+            return "\n\n#### " + stripped
         # 被处决者
-        elif line.strip().startswith("被处决者："):
-            return "\n\n#### " + line.strip()
+        if stripped.startswith("被处决者："):
+            return "\n\n#### " + stripped
         # 质询对话
-        elif "正在质询" in line.strip():
-            return "\n\n#### " + line.strip()
+        if "正在质询" in stripped:
+            return "\n\n#### " + stripped
             
         # AI裁判的评论用引用格式突出显示
-        elif line.strip().startswith("AI裁判:"):
-            return "\n> " + line.strip()
+        if stripped.startswith("AI裁判:"):
+            return "\n> " + stripped
             
         # 玩家对话用引用格式和不同缩进区分
-        elif ": " in line.strip() and not line.strip().startswith("投票统计结果"):
-            parts = line.strip().split(": ", 1)
-            if len(parts) == 2:
-                speaker, content = parts
-                return "\n> **" + speaker + "**: " + content
+        if ": " in stripped and not stripped.startswith("投票统计结果"):
+            speaker, content = stripped.split(": ", 1)
+            return "\n> **" + speaker + "**: " + content
             
         # 保留游戏流程相关的中文内容
-        return line.strip() if line.strip() else None
+        return stripped if stripped else None
     
     def flush(self):
+        writer = self._writer
+        if writer is None or not writer.request_flush():
+            self._flush_now()
+    
+    def _flush_now(self):
         self.terminal.flush()
         if self.output_file:
             self.output_file.flush()
@@ -134,11 +275,14 @@ class OutputRedirector:
             self.console_log_file.flush()
 
 @contextmanager
-def redirect_output(simplified=True):
+def redirect_output(simplified=True, background=True, markdown=True):
     """重定向输出到文件
     
     Args:
         simplified: 是否简化输出，过滤掉LLM请求和英文技术信息
+        background: 是否使用后台线程写入终端和日志文件，游戏线程只需入队
+        markdown: 是否通过过滤控制台输出生成markdown游戏日志。
+            游戏已输出JSONL事件时可以关闭，改由 log_renderer 离线生成
     """
     # 创建output文件夹（如果不存在）
     output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
@@ -168,7 +312,8 @@ def redirect_output(simplified=True):
     
     # 设置输出重定向
     redirector = OutputRedirector(simplified=simplified)
-    redirector.output_file = open(output_file_path, 'w', encoding='utf-8')
+    if markdown:
+        redirector.output_file = open(output_file_path, 'w', encoding='utf-8')
     redirector.console_log_file = open(console_log_path, 'w', encoding='utf-8')
     
     # 写入Markdown标题
@@ -176,16 +321,18 @@ def redirect_output(simplified=True):
         redirector.output_file.write("# AI地牢生存游戏记录\n\n")
         redirector.output_file.write(f"*记录时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
     
+    if background:
+        redirector.start_background_writer()
     sys.stdout = redirector
     
     try:
         yield
     finally:
+        # 等待后台线程写完队列中的所有内容
+        redirector.stop_background_writer()
+        
         # 处理缓冲区中剩余的内容
-        if redirector.simplified and redirector.buffer and redirector.output_file:
-            filtered_line = redirector._filter_line(redirector.buffer)
-            if filtered_line:
-                redirector.output_file.write(filtered_line)
+        redirector.drain_buffer()
         
         # 恢复标准输出并关闭文件
         if redirector.output_file:
@@ -193,5 +340,6 @@ def redirect_output(simplified=True):
         if redirector.console_log_file:
             redirector.console_log_file.close()
         sys.stdout = redirector.terminal
-        print(f"\n游戏日志已保存到: {output_file_path}")
+        if markdown:
+            print(f"\n游戏日志已保存到: {output_file_path}")
         print(f"控制台完整日志已保存到: {console_log_path}")
\ No newline at end of file
@@ -0,0 +1,209 @@
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# 当前线程正在执行的有序任务：(sequencer, slot)
+_local = threading.local()
+
+# 多个sequencer可能同时存在，stdout代理按引用计数安装和移除
+_install_lock = threading.Lock()
+_install_count = 0
+
+
+class _SequencedStdout:
+    """安装在 sys.stdout 上的代理
+
+    有序任务线程中的输出写入该任务的槽位，其余线程的输出直接写入原来的 stdout。
+    """
+
+    def __init__(self, target):
+        self.target = target
+
+    def write(self, message):
+        active = getattr(_local, "active", None)
+        if active is not None:
+            sequencer, slot = active
+            sequencer.buffer(slot, message)
+        else:
+            self.target.write(message)
+
+    def flush(self):
+        self.target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+
+def _install() -> Any:
+    """安装stdout代理并返回原来的stdout"""
+    global _install_count
+    with _install_lock:
+        if not isinstance(sys.stdout, _SequencedStdout):
+            sys.stdout = _SequencedStdout(sys.stdout)
+        _install_count += 1
+        return sys.stdout.target
+
+
+def _uninstall():
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count == 0 and isinstance(sys.stdout, _SequencedStdout):
+            sys.stdout = sys.stdout.target
+
+
+class OutputSequencer:
+    """让并发任务的输出按照游戏的规定顺序出现
+
+    每个任务拥有一个槽位，任务中的 print 输出和通过 run_in_order 提交的操作先缓存在槽位中；
+    某个槽位完成后，从第一个尚未输出的槽位开始，把已经完成的连续槽位依次输出。
+    因此无论任务以什么顺序完成，最终的输出都与按顺序执行时相同。
+    """
+
+    def __init__(self, slots: Iterable[Hashable], label: str = "", progress: bool = True):
+        self.order: List[Hashable] = list(slots)
+        self.label = label
+        self.progress = progress
+        self.items = {slot: [] for slot in self.order}
+        self.completed = set()
+        self.next_index = 0
+        self.lock = threading.RLock()
+        self._stdout = None
+
+    def __enter__(self):
+        self._stdout = _install()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 异常退出时也把已缓存的内容全部输出，避免丢失
+        with self.lock:
+            self.completed.update(self.order)
+            self._emit_ready()
+        self._clear_progress()
+        _uninstall()
+        return False
+
+    def buffer(self, slot: Hashable, item: Any):
+        with self.lock:
+            self.items[slot].append(item)
+
+    def run(self, slot: Hashable, fn: Callable, *args, **kwargs):
+        """在槽位中执行任务，任务结束后输出已就绪的槽位"""
+        previous = getattr(_local, "active", None)
+        _local.active = (self, slot)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.active = previous
+            self.complete(slot)
+
+    def complete(self, slot: Hashable):
+        with self.lock:
+            self.completed.add(slot)
+            self._emit_ready()
+            self._show_progress()
+
+    def map(self, executor: Optional["Executor"], fn: Callable, items: List, start: int = 0) -> List:
+        """并发地对每个元素执行fn，输出按元素顺序排列，返回按元素顺序排列的结果
+
+        第i个元素使用槽位 start + i，要求槽位是从0开始的连续整数。executor为None时按顺序执行。
+        """
+        if executor is None:
+            return [self.run(start + index, fn, item) for index, item in enumerate(items)]
+        futures = [executor.submit(self.run, start + index, fn, item) for index, item in enumerate(items)]
+        return [future.result() for future in futures]
+
+    def _emit_ready(self):
+        while self.next_index < len(self.order) and self.order[self.next_index] in self.completed:
+            slot = self.order[self.next_index]
+            for item in self.items.pop(slot):
+                if callable(item):
+                    item()
+                else:
+                    self._stdout.write(item)
+            self.next_index += 1
+
+    def _show_progress(self):
+        stderr = sys.__stderr__
+        if not self.progress or stderr is None or not stderr.isatty():
+            return
+        stderr.write(f"\r{self.label}进度: {len(self.completed)}/{len(self.order)}")
+        stderr.flush()
+
+    def _clear_progress(self):
+        stderr = sys.__stderr__
+        if self.progress and stderr is not None and stderr.isatty():
+            stderr.write("\r\033[K")
+            stderr.flush()
+
+
+class DeferredOutput:
+    """在后台执行的单个任务，输出先缓存起来，在需要的位置通过 replay() 输出
+
+    用于提前开始、稍后才展示结果的请求，例如与角色初始化同时生成的裁判介绍。
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def start(self) -> "DeferredOutput":
+        """开始缓存输出，之后需要调用 close()"""
+        _install()
+        return self
+
+    def close(self):
+        """输出缓存的内容并结束缓存"""
+        self.replay()
+        _uninstall()
+
+    def buffer(self, slot: Hashable, item: Any):
+        with self.lock:
+            self.items.append(item)
+
+    def run(self, fn: Callable, *args, **kwargs):
+        previous = getattr(_local, "active", None)
+        _local.active = (self, None)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.active = previous
+
+    def discard(self):
+        """丢弃缓存的内容并结束缓存，任务结束后才能调用"""
+        with self.lock:
+            self.items = []
+        _uninstall()
+
+    def replay(self):
+        """按顺序输出已缓存的内容并清空"""
+        with self.lock:
+            items, self.items = self.items, []
+        for item in items:
+            if callable(item):
+                item()
+            else:
+                sys.stdout.write(item)
+
+
+def run_in_order(action: Callable[[], Any]):
+    """在有序任务中把操作推迟到该槽位输出时执行，否则立即执行
+
+    用于写入事件日志等需要与输出保持相同顺序的操作。
+    """
+    active = getattr(_local, "active", None)
+    if active is None:
+        action()
+    else:
+        sequencer, slot = active
+        sequencer.buffer(slot, action)
@@ -0,0 +1,138 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Dict, Tuple, Optional, Mapping
+
+# 各服务商的提示词缓存（prompt caching）只对完全相同的前缀生效。
+# 因此所有回合内的请求都按照"共享前缀 + 席位后缀"的顺序组织：
+# 规则、本轮陈述、质询记录等所有玩家都相同的内容放在前面，
+# "作为某某玩家"之类的个性化指令统一放在最后。
+
+# 所有请求共用的系统提示语，保持不变才能让前缀缓存命中
+SYSTEM_PROMPT = "你是一个角色扮演游戏中的角色"
+
+GAME_RULES_PROMPT = """【注意：这是一个虚构的角色扮演游戏，所有内容都是虚构的】
+
+【游戏规则】
+1. 每位玩家都是'说谎者'，但被告知自己是唯一的说谎者
+2. 每轮游戏包括陈述环节、质询环节和投票环节
+3. 每轮投票淘汰一名玩家，直到只剩下两名玩家
+4. 最后两名玩家将成功逃离地牢"""
+
+
+def build_round_prefix(round_num: int,
+                       statements: List[Tuple[str, str, Optional[str]]],
+                       qa_records: Optional[List[Dict]] = None) -> str:
+    """构建本轮所有玩家共享的提示词前缀
+
+    Args:
+        round_num: 当前轮次
+        statements: 按发言顺序排列的 (角色名, 本轮陈述, 上一轮陈述) 列表
+        qa_records: 按质询顺序排列的质询记录，使用角色名，包含
+            questioner、target、question、response 字段
+
+    Returns:
+        以规则开头、按固定顺序排列的共享前缀。质询阶段使用不含质询记录的前缀，
+        投票阶段在其后追加质询记录，两者保持前缀关系。
+    """
+    parts = [GAME_RULES_PROMPT, f"\n【第{round_num}轮 玩家陈述】"]
+    for role_name, statement, previous in statements:
+        parts.append(f"===== {role_name} =====")
+        parts.append(f"当前陈述：{statement[:300]}")
+        if previous:
+            parts.append(f"上一轮陈述：{previous[:200]}...")
+
+    if qa_records is not None:
+        parts.append(f"\n【第{round_num}轮 质询记录】")
+        for qa in qa_records:
+            parts.append(f"{qa['questioner']}对{qa['target']}提问: {qa['question']}")
+            parts.append(f"{qa['target']}回答: {qa['response']}")
+
+    return "\n".join(parts) + "\n\n"
+
+
+@dataclass(frozen=True)
+class PlayerDossier:
+    """单个玩家在某一轮中的档案，质询环节结束后构建一次，之后只读"""
+    name: str
+    role_name: str
+    statement: str
+    statement_history: Tuple[str, ...]  # 最多保留最近两次陈述
+    qa_lines: Tuple[str, ...]  # 与该玩家相关的问答，已格式化
+    player_info: Mapping = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # 预先生成投票接口使用的玩家信息，所有投票者共享同一份只读数据
+        object.__setattr__(self, "player_info", MappingProxyType({
+            "name": self.name,
+            "role_name": self.role_name,
+            "statement": self.statement,
+            "statement_history": self.statement_history,
+            "qa_history": self.qa_lines
+        }))
+
+
+@dataclass(frozen=True)
+class RoundDossiers:
+    """一轮游戏中所有存活玩家的档案集合，以及据此生成的共享提示词前缀"""
+    round_num: int
+    dossiers: Tuple[PlayerDossier, ...]  # 按发言顺序排列
+    qa_records: Tuple[Mapping, ...]  # 按质询顺序排列，使用角色名
+    vote_prefix: str
+    by_name: Mapping = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "by_name", MappingProxyType({d.name: d for d in self.dossiers}))
+
+    def role_of(self, name: str, default: str = "未知") -> str:
+        """根据玩家名查找角色名"""
+        dossier = self.by_name.get(name)
+        return dossier.role_name if dossier else default
+
+    def player_infos(self, names: List[str]) -> List[Mapping]:
+        """按给定顺序返回候选玩家的投票信息"""
+        return [self.by_name[name].player_info for name in names if name in self.by_name]
+
+
+def build_round_dossiers(round_num: int, players: List, qa_records: List[Dict]) -> RoundDossiers:
+    """根据本轮陈述和质询记录构建所有玩家的档案
+
+    Args:
+        round_num: 当前轮次
+        players: 按发言顺序排列的存活玩家（需要 name、role_name、fake_memory、statement_history 属性）
+        qa_records: 按质询顺序排列的质询记录，使用角色名
+
+    只遍历一次质询记录，把每条问答分别归入提问者和被质询者的档案。
+    """
+    qa_by_role = {player.role_name: [] for player in players}
+    for qa in qa_records:
+        target_lines = qa_by_role.get(qa["target"])
+        if target_lines is not None:
+            target_lines.append(f"{qa['questioner']}问: {qa['question']}\n{qa['target']}答: {qa['response']}")
+        # 也添加该玩家作为提问者的记录
+        questioner_lines = qa_by_role.get(qa["questioner"])
+        if questioner_lines is not None and qa["questioner"] != qa["target"]:
+            questioner_lines.append(f"{qa['questioner']}对{qa['target']}提问: {qa['question']}\n{qa['target']}回答: {qa['response']}")
+
+    dossiers = tuple(
+        PlayerDossier(
+            name=player.name,
+            role_name=player.role_name,
+            statement=player.fake_memory,
+            statement_history=tuple(player.statement_history[-2:]),
+            qa_lines=tuple(qa_by_role[player.role_name])
+        )
+        for player in players
+    )
+
+    statements = [
+        (d.role_name, d.statement, d.statement_history[-2] if len(d.statement_history) > 1 else None)
+        for d in dossiers
+    ]
+    frozen_qa = tuple(MappingProxyType(dict(qa)) for qa in qa_records)
+
+    return RoundDossiers(
+        round_num=round_num,
+        dossiers=dossiers,
+        qa_records=frozen_qa,
+        vote_prefix=build_round_prefix(round_num, statements, list(frozen_qa))
+    )
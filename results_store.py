@@ -0,0 +1,323 @@
+"""游戏结果数据库
+
+把每局游戏的玩家、陈述、质询、投票、淘汰和API调用写入SQLite数据库，在常用的查询条件
+（模型、轮次、投票者/被投票者、提问者/被质询者、游戏）上建立索引，统计大量对局时不必
+逐个读取日志文件。数据来自游戏的事件（见 game_events.py），一批游戏在一个事务中写入，
+每张表一次 executemany；每局由唯一的key标识，同一局重复写入时替换原有的记录。
+
+批量运行时设置 config.py 中的 RESULTS_DB 即可自动写入，每 RESULTS_BATCH_SIZE 局写入一次；
+已有的事件文件可以导入：
+    python results_store.py import --db results.db output/tournament_*/*_events.jsonl
+    python results_store.py query --db results.db "SELECT model, AVG(survived) FROM players GROUP BY model"
+
+例如，被Claude质询过的DeepSeek的幸存率：
+    SELECT AVG(p.survived) FROM players p
+    WHERE p.role_name = 'DeepSeek' AND p.game_id IN (
+        SELECT game_id FROM interrogations WHERE questioner = 'Claude' AND target = 'DeepSeek')
+"""
+import os
+import time
+import sqlite3
+import pathlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import API_CONFIGS, RESULTS_BATCH_SIZE
+from game_events import PLAYER, STATEMENT, QUESTION, ANSWER, VOTE, REVOTE, ELIMINATION, GAME_END
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_key TEXT NOT NULL UNIQUE,
+    seed INTEGER,
+    finished INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    started_at REAL,
+    recorded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    role_name TEXT NOT NULL,
+    model TEXT,
+    seat INTEGER NOT NULL,
+    survived INTEGER NOT NULL,
+    eliminated_round INTEGER,
+    PRIMARY KEY (game_id, role_name)
+);
+CREATE INDEX IF NOT EXISTS players_by_model ON players (model, survived);
+CREATE INDEX IF NOT EXISTS players_by_role ON players (role_name, survived);
+CREATE TABLE IF NOT EXISTS statements (
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    round INTEGER NOT NULL,
+    role_name TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS statements_by_game ON statements (game_id, round);
+CREATE INDEX IF NOT EXISTS statements_by_role ON statements (role_name, round);
+CREATE TABLE IF NOT EXISTS interrogations (
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    round INTEGER NOT NULL,
+    questioner TEXT NOT NULL,
+    target TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT
+);
+CREATE INDEX IF NOT EXISTS interrogations_by_game ON interrogations (game_id, round);
+CREATE INDEX IF NOT EXISTS interrogations_by_questioner ON interrogations (questioner, target);
+CREATE INDEX IF NOT EXISTS interrogations_by_target ON interrogations (target, questioner);
+CREATE TABLE IF NOT EXISTS votes (
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    round INTEGER NOT NULL,
+    voter TEXT NOT NULL,
+    target TEXT NOT NULL,
+    revote INTEGER NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS votes_by_game ON votes (game_id, round);
+CREATE INDEX IF NOT EXISTS votes_by_voter ON votes (voter, target);
+CREATE INDEX IF NOT EXISTS votes_by_target ON votes (target, round);
+CREATE TABLE IF NOT EXISTS eliminations (
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    round INTEGER NOT NULL,
+    role_name TEXT NOT NULL,
+    PRIMARY KEY (game_id, round)
+);
+CREATE INDEX IF NOT EXISTS eliminations_by_role ON eliminations (role_name, round);
+CREATE TABLE IF NOT EXISTS api_calls (
+    game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    role_name TEXT NOT NULL,
+    model TEXT,
+    tag TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER NOT NULL,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS api_calls_by_game ON api_calls (game_id, role_name);
+CREATE INDEX IF NOT EXISTS api_calls_by_model ON api_calls (model, tag);
+"""
+
+# 各表除game_id外的列，与 game_rows() 生成的每行的顺序一致
+COLUMNS = {
+    "players": ("role_name", "model", "seat", "survived", "eliminated_round"),
+    "statements": ("round", "role_name", "text"),
+    "interrogations": ("round", "questioner", "target", "question", "answer"),
+    "votes": ("round", "voter", "target", "revote", "reason"),
+    "eliminations": ("round", "role_name"),
+    "api_calls": ("role_name", "model", "tag", "prompt_tokens", "completion_tokens", "cached_tokens", "latency")
+}
+
+
+def configured_models() -> Dict[str, str]:
+    """API_CONFIGS中各角色使用的模型，导入没有模型信息的事件文件时使用"""
+    return {config['role_name']: config.get('model') for config in API_CONFIGS if not config.get('is_judge', False)}
+
+
+def game_rows(events: List[Dict], models: Optional[Dict[str, str]] = None,
+              usage: Optional[Dict[str, List[Dict]]] = None) -> Tuple[Dict[str, Any], Dict[str, List[Tuple]]]:
+    """把一局游戏的事件整理为各表的行
+
+    Args:
+        events: 按顺序排列的事件字典，见 GameEvent.to_dict()
+        models: 角色名 -> 模型，默认取自API_CONFIGS
+        usage: 角色名 -> 该角色的API调用记录（AIPlayer.usage_log）
+
+    Returns:
+        (games表中本局的统计, 表名 -> 不含game_id的行)
+    """
+    models = models if models is not None else configured_models()
+    rows: Dict[str, List[Tuple]] = {table: [] for table in COLUMNS}
+    seats: List[str] = []
+    winners: Optional[List[str]] = None
+    eliminated: Dict[str, int] = {}
+    pending_answers: Dict[Tuple[int, str, str], List] = {}  # 等待回答的质询：(轮次, 提问者, 被质询者) -> 行
+
+    for event in events:
+        kind, round_num, actor, target = event["kind"], event["round"], event["actor"], event.get("target")
+        if kind == PLAYER:
+            seats.append(actor)
+        elif kind == STATEMENT:
+            rows["statements"].append((round_num, actor, event["text"]))
+        elif kind == QUESTION:
+            row = [round_num, actor, target, event["text"], None]
+            rows["interrogations"].append(row)
+            pending_answers[(round_num, actor, target)] = row
+        elif kind == ANSWER:
+            row = pending_answers.pop((round_num, target, actor), None)
+            if row is not None:
+                row[4] = event["text"]
+        elif kind in (VOTE, REVOTE):
+            rows["votes"].append((round_num, actor, target, int(kind == REVOTE), event["text"] or None))
+        elif kind == ELIMINATION:
+            eliminated[actor] = round_num
+            rows["eliminations"].append((round_num, actor))
+        elif kind == GAME_END:
+            winners = actor.split("、") if actor else []
+
+    rows["interrogations"] = [tuple(row) for row in rows["interrogations"]]
+    rows["players"] = [(role_name, models.get(role_name), seat, int(bool(winners) and role_name in winners),
+                        eliminated.get(role_name)) for seat, role_name in enumerate(seats)]
+    for role_name, entries in (usage or {}).items():
+        rows["api_calls"].extend((role_name, entry.get("model"), entry.get("tag"), entry["prompt_tokens"],
+                                  entry["completion_tokens"], entry["cached_tokens"], entry.get("latency"))
+                                 for entry in entries)
+
+    game = {
+        "finished": int(winners is not None),
+        "rounds": max((event["round"] for event in events), default=0),
+        "started_at": events[0]["timestamp"] if events else None
+    }
+    return game, rows
+
+
+def game_record(game, key: str, seed: Optional[int] = None) -> Dict[str, Any]:
+    """一局刚结束的游戏（GameManager）的记录，包括每位玩家和裁判的API调用，用于 add_games()
+
+    记录只包含普通的字典和列表，可以在进程之间传递。
+    """
+    game_state = game.game_state
+    characters = list(game_state.players) + ([game_state.judge] if game_state.judge else [])
+    controllers = {character.role_name: character.ai_controller
+                   for character in characters if character.ai_controller}
+    return {
+        "key": key,
+        "seed": seed,
+        "events": [event.to_dict() for event in game_state.event_log.events],
+        "models": {role_name: controller.model for role_name, controller in controllers.items()},
+        "usage": {role_name: list(controller.usage_log) for role_name, controller in controllers.items()}
+    }
+
+
+class ResultsStore:
+    """游戏结果数据库，每次写入使用独立的连接，可以在多个进程中同时写入"""
+
+    def __init__(self, path: str):
+        self.path = path
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    @contextmanager
+    def transaction(self):
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def add_games(self, games: Iterable[Dict[str, Any]]) -> int:
+        """在一个事务中写入一批游戏，返回写入的局数
+
+        每局为 {"key", "events", "seed"（可选）, "models"（可选）, "usage"（可选）}，见 game_record()。
+        key唯一标识一局游戏，已有相同key的游戏时更新该局并替换其余各表中原有的行；同一批中key重复时
+        只写入最后一条。
+        """
+        now = time.time()
+        latest = {game["key"]: game for game in games}
+        table_rows: Dict[str, List[Tuple]] = {table: [] for table in COLUMNS}
+        count = 0
+        with self.transaction() as db:
+            for game in latest.values():
+                summary, rows = game_rows(game["events"], game.get("models"), game.get("usage"))
+                db.execute("INSERT INTO games (game_key, seed, finished, rounds, started_at, recorded_at) "
+                           "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (game_key) DO UPDATE SET seed = excluded.seed, "
+                           "finished = excluded.finished, rounds = excluded.rounds, "
+                           "started_at = excluded.started_at, recorded_at = excluded.recorded_at",
+                           (game["key"], game.get("seed"), summary["finished"], summary["rounds"],
+                            summary["started_at"], now))
+                game_id = db.execute("SELECT id FROM games WHERE game_key = ?", (game["key"],)).fetchone()[0]
+                for table in COLUMNS:
+                    db.execute(f"DELETE FROM {table} WHERE game_id = ?", (game_id,))
+                    table_rows[table].extend((game_id,) + row for row in rows[table])
+                count += 1
+            for table, columns in COLUMNS.items():
+                if table_rows[table]:
+                    placeholders = ", ".join("?" * (len(columns) + 1))
+                    db.executemany(f"INSERT INTO {table} (game_id, {', '.join(columns)}) VALUES ({placeholders})",
+                                   table_rows[table])
+        return count
+
+    def import_events_files(self, paths: List[str], batch_size: int = 100) -> int:
+        """导入JSONL事件文件，以文件路径作为key，每batch_size局一个事务，返回导入的局数"""
+        from log_renderer import load_events
+
+        count = 0
+        for start in range(0, len(paths), batch_size):
+            batch = [{"key": os.path.abspath(path), "events": load_events(path)}
+                     for path in paths[start:start + batch_size]]
+            count += self.add_games(batch)
+        return count
+
+    def query(self, sql: str, params: Tuple = ()) -> Tuple[List[str], List[Tuple]]:
+        """执行只读查询，返回 (列名, 行)；数据库以只读方式打开，修改数据的语句会失败"""
+        db = sqlite3.connect(pathlib.Path(self.path).resolve().as_uri() + "?mode=ro", uri=True, timeout=60)
+        try:
+            cursor = db.execute(sql, params)
+            return [column[0] for column in cursor.description or []], cursor.fetchall()
+        finally:
+            db.close()
+
+
+class ResultsWriter:
+    """缓存游戏记录，每 batch_size 局在一个事务中写入，close() 时写入剩余的记录"""
+
+    def __init__(self, path: str, batch_size: int = RESULTS_BATCH_SIZE):
+        self.store = ResultsStore(path)
+        self.batch_size = batch_size
+        self.records: List[Dict[str, Any]] = []
+
+    def add(self, record: Dict[str, Any]):
+        self.records.append(record)
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.records:
+            records, self.records = self.records, []
+            self.store.add_games(records)
+
+    def close(self):
+        self.flush()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AI地牢生存游戏的结果数据库")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_command = commands.add_parser("import", help="导入JSONL事件文件")
+    import_command.add_argument("--db", required=True, help="结果数据库文件")
+    import_command.add_argument("paths", nargs="+", help="事件文件路径")
+
+    query_command = commands.add_parser("query", help="执行SQL查询并输出结果")
+    query_command.add_argument("--db", required=True, help="结果数据库文件")
+    query_command.add_argument("sql", help="SQL语句")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    if args.command == "import":
+        count = store.import_events_files(args.paths)
+        print(f"已导入{count}局游戏到 {args.db}")
+    else:
+        columns, rows = store.query(args.sql)
+        print("\t".join(columns))
+        for row in rows:
+            print("\t".join("" if value is None else str(value) for value in row))
+
+
+if __name__ == "__main__":
+    main()
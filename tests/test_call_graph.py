@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from call_graph import CallGraph, completed
+
+
+def test_dependencies_are_passed_in_order():
+    graph = CallGraph()
+    a = graph.add(lambda: "a")
+    b = graph.add(lambda: "b")
+    joined = graph.add(lambda x, y, z: x + y + z, deps=[b, a, completed("c")])
+    assert joined.result() == "bac"
+
+
+def test_sequential_without_executor_runs_in_insertion_order():
+    graph = CallGraph()
+    order = []
+    first = graph.add(lambda: order.append(1))
+    graph.add(lambda _: order.append(2), deps=[first])
+    graph.add(lambda: order.append(3))
+    assert order == [1, 2, 3]
+
+
+def test_failed_dependency_skips_node():
+    graph = CallGraph()
+    calls = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    failed = graph.add(fail)
+    dependent = graph.add(lambda _: calls.append("ran"), deps=[failed])
+    transitive = graph.add(lambda _: calls.append("ran"), deps=[dependent])
+    with pytest.raises(RuntimeError, match="boom"):
+        transitive.result()
+    assert calls == []
+
+
+def test_provider_limit():
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def call(value):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.01)
+        with lock:
+            running["now"] -= 1
+        return value
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        graph = CallGraph(executor, provider_limit=2)
+        futures = [graph.add(lambda i=i: call(i), provider="same") for i in range(8)]
+        assert [future.result(timeout=5) for future in futures] == list(range(8))
+    assert running["max"] == 2
@@ -0,0 +1,54 @@
+import json
+import os
+import random
+
+import pytest
+
+from checkpoint import (CHECKPOINT_VERSION, save_checkpoint, load_checkpoint,
+                        encode_random_state, decode_random_state)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "nested" / "checkpoint.json")
+    data = {"current_round": 3, "completed_phase": "voting", "players": [{"name": "AI玩家1", "role_name": "GPT"}]}
+    save_checkpoint(path, data)
+
+    loaded = load_checkpoint(path)
+    assert loaded["version"] == CHECKPOINT_VERSION
+    assert "saved_at" in loaded
+    assert {key: loaded[key] for key in data} == data
+
+
+def test_save_leaves_no_temporary_files(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    save_checkpoint(path, {"current_round": 1})
+    save_checkpoint(path, {"current_round": 2})
+    assert os.listdir(tmp_path) == ["checkpoint.json"]
+    assert load_checkpoint(path)["current_round"] == 2
+
+
+def test_failed_save_keeps_previous_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    save_checkpoint(path, {"current_round": 1})
+    with pytest.raises(TypeError):
+        save_checkpoint(path, {"current_round": object()})
+    assert os.listdir(tmp_path) == ["checkpoint.json"]
+    assert load_checkpoint(path)["current_round"] == 1
+
+
+def test_version_mismatch(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text(json.dumps({"version": CHECKPOINT_VERSION + 1}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_checkpoint(str(path))
+
+
+def test_random_state_round_trip():
+    rng = random.Random(42)
+    rng.random()
+    state = json.loads(json.dumps(encode_random_state(rng.getstate())))
+    expected = [rng.random() for _ in range(5)]
+
+    restored = random.Random()
+    restored.setstate(decode_random_state(state))
+    assert [restored.random() for _ in range(5)] == expected
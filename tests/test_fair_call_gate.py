@@ -0,0 +1,99 @@
+import io
+import threading
+import time
+
+from async_games import FairCallGate, GameLogs, _log_to
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.001)
+
+
+def queue_request(gate, group, order, release):
+    """在新线程中申请名额，拿到名额后记录组名并等待 release"""
+    def run():
+        with gate.slot(group):
+            order.append(group)
+            release.wait()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def count_waiting(gate):
+    with gate.condition:
+        return sum(len(queue) for queue in gate.waiting.values())
+
+
+def test_slots_rotate_between_groups():
+    gate = FairCallGate(global_limit=1, per_group_limit=4)
+    order = []
+    holder_release = threading.Event()
+    holder = queue_request(gate, "holder", order, holder_release)
+    wait_until(lambda: order == ["holder"])
+
+    # a 先排了两个请求，b 后排一个，名额应在 a、b 之间轮流分配
+    release = threading.Event()
+    threads = []
+    for index, group in enumerate(["a", "a", "b"]):
+        threads.append(queue_request(gate, group, order, release))
+        wait_until(lambda: count_waiting(gate) == index + 1)
+
+    release.set()
+    holder_release.set()
+    for thread in [holder] + threads:
+        thread.join(timeout=2)
+
+    assert order == ["holder", "a", "b", "a"]
+    assert gate.stats == {"calls": 4, "waited": 3, "max_active": 1}
+    assert gate.total_active == 0 and not gate.active and not gate.waiting and not gate.rotation
+
+
+def test_per_group_limit_leaves_slots_to_other_groups():
+    gate = FairCallGate(global_limit=4, per_group_limit=1)
+    order = []
+    release = threading.Event()
+    first = queue_request(gate, "a", order, release)
+    wait_until(lambda: order == ["a"])
+
+    # a 已经用满每局名额，第二个请求等待，b 的请求不受影响
+    second = queue_request(gate, "a", order, release)
+    wait_until(lambda: count_waiting(gate) == 1)
+    other = queue_request(gate, "b", order, release)
+    wait_until(lambda: order == ["a", "b"])
+    assert count_waiting(gate) == 1
+
+    release.set()
+    for thread in (first, second, other):
+        thread.join(timeout=2)
+    assert order == ["a", "b", "a"]
+
+
+def test_game_logs_route_output_by_thread():
+    logs = GameLogs()
+    first, second = io.StringIO(), io.StringIO()
+
+    def write(log, message):
+        _log_to(log)
+        logs.write(message)
+
+    threads = [threading.Thread(target=write, args=(first, "第一局")),
+               threading.Thread(target=write, args=(second, "第二局")),
+               threading.Thread(target=write, args=(None, "丢弃"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert first.getvalue() == "第一局"
+    assert second.getvalue() == "第二局"
+
+    # 日志已经关闭时丢弃输出
+    closed = io.StringIO()
+    closed.close()
+    write(closed, "迟到的输出")
+    _log_to(None)
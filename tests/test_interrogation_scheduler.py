@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from interrogation_scheduler import STRATEGIES, count_history, plan_round
+
+PLAYERS = ["A", "B", "C", "D", "E"]
+
+
+def history(interrogations=(), votes=()):
+    return [{"interrogations": [{"questioner": q, "target": t} for q, t in interrogations],
+             "votes": [{"voter": v, "target": t} for v, t in votes]}]
+
+
+def test_count_history():
+    asked, questioned, votes = count_history(history([("A", "B"), ("C", "B")], [("A", "C"), ("B", "C")]))
+    assert asked == {"A": 1, "C": 1}
+    assert questioned == {"B": 2}
+    assert votes == {"C": 2}
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_every_player_asks_once_and_never_questions_themselves(strategy):
+    for seed in range(20):
+        pairs = plan_round(PLAYERS, [], random.Random(seed), strategy)
+        assert [questioner for questioner, _ in pairs] == PLAYERS
+        assert all(questioner != target and target in PLAYERS for questioner, target in pairs)
+
+
+def test_random_is_the_default_and_matches_per_questioner_choice():
+    pairs = plan_round(PLAYERS, [], random.Random(7))
+    rng = random.Random(7)
+    assert pairs == [(q, rng.choice([p for p in PLAYERS if p != q])) for q in PLAYERS]
+
+
+@pytest.mark.parametrize("strategy", ["round_robin", "suspicion"])
+def test_targets_are_distinct(strategy):
+    for seed in range(20):
+        pairs = plan_round(PLAYERS, [], random.Random(seed), strategy)
+        assert len({target for _, target in pairs}) == len(PLAYERS)
+
+
+def test_round_robin_targets_least_questioned_first():
+    past = history([("A", "B"), ("B", "C"), ("C", "A")])
+    pairs = plan_round(PLAYERS, past, random.Random(0), "round_robin", budget=2)
+    assert {target for _, target in pairs} == {"D", "E"}
+
+
+def test_suspicion_targets_most_voted_first():
+    past = history(votes=[("A", "C"), ("B", "C"), ("C", "E")])
+    pairs = plan_round(PLAYERS, past, random.Random(0), "suspicion", budget=2)
+    assert {target for _, target in pairs} == {"C", "E"}
+
+
+def test_budget_picks_players_who_asked_least_in_seat_order():
+    past = history([("A", "B"), ("B", "C"), ("D", "A")])
+    pairs = plan_round(PLAYERS, past, random.Random(0), "round_robin", budget=2)
+    assert [questioner for questioner, _ in pairs] == ["C", "E"]
+
+
+def test_budget_zero_and_single_player():
+    assert plan_round(PLAYERS, [], random.Random(0), budget=0) == []
+    assert plan_round(["A"], [], random.Random(0)) == []
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        plan_round(PLAYERS, [], random.Random(0), "loudest")
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from game_events import PLAYER, STATEMENT, QUESTION, ANSWER, VOTE, ELIMINATION, GAME_END
+from results_store import ResultsStore, game_rows
+
+MODELS = {"甲": "model-a", "乙": "model-b", "丙": "model-c"}
+
+
+def event(kind, round_num, actor, target=None, text=""):
+    return {"kind": kind, "round": round_num, "actor": actor, "target": target, "text": text, "timestamp": 100.0}
+
+
+def game_events(loser="乙"):
+    winners = [name for name in MODELS if name != loser]
+    return ([event(PLAYER, 0, name) for name in MODELS] + [
+        event(STATEMENT, 1, "甲", text="陈述"),
+        event(QUESTION, 1, "甲", "乙", "问题"),
+        event(ANSWER, 1, "乙", "甲", "回答"),
+        event(VOTE, 1, "甲", loser, "理由"),
+        event(VOTE, 1, "丙", loser, ""),
+        event(ELIMINATION, 1, loser),
+        event(GAME_END, 1, "、".join(winners))
+    ])
+
+
+def record(key, loser="乙"):
+    usage = {"甲": [{"model": "model-a", "tag": "vote", "prompt_tokens": 10, "completion_tokens": 2,
+                    "cached_tokens": 4, "latency": 0.5}]}
+    return {"key": key, "seed": 1, "events": game_events(loser), "models": MODELS, "usage": usage}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(str(tmp_path / "results.db"))
+
+
+def test_game_rows():
+    summary, rows = game_rows(game_events(), MODELS)
+
+    assert summary == {"finished": 1, "rounds": 1, "started_at": 100.0}
+    assert rows["players"] == [("甲", "model-a", 0, 1, None), ("乙", "model-b", 1, 0, 1), ("丙", "model-c", 2, 1, None)]
+    assert rows["interrogations"] == [(1, "甲", "乙", "问题", "回答")]
+    assert rows["votes"] == [(1, "甲", "乙", 0, "理由"), (1, "丙", "乙", 0, None)]
+    assert rows["eliminations"] == [(1, "乙")]
+
+
+def test_rewriting_a_game_replaces_its_rows(store):
+    assert store.add_games([record("a"), record("b")]) == 2
+    assert store.add_games([record("a", loser="丙")]) == 1
+
+    _, rows = store.query("SELECT g.game_key, e.role_name FROM eliminations e JOIN games g ON g.id = e.game_id "
+                          "ORDER BY g.game_key")
+    assert rows == [("a", "丙"), ("b", "乙")]
+    _, rows = store.query("SELECT COUNT(*) FROM votes")
+    assert rows == [(4,)]
+
+
+def test_duplicate_keys_in_one_batch_keep_the_last_record(store):
+    assert store.add_games([record("a"), record("a", loser="丙")]) == 1
+
+    _, rows = store.query("SELECT role_name FROM eliminations")
+    assert rows == [("丙",)]
+    _, rows = store.query("SELECT COUNT(*) FROM api_calls")
+    assert rows == [(1,)]
+
+
+def test_query_is_read_only(store):
+    store.add_games([record("a")])
+    with pytest.raises(sqlite3.OperationalError):
+        store.query("DELETE FROM games")
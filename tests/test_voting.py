@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+from voting import RevoteEngine, collect_votes, decided_leader, wave_size
+
+NAMES = ["甲", "乙", "丙", "丁", "戊"]
+
+
+def test_decided_leader():
+    assert decided_leader({"甲": 3, "乙": 1, "丙": 0}, ["乙"]) == "甲"
+    # 丙还能得到三票，可以追平
+    assert decided_leader({"甲": 3, "乙": 1, "丙": 0}, ["乙", "丁", "戊"]) is None
+    # 平票不算确定
+    assert decided_leader({"甲": 2, "乙": 2}, []) is None
+    assert decided_leader({}, []) is None
+
+
+def test_decided_leader_excludes_self_votes():
+    # 剩下的投票者就是第二名本人，不能投给自己
+    assert decided_leader({"甲": 2, "乙": 1}, ["乙"]) == "甲"
+    assert decided_leader({"甲": 2, "乙": 1}, ["丙"]) is None
+
+
+def test_wave_size():
+    counts = dict.fromkeys(NAMES, 0)
+    # 前三票都投给同一个不在前三位的玩家时，剩下两票无法追上
+    assert wave_size(counts, NAMES) == 3
+    assert wave_size({"甲": 2, "乙": 0}, ["丙", "丁", "戊"]) == 1
+    assert wave_size({"甲": 1, "乙": 1}, ["丙", "丁", "戊"]) == 2
+    # 无论多少票都无法确定时返回全部剩余票数
+    assert wave_size({"甲": 0, "乙": 0}, ["甲", "乙"]) == 2
+
+
+def run_votes(choices, early_termination=True):
+    """按 choices（投票者 -> 所投玩家）收集投票，返回 (结果, 弃权者名, 每次投票时看到的票数)"""
+    voters = [SimpleNamespace(name=name) for name in NAMES]
+    counts = dict.fromkeys(NAMES, 0)
+    seen = []
+
+    def cast(voter):
+        seen.append((voter.name, dict(counts)))
+        return voter.name, choices[voter.name]
+
+    results, abstained = collect_votes(None, voters, cast, counts, early_termination=early_termination)
+    return results, [voter.name for voter in abstained], seen, counts
+
+
+def test_lopsided_vote_stops_after_first_wave():
+    results, abstained, seen, counts = run_votes({"甲": "丁", "乙": "丁", "丙": "丁"})
+
+    assert results == [("甲", "丁"), ("乙", "丁"), ("丙", "丁")]
+    assert abstained == ["丁", "戊"]
+    assert counts["丁"] == 3
+
+
+def test_close_vote_collects_the_rest_in_one_wave():
+    choices = {"甲": "丁", "乙": "戊", "丙": "丁", "丁": "戊", "戊": "甲"}
+    results, abstained, seen, counts = run_votes(choices)
+
+    assert [voter for voter, _ in results] == NAMES
+    assert abstained == []
+    # 第一批之后其余的票一次收集：最后两位投票时看到的票数相同
+    assert seen[3][1] == seen[4][1] == {"甲": 0, "乙": 0, "丙": 0, "丁": 2, "戊": 1}
+    assert counts == {"甲": 1, "乙": 0, "丙": 0, "丁": 2, "戊": 2}
+
+
+def test_without_early_termination_every_voter_votes():
+    results, abstained, _, _ = run_votes({name: "甲" if name != "甲" else "乙" for name in NAMES},
+                                         early_termination=False)
+    assert len(results) == 5 and abstained == []
+
+
+def test_revote_engine_puts_forced_voters_first():
+    engine = RevoteEngine(None, ["甲", "乙"])
+    voters = [SimpleNamespace(name=name) for name in ["丙", "甲", "乙", "丁", "戊"]]
+
+    assert engine.options("甲") == ["乙"]
+    assert engine.options("丙") == ["甲", "乙"]
+    assert [voter.name for voter in engine.order(voters)] == ["甲", "乙", "丙", "丁", "戊"]
+
+
+def test_revote_engine_stops_once_the_tie_is_broken():
+    engine = RevoteEngine(None, ["甲", "乙"])
+    voters = [SimpleNamespace(name=name) for name in ["丙", "甲", "乙", "丁", "戊"]]
+    choices = {"甲": "乙", "乙": "甲", "丙": "乙", "丁": "乙"}
+    counts = {"甲": 0, "乙": 0}
+
+    results, abstained = engine.run(voters, lambda voter: (voter.name, choices[voter.name]), counts)
+
+    assert [voter for voter, _ in results] == ["甲", "乙", "丙", "丁"]
+    assert [voter.name for voter in abstained] == ["戊"]
+    assert counts == {"甲": 1, "乙": 3}
@@ -0,0 +1,289 @@
+"""批量锦标赛
+
+在进程池中无人值守地运行多局游戏，统计各个模型的幸存情况。每局随机分配座位和发言顺序，
+关闭展示用的停顿；所有工作进程共享同一组速率限制器，同一模型的请求不论来自哪一局都按
+config.py 中的间隔排队。每局的输出、事件和日志写入 output/tournament_时间/，
+全部结束后输出汇总统计并写入 summary.json。
+
+运行方式：
+    python tournament.py --games 20 --workers 4
+    python tournament.py --games 100 --workers 8 --seed 42
+"""
+import os
+import json
+import time
+import random
+import datetime
+import multiprocessing
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from config import API_CONFIGS, RESULTS_DB
+
+# 每局可以单独修改的配置项，均为 ai_dungeon_game 在游戏过程中读取的模块级配置
+GAME_SETTINGS = ("MAX_CONCURRENT_CALLS", "STATEMENT_REUSE_POLICY", "SPECULATIVE_STATEMENTS", "INTERROGATION_STRATEGY",
+                 "INTERROGATION_BUDGET", "EARLY_VOTE_TERMINATION", "REVIEW_CONTEXT_LIMIT")
+
+
+class SharedRateLimiter:
+    """由 multiprocessing.Manager 支持的速率限制器，可以传给工作进程
+
+    为每个key记录最近一次预约的请求时间，预约时在锁内计算需要等待的时间并登记，
+    并发的预约依次排队。
+    """
+
+    def __init__(self, timestamps, lock):
+        self.timestamps = timestamps
+        self.lock = lock
+
+    def reserve(self, key: str, interval: float) -> float:
+        with self.lock:
+            now = time.time()
+            time_to_wait = max(0.0, self.timestamps.get(key, 0.0) + interval - now)
+            self.timestamps[key] = now + time_to_wait
+        return time_to_wait
+
+
+def _init_worker(limiter: SharedRateLimiter):
+    import ai_player
+    ai_player.use_rate_limiter(limiter)
+
+
+def player_roles() -> List[str]:
+    """参与游戏的角色名（不包括裁判）"""
+    return [config['role_name'] for config in API_CONFIGS if not config.get('is_judge', False)]
+
+
+def game_name(index: int) -> str:
+    return f"game_{index:03d}"
+
+
+@contextmanager
+def game_settings(overrides: Optional[Dict[str, Any]] = None):
+    """在上下文中临时修改本进程的游戏配置，只能修改 GAME_SETTINGS 中的配置项
+
+    修改对进程中的所有游戏生效，只用于一个进程同时只运行一局游戏的场合。
+    """
+    import ai_dungeon_game
+
+    overrides = overrides or {}
+    unknown = set(overrides) - set(GAME_SETTINGS)
+    if unknown:
+        raise ValueError(f"不支持修改的配置项：{', '.join(sorted(unknown))}，可选：{', '.join(GAME_SETTINGS)}")
+    previous = {name: getattr(ai_dungeon_game, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(ai_dungeon_game, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(ai_dungeon_game, name, value)
+
+
+def new_game(index: int, seed: int, output_dir: str, lineup: Optional[List[str]] = None):
+    """创建一局无人值守的游戏：按种子随机分配座位和发言顺序，关闭展示用的停顿
+
+    lineup为参赛的角色名，None表示所有配置的角色。游戏使用以种子初始化的独立随机数生成器，
+    同一进程中同时进行的多局互不影响。
+    """
+    from ai_dungeon_game import GameManager
+
+    rng = random.Random(seed)
+    roles = list(lineup) if lineup is not None else player_roles()
+    name = game_name(index)
+    game = GameManager(checkpoint_path=os.path.join(output_dir, f"{name}_checkpoint.json"),
+                       events_path=os.path.join(output_dir, f"{name}_events.jsonl"), rng=rng)
+    game.pacing = False
+    game.lineup = lineup
+    game.seat_order = rng.sample(roles, len(roles))
+    game.speaking_order = rng.sample(roles, len(roles))
+    return game
+
+
+def finish_result(game, index: int, seed: int, error: Optional[str], record_key: Optional[str] = None,
+                  **extra) -> Dict[str, Any]:
+    """在游戏结果中补充本局的编号、种子和日志路径
+
+    设置了RESULTS_DB时结果中附带本局的数据库记录（"record"），key默认为事件文件路径，
+    由收集结果的一方用 store_record() 写入。
+    """
+    from log_renderer import render_events_file
+
+    result = game.result()
+    result.update({"index": index, "seed": seed, "error": error}, **extra)
+    if os.path.exists(game.events_path):
+        result["markdown_path"] = render_events_file(game.events_path)
+    if RESULTS_DB:
+        from results_store import game_record
+        result["record"] = game_record(game, record_key or game.events_path, seed)
+    return result
+
+
+def open_results_writer():
+    """设置了RESULTS_DB时返回批量写入结果数据库的 ResultsWriter，否则返回None"""
+    if not RESULTS_DB:
+        return None
+    from results_store import ResultsWriter
+    return ResultsWriter(RESULTS_DB)
+
+
+def store_record(writer, result: Dict[str, Any]):
+    """从游戏结果中取出数据库记录交给writer，结果本身不保存记录"""
+    record = result.pop("record", None)
+    if writer is not None and record is not None:
+        writer.add(record)
+
+
+def close_game(game):
+    """游戏出错中断时释放事件文件和线程池，正常结束时这些已经关闭"""
+    game.game_state.event_log.close_sink()
+    game.commentary.shutdown()
+    game.shutdown_executor()
+
+
+def run_game(index: int, seed: int, output_dir: str, lineup: Optional[List[str]] = None,
+             overrides: Optional[Dict[str, Any]] = None, record_key: Optional[str] = None) -> Dict[str, Any]:
+    """在工作进程中运行一局游戏，输出写入该局的日志文件，返回游戏结果
+
+    lineup为参赛的角色名，overrides为本局修改的配置项，见 game_settings()；
+    record_key为本局在结果数据库中的key，见 finish_result()。
+    """
+    random.seed(seed)
+    game = new_game(index, seed, output_dir, lineup)
+
+    log_path = os.path.join(output_dir, f"{game_name(index)}.log")
+    error = None
+    with open(log_path, 'w', encoding='utf-8') as log, redirect_stdout(log):
+        try:
+            with game_settings(overrides):
+                game.start_game()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            close_game(game)
+
+    return finish_result(game, index, seed, error, record_key, log_path=log_path)
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总各局结果：每个角色的幸存率、平均被淘汰轮次和用量"""
+    finished = [result for result in results if result["finished"]]
+    roles: Dict[str, Dict[str, Any]] = {}
+    for role_name in player_roles():
+        roles[role_name] = {"games": 0, "survived": 0, "eliminated_rounds": [], "prompt_tokens": 0, "calls": 0}
+
+    for result in finished:
+        for role_name in result["seat_order"]:
+            stats = roles.setdefault(role_name, {"games": 0, "survived": 0, "eliminated_rounds": [],
+                                                 "prompt_tokens": 0, "calls": 0})
+            stats["games"] += 1
+            usage = result["usage"].get(role_name, {})
+            stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            stats["calls"] += usage.get("calls", 0)
+        for role_name in result["winners"]:
+            roles[role_name]["survived"] += 1
+        for record in result["eliminations"]:
+            roles[record["role_name"]]["eliminated_rounds"].append(record["round"])
+
+    for stats in roles.values():
+        rounds = stats.pop("eliminated_rounds")
+        stats["survival_rate"] = stats["survived"] / stats["games"] if stats["games"] else 0.0
+        stats["avg_elimination_round"] = sum(rounds) / len(rounds) if rounds else None
+
+    return {
+        "games": len(results),
+        "finished": len(finished),
+        "errors": [{"index": result["index"], "error": result["error"]} for result in results if result["error"]],
+        "avg_rounds": sum(result["rounds"] for result in finished) / len(finished) if finished else 0.0,
+        "roles": roles
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"\n=== 锦标赛统计：共{summary['games']}局，完成{summary['finished']}局，"
+          f"平均{summary['avg_rounds']:.1f}轮 ===\n")
+    ranking = sorted(summary["roles"].items(), key=lambda item: item[1]["survival_rate"], reverse=True)
+    for role_name, stats in ranking:
+        average = stats["avg_elimination_round"]
+        average_str = f"{average:.1f}" if average is not None else "-"
+        print(f"{role_name:<10} 幸存 {stats['survived']:>3}/{stats['games']:<3}（{stats['survival_rate']:.0%}）"
+              f"  平均第{average_str}轮被淘汰  {stats['calls']}次调用，提示词{stats['prompt_tokens']}tokens")
+    for error in summary["errors"]:
+        print(f"! 第{error['index']}局出错：{error['error']}")
+
+
+def default_output_dir(prefix: str = "tournament") -> str:
+    time_str = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', f'{prefix}_{time_str}')
+
+
+def game_seeds(games: int, seed: Optional[int]) -> List[int]:
+    rng = random.Random(seed)
+    return [rng.getrandbits(32) for _ in range(games)]
+
+
+def report_progress(result: Dict[str, Any], done: int, games: int, file=None):
+    status = f"出错：{result['error']}" if result["error"] else f"幸存者：{'、'.join(result['winners'])}"
+    print(f"[{done}/{games}] 第{result['index']}局结束，{status}", file=file)
+
+
+def save_results(results: List[Dict[str, Any]], output_dir: str) -> Dict[str, Any]:
+    """按局号写入各局结果和汇总统计，返回汇总统计"""
+    results.sort(key=lambda result: result["index"])
+    summary = summarize(results)
+    with open(os.path.join(output_dir, "results.jsonl"), 'w', encoding='utf-8') as file:
+        for result in results:
+            file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    with open(os.path.join(output_dir, "summary.json"), 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    return summary
+
+
+def run_tournament(games: int, workers: int, seed: Optional[int] = None,
+                   output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """在进程池中运行games局游戏，返回汇总统计"""
+    output_dir = output_dir or default_output_dir()
+    os.makedirs(output_dir, exist_ok=True)
+
+    seeds = game_seeds(games, seed)
+    print(f"开始锦标赛：{games}局，{workers}个进程，输出目录 {output_dir}")
+
+    results = []
+    writer = open_results_writer()
+    try:
+        with multiprocessing.Manager() as manager:
+            limiter = SharedRateLimiter(manager.dict(), manager.Lock())
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(limiter,)) as pool:
+                futures = [pool.submit(run_game, index, game_seed, output_dir)
+                           for index, game_seed in enumerate(seeds)]
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    store_record(writer, results[-1])
+                    report_progress(results[-1], len(results), games)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    summary = save_results(results, output_dir)
+    print_summary(summary)
+    return summary
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="在进程池中批量运行AI地牢生存游戏并统计结果")
+    parser.add_argument("--games", type=int, default=10, help="运行的局数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，相同种子的座位和发言顺序相同")
+    parser.add_argument("-o", "--output", help="输出目录，默认为 output/tournament_时间")
+    args = parser.parse_args()
+
+    run_tournament(args.games, args.workers, args.seed, args.output)
+
+
+if __name__ == "__main__":
+    main()
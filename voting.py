@@ -0,0 +1,116 @@
+"""投票收集
+
+按投票顺序收集投票。开启提前结束后，第一批只请求让结果有可能确定所需的最少票数，剩余的票
+无论怎么投都无法改变第一名时停止，剩余的投票者记为弃权；第一批没能确定结果时其余的票
+一次收集完。
+平票后的重新投票总是提前结束，见 RevoteEngine。
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from output_sequencer import OutputSequencer
+
+
+class VoterTask(NamedTuple):
+    """一位投票者的投票任务，rng为该投票者独立的随机数生成器"""
+    voter: Any
+    rng: Any
+
+    @property
+    def name(self) -> str:
+        return self.voter.name
+
+
+def decided_leader(counts: Dict[str, int], remaining_voters: Sequence[str]) -> Optional[str]:
+    """剩余的票无论怎么投都无法改变第一名时，返回第一名，否则返回None
+
+    counts 为候选玩家当前的票数，remaining_voters 为尚未投票的玩家名。
+    玩家不能投给自己，因此每位候选玩家最多还能再得到不包括自己在内的剩余票数。
+    """
+    if not counts:
+        return None
+    leader = max(counts, key=counts.get)
+    for candidate, votes in counts.items():
+        if candidate == leader:
+            continue
+        possible_gains = sum(1 for voter in remaining_voters if voter != candidate)
+        if counts[leader] <= votes + possible_gains:
+            return None
+    return leader
+
+
+def wave_size(counts: Dict[str, int], remaining_voters: Sequence[str]) -> int:
+    """下一批至少需要收集多少票，结果才有可能确定
+
+    假设这一批的票全部投给同一位候选玩家，找出最少需要多少票能让该玩家领先到无法被追上；
+    任何数量都不可能时返回全部剩余票数。
+    """
+    for size in range(1, len(remaining_voters) + 1):
+        wave, rest = remaining_voters[:size], remaining_voters[size:]
+        for leader in counts:
+            best = dict(counts)
+            best[leader] += sum(1 for voter in wave if voter != leader)
+            if decided_leader(best, rest) == leader:
+                return size
+    return len(remaining_voters)
+
+
+def collect_votes(executor, voters: List, cast: Callable, counts: Dict[str, int],
+                  early_termination: bool = False, label: str = "投票") -> Tuple[List, List]:
+    """按顺序收集投票，输出按投票者顺序排列
+
+    Args:
+        executor: 并发执行投票的线程池，None表示按顺序执行
+        voters: 按投票顺序排列的投票者（需要 name 属性）
+        cast: 对单个投票者执行投票的函数，返回值的第二项为所投玩家名
+        counts: 候选玩家名 -> 票数，收集过程中就地更新
+        early_termination: 为True时先收集第一批，结果确定后不再请求剩余的投票
+
+    Returns:
+        (按顺序排列的投票结果, 因结果已确定而弃权的投票者)
+    """
+    results = []
+    index = 0
+    with OutputSequencer(range(len(voters)), label=label) as sequencer:
+        while index < len(voters):
+            remaining = voters[index:]
+            size = len(remaining)
+            if early_termination:
+                remaining_names = [voter.name for voter in remaining]
+                if decided_leader(counts, remaining_names) is not None:
+                    break
+                if index == 0:
+                    # 票数接近时分成多个小批次会让投票依次等待，因此只有第一批按最少票数收集
+                    size = wave_size(counts, remaining_names)
+
+            for result in sequencer.map(executor, cast, remaining[:size], start=index):
+                counts[result[1]] += 1
+                results.append(result)
+            index += size
+
+    return results, voters[index:]
+
+
+class RevoteEngine:
+    """平票后的重新投票
+
+    平票玩家不能投给自己，只剩一个可选对象的投票者直接投票，不请求LLM。这些投票者排在
+    最前面，与开启提前结束的 collect_votes 相同，平票被打破、第一名无法被追上时立即停止。
+    """
+
+    def __init__(self, executor, tied: List[str], label: str = "重新投票"):
+        self.executor = executor
+        self.tied = list(tied)
+        self.label = label
+
+    def options(self, voter_name: str) -> List[str]:
+        """投票者可以选择的平票玩家"""
+        return [name for name in self.tied if name != voter_name]
+
+    def order(self, voters: List) -> List:
+        """只有一个可选对象的投票者在前，其余保持原有顺序"""
+        return sorted(voters, key=lambda voter: len(self.options(voter.name)) > 1)
+
+    def run(self, voters: List, cast: Callable, counts: Dict[str, int]) -> Tuple[List, List]:
+        """收集重新投票，counts 为平票玩家的票数，就地更新"""
+        return collect_votes(self.executor, self.order(voters), cast, counts,
+                             early_termination=True, label=self.label)